@@ -1,42 +1,189 @@
+import logging
+import multiprocessing
+import os
+import time
 from logging.config import dictConfig
+from typing import Any, Optional
+from uuid import UUID
 
 import uvicorn
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from backend.api.admission import (
+    UserRateLimitingAuthenticator,
+    register_admission_control,
+)
 from backend.api.exeptions import register_exception_handlers
+from backend.api.metrics import AppMetrics, register_metrics_api
+from backend.api.query_budget import register_query_budget
 from backend.api.task import register_task_api
 from backend.api.user import register_user_api
-from backend.auth.authenticator import JwtAuthenticator
-from backend.model.app_managed_tables import create_app_managed_tables
-from backend.viewdata.task import ViewTask
-from backend.viewdata.user import ViewUser
+from backend.auth.authenticator import Authenticator, JwtAuthenticator
+from backend.model.app_managed_tables import (
+    app_managed_schema_lock,
+    create_app_managed_tables,
+)
+from backend.model.user import LoggedInUser
+from backend.viewdata.task import AsyncViewTask, ViewTask
+from backend.viewdata.task_feed import TaskChangeFeed
+from backend.viewdata.task_queries import TASK_CHANGES_CHANNEL
+from backend.viewdata.user import AsyncViewUser, ViewUser
 from settings import AppSettings
+from utils.dbconnection import AsyncDbConnection, DbConnection
 from utils.jwt_token import JWTUtils
-
-
-def create_app(config: AppSettings) -> FastAPI:
+from utils.metrics import MetricsRegistry
+from utils.password_hasher import PasswordHasher
+from utils.pg_notifications import PgNotificationListener
+from utils.startup_timing import StartupTimer
+from utils.token_bucket import TokenBucket, TokenBuckets
+from utils.ttl_cache import TTLCache
+
+# The config file of the server, which the app factory of every worker process reads
+CONFIG_FILE_ENV = "TASK_SERVICE_CONFIG_FILE"
+# The wall clock time the server process started at, which the startup reports of the workers refer to
+STARTED_AT_ENV = "TASK_SERVICE_STARTED_AT"
+
+
+def prepare_database(config: AppSettings, db_connection: DbConnection) -> None:
+    """
+    Creates the app managed tables and reconciles the data the task writes maintain with the
+    configuration. Runs under the app managed schema lock, so instances starting at the same time
+    take turns.
+
+    Args:
+        config (AppSettings): The configuration of the application.
+        db_connection (DbConnection): The connection to the primary database.
+    """
+
+    with app_managed_schema_lock(db_connection, config.schema_lock_timeout_secs):
+        create_app_managed_tables(db_connection, skip_unchanged=config.fast_startup)
+        task_view = ViewTask(db_connection, config.tasks.summary_counters, config.tasks.change_versions)
+        if config.tasks.summary_counters:
+            # Counters are only maintained while enabled, so they are reconciled on every start
+            task_view.rebuild_summary_counters()
+        if config.tasks.change_versions:
+            # Likewise versions, which are advanced so that no ETag handed out before the start matches
+            task_view.advance_change_versions()
+
+
+def create_app(config: AppSettings, prepare_db: bool = True, startup_timer: Optional[StartupTimer] = None) -> FastAPI:
+    """
+    Builds the application.
+
+    Once the application has started, the time its start took is logged and reported by the metrics,
+    broken down into the phases of the startup timer.
+
+    Args:
+        config (AppSettings): The configuration of the application.
+        prepare_db (bool): Whether to prepare the database with `prepare_database` first. A server
+            running several workers prepares it once before starting them.
+        startup_timer (Optional[StartupTimer]): The timer of the earlier phases of the start, by
+            default the start is timed from the call.
+
+    Returns:
+        FastAPI: The application.
+    """
+
+    startup_timer = startup_timer or StartupTimer()
 
     # Setting up logger absed on the configuration
     dictConfig(config.logging)
 
     db_connection = config.db.create()
-    authenticator = JwtAuthenticator(config.jwt.secret_key, db_connection)
-    jwt_utils = JWTUtils(config.jwt.secret_key, config.jwt.algorithm)
-
-    # Creating all tables if they do not exist
-    create_app_managed_tables(db_connection)
-
-    task_view = ViewTask(db_connection)
-    user_view = ViewUser(db_connection, jwt_utils, config.jwt.token_expire_mins)
+    password_hasher = PasswordHasher(config.passwords.bcrypt_rounds, config.passwords.hash_workers,
+                                     config.passwords.max_pending)
+    jwt_utils = JWTUtils(config.jwt.secret_key, config.jwt.algorithm, password_hasher)
+    user_cache: TTLCache[str, LoggedInUser] = TTLCache(config.jwt.user_cache_size, config.jwt.user_cache_ttl_secs)
+    # Entries expire with their token, the issued tokens expire after token_expire_mins at the latest
+    token_cache: TTLCache[bytes, dict[str, Any]] = TTLCache(config.jwt.token_cache_size,
+                                                            config.jwt.token_expire_mins * 60)
+    metrics = AppMetrics(MetricsRegistry()) if config.metrics.enabled else None
+    auth_duration = metrics.auth_duration if metrics else None
+
+    if prepare_db:
+        prepare_database(config, db_connection)
+        startup_timer.lap("database")
+
+    authenticator: Authenticator
+    task_view: ViewTask | AsyncViewTask
+    user_view: ViewUser | AsyncViewUser
+    db_connections: list[DbConnection | AsyncDbConnection] = [db_connection]
+    if config.async_db:
+        # Requests are served through the asyncio driver, the synchronous connection only prepares the database
+        async_db_connection = config.db.create_async()
+        db_connections.append(async_db_connection)
+        authenticator = JwtAuthenticator(config.jwt.secret_key, async_db_connection, user_cache, auth_duration,
+                                         token_cache)
+        task_view = AsyncViewTask(async_db_connection, config.tasks.summary_counters, config.tasks.change_versions,
+                                  config.tasks.change_feed)
+        user_view = AsyncViewUser(async_db_connection, jwt_utils, config.jwt.token_expire_mins, authenticator)
+    else:
+        authenticator = JwtAuthenticator(config.jwt.secret_key, db_connection, user_cache, auth_duration, token_cache)
+        task_view = ViewTask(db_connection, config.tasks.summary_counters, config.tasks.change_versions,
+                             config.tasks.change_feed)
+        user_view = ViewUser(db_connection, jwt_utils, config.jwt.token_expire_mins, authenticator)
+
+    admission = config.admission
+    rejections = metrics.requests_rejected if metrics else None
+    if admission.enabled and admission.user_rate > 0:
+        user_buckets: TokenBuckets[UUID] = TokenBuckets(admission.user_rate, admission.user_burst,
+                                                        admission.max_tracked_users)
+        authenticator = UserRateLimitingAuthenticator(authenticator, user_buckets, rejections)
 
     app = FastAPI()
+    app.add_event_handler("shutdown", password_hasher.shutdown)
+
+    def report_startup() -> None:
+        startup_timer.lap("server")
+        logging.getLogger(__name__).info("Started in %s", startup_timer.report())
+        if metrics is not None:
+            metrics.startup_duration.set(startup_timer.elapsed_secs)
+            for phase, secs in startup_timer.phases.items():
+                metrics.startup_phase_duration.set(secs, phase=phase)
+
+    app.add_event_handler("startup", report_startup)
+
+    change_feed = None
+    if config.tasks.change_feed:
+        # Every process listens on a connection of its own and serves the changes to its clients
+        change_feed = TaskChangeFeed(config.tasks.change_feed_max_pending)
+        change_listener = PgNotificationListener(config.db.connection_string, TASK_CHANGES_CHANNEL,
+                                                 change_feed.dispatch, change_feed.resync)
+        app.add_event_handler("startup", change_listener.start)
+        app.add_event_handler("shutdown", change_listener.stop)
 
     register_user_api(app, user_view)
-    register_task_api(app, task_view, authenticator)
+    register_task_api(app, task_view, authenticator, change_feed, config.tasks.change_feed_heartbeat_secs)
 
     register_exception_handlers(app)
 
+    if admission.enabled:
+        # Added before the metrics, so the rejected requests are recorded as well
+        register_admission_control(
+            app,
+            db_connections,
+            admission.path_prefix,
+            admission.max_pool_wait_secs,
+            admission.max_concurrent_requests,
+            admission.route_max_concurrent_requests,
+            TokenBucket(admission.global_rate, admission.global_burst) if admission.global_rate > 0 else None,
+            rejections,
+        )
+
+    if metrics is not None:
+        register_metrics_api(app, metrics, db_connections)
+
+    if config.query_budget.enabled:
+        register_query_budget(
+            app,
+            db_connections,
+            config.query_budget.max_statements,
+            config.query_budget.max_repeats,
+            config.query_budget.route_max_statements,
+            config.query_budget.raise_on_violation,
+        )
+
     if config.debug:
         app.add_middleware(
             CORSMiddleware,
@@ -46,16 +193,60 @@ def create_app(config: AppSettings) -> FastAPI:
             allow_headers=["*"],
         )
 
+    startup_timer.lap("app")
     return app
 
 
+def app_factory() -> FastAPI:
+    """
+    Builds the application of a server process from the config file `main` was started with. The
+    database has been prepared by `main` already.
+
+    Returns:
+        FastAPI: The application.
+    """
+
+    startup_timer = StartupTimer(float(os.environ[STARTED_AT_ENV]) if STARTED_AT_ENV in os.environ else None)
+    if multiprocessing.parent_process() is not None:
+        # A worker process of its own, which has imported the application again
+        startup_timer.add("imports", time.process_time())
+    config = AppSettings.from_yaml(os.environ[CONFIG_FILE_ENV])
+    startup_timer.lap("config")
+    return create_app(config, prepare_db=False, startup_timer=startup_timer)
+
+
 def main():
-    config = AppSettings.get_config()
-    app = create_app(config)
+    """
+    Prepares the database once, then serves the application from `webserver.workers` processes,
+    which build it with `app_factory` and share the listening socket.
+    """
+
+    # The process has spent its CPU time so far mostly on importing the application
+    imports_secs = time.process_time()
+    startup_timer = StartupTimer(time.time() - imports_secs)
+    startup_timer.add("imports", imports_secs)
+    config_file = AppSettings.get_config_file()
+    config = AppSettings.from_yaml(config_file)
+    dictConfig(config.logging)
+    startup_timer.lap("config")
+    db_connection = config.db.create()
+    prepare_database(config, db_connection)
+    db_connection.engine.dispose()
+    startup_timer.lap("database")
+    logging.getLogger(__name__).info("Prepared the database after %s", startup_timer.report())
+
+    # Inherited by the worker processes, which read the config again
+    os.environ[CONFIG_FILE_ENV] = config_file
+    os.environ[STARTED_AT_ENV] = str(startup_timer.started_at)
     uvicorn.run(
-        app,
+        "app:app_factory",
+        factory=True,
         host=config.webserver.host,
         port=config.webserver.port,
+        workers=config.webserver.workers,
+        backlog=config.webserver.backlog,
+        limit_concurrency=config.webserver.limit_concurrency,
+        timeout_keep_alive=config.webserver.timeout_keep_alive_secs,
         log_config=None,
     )
 
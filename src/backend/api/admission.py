@@ -0,0 +1,189 @@
+import logging
+import math
+from typing import Sequence
+from uuid import UUID
+
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from backend.api.metrics import route_template
+from backend.auth.authenticator import Authenticator
+from backend.model.user import LoggedInUser
+from utils.dbconnection import AsyncDbConnection, DbConnection
+from utils.metrics import Counter
+from utils.token_bucket import TokenBucket, TokenBuckets
+
+# Clients are asked to retry after this many seconds when a request is shed for overload
+_RETRY_AFTER_SECS = 1
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware rejecting requests with 503 Service Unavailable before they queue up, so the
+    latency of the admitted requests stays bounded while the database is overloaded.
+
+    A request to a path under `path_prefix` is rejected when
+
+    - a checkout of the connection pool of the database, or of one of its read replicas, has been
+      waiting for longer than `max_pool_wait_secs`,
+    - its route already serves its maximum number of concurrent requests,
+    - the global token bucket has no token left.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Sequence[BaseRoute],
+        db_connections: Sequence[DbConnection | AsyncDbConnection],
+        path_prefix: str,
+        max_pool_wait_secs: float,
+        max_concurrent_requests: int,
+        route_max_concurrent_requests: dict[str, int],
+        global_bucket: TokenBucket | None,
+        rejections: Counter | None,
+    ) -> None:
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            routes (Sequence[BaseRoute]): The routes of the application, to look the route limits up with.
+            db_connections (Sequence[DbConnection | AsyncDbConnection]): The connections whose connection
+                pools are watched, together with those of their read replicas.
+            path_prefix (str): The prefix of the paths whose requests are admission controlled.
+            max_pool_wait_secs (float): The longest a pending connection checkout may have waited before
+                requests are shed, 0 to never shed requests for the pool.
+            max_concurrent_requests (int): The maximum number of concurrent requests per route, 0 for no limit.
+            route_max_concurrent_requests (dict[str, int]): Limits overriding `max_concurrent_requests`, by
+                method and route template, e.g. 'GET /v1/tasks/'.
+            global_bucket (TokenBucket | None): The token bucket all requests share, none for no limit.
+            rejections (Counter | None): Counts the rejected requests, labeled with the `reason`.
+        """
+        self._app = app
+        self._routes = routes
+        self._pools = [
+            connection for db_connection in db_connections
+            for connection in (db_connection, *db_connection.read_replicas)
+        ]
+        self._path_prefix = path_prefix
+        self._max_pool_wait_secs = max_pool_wait_secs
+        self._max_concurrent_requests = max_concurrent_requests
+        self._route_max_concurrent_requests = route_max_concurrent_requests
+        self._global_bucket = global_bucket
+        self._rejections = rejections
+        # Only touched from the event loop, so the counts need no lock
+        self._in_flight: dict[str, int] = {}
+        self._logger = logging.getLogger(__name__)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self._path_prefix):
+            await self._app(scope, receive, send)
+            return
+
+        route = f"{scope['method']} {route_template(self._routes, scope)}"
+        max_concurrent = self._route_max_concurrent_requests.get(route, self._max_concurrent_requests)
+        in_flight = self._in_flight.get(route, 0)
+        if max_concurrent and in_flight >= max_concurrent:
+            await self._reject(scope, receive, send, route, "concurrency", _RETRY_AFTER_SECS)
+            return
+        if self._max_pool_wait_secs and self._pool_wait_secs() > self._max_pool_wait_secs:
+            await self._reject(scope, receive, send, route, "pool_wait", _RETRY_AFTER_SECS)
+            return
+        wait_secs = self._global_bucket.acquire() if self._global_bucket else 0
+        if wait_secs:
+            await self._reject(scope, receive, send, route, "rate_limit", wait_secs)
+            return
+
+        self._in_flight[route] = in_flight + 1
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            self._in_flight[route] -= 1
+
+    def _pool_wait_secs(self) -> float:
+        return max(connection.pool_stats().checkout_wait_secs_oldest for connection in self._pools)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, route: str, reason: str,
+                      retry_after_secs: float) -> None:
+        self._logger.warning("Rejected %s: %s", route, reason)
+        if self._rejections is not None:
+            self._rejections.inc(reason=reason)
+        response = JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "The server is overloaded, try again later"},
+            headers={"Retry-After": _retry_after(retry_after_secs)},
+        )
+        await response(scope, receive, send)
+
+
+class UserRateLimitingAuthenticator(Authenticator):
+    """
+    Limits the request rate of every authenticated user with a token bucket of its own, and rejects
+    the requests beyond it with 429 Too Many Requests.
+    """
+
+    def __init__(self,
+                 authenticator: Authenticator,
+                 user_buckets: TokenBuckets[UUID],
+                 rejections: Counter | None = None) -> None:
+        """
+        Args:
+            authenticator (Authenticator): Authenticates the requests.
+            user_buckets (TokenBuckets[UUID]): The token buckets of the users, by user id.
+            rejections (Counter | None): Counts the rejected requests, labeled with the `reason`.
+        """
+        self._authenticator = authenticator
+        self._user_buckets = user_buckets
+        self._rejections = rejections
+
+    async def authenticate(self, request: Request) -> LoggedInUser:
+        user = await self._authenticator.authenticate(request)
+        wait_secs = self._user_buckets.acquire(user.id)
+        if wait_secs:
+            if self._rejections is not None:
+                self._rejections.inc(reason="user_rate_limit")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": _retry_after(wait_secs)},
+            )
+        return user
+
+    def invalidate_user(self, username: str) -> None:
+        self._authenticator.invalidate_user(username)
+
+
+def register_admission_control(
+    app: FastAPI,
+    db_connections: Sequence[DbConnection | AsyncDbConnection],
+    path_prefix: str,
+    max_pool_wait_secs: float,
+    max_concurrent_requests: int,
+    route_max_concurrent_requests: dict[str, int] | None = None,
+    global_bucket: TokenBucket | None = None,
+    rejections: Counter | None = None,
+):
+    """
+    Sheds the requests to the paths under `path_prefix` while the server is overloaded.
+    See `AdmissionControlMiddleware` for the arguments.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+    """
+
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        routes=app.router.routes,
+        db_connections=db_connections,
+        path_prefix=path_prefix,
+        max_pool_wait_secs=max_pool_wait_secs,
+        max_concurrent_requests=max_concurrent_requests,
+        route_max_concurrent_requests=route_max_concurrent_requests or {},
+        global_bucket=global_bucket,
+        rejections=rejections,
+    )
+
+
+def _retry_after(wait_secs: float) -> str:
+    # Retry-After takes whole seconds, rounded up so the retry finds a token
+    return str(max(1, math.ceil(wait_secs)))
@@ -1,7 +1,10 @@
 import logging
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import JSONResponse
+
+from utils.password_hasher import PasswordHasherSaturatedError
 
 
 def register_exception_handlers(app: FastAPI):
@@ -10,7 +13,8 @@ def register_exception_handlers(app: FastAPI):
     Args:
         app (FastAPI): The FastAPI application instance to register the exception handlers with.
     The function sets up a custom handler for HTTPException that logs the exception details
-    and then delegates to the default HTTP exception handler.
+    and then delegates to the default HTTP exception handler. Overload errors are answered with
+    503 Service Unavailable.
     """
 
     logger = logging.getLogger(__name__)
@@ -29,3 +33,16 @@ def register_exception_handlers(app: FastAPI):
 
         logger.info("HTTP error: %s", exc)
         return await http_exception_handler(request, exc)
+
+    @app.exception_handler(PasswordHasherSaturatedError)
+    async def password_hasher_saturated_handler(request: Request, exc: PasswordHasherSaturatedError):
+        """
+        Fails logins and user creations fast while the password hashing pool is saturated.
+        """
+
+        logger.warning("Rejected %s %s: %s", request.method, request.url.path, exc)
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"detail": "Too many concurrent password operations, try again later"},
+            headers={"Retry-After": "1"},
+        )
@@ -0,0 +1,162 @@
+import time
+from typing import Sequence
+
+from fastapi import FastAPI, Response
+from sqlalchemy import Engine
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.dbconnection import AsyncDbConnection, DbConnection
+from utils.metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry
+from utils.statement_log import instrument_engine, track_statements
+
+_STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class AppMetrics:
+    """
+    The metrics of the application, registered with a `MetricsRegistry`.
+
+    Requests are labeled with their method and route template, not the requested path, so the number
+    of label values stays bounded.
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.requests_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled.",
+                                                 ["method", "route"])
+        self.request_duration = registry.histogram("http_request_duration_seconds",
+                                                   "Time from receiving a request until its response was sent.",
+                                                   ["method", "route", "status"])
+        self.request_db_statements = registry.histogram("http_request_db_statements",
+                                                        "Number of database statements executed per request.",
+                                                        ["method", "route"], _STATEMENT_COUNT_BUCKETS)
+        self.request_db_duration = registry.histogram("http_request_db_duration_seconds",
+                                                      "Time spent executing database statements per request.",
+                                                      ["method", "route"])
+        self.db_statement_duration = registry.histogram("db_statement_duration_seconds",
+                                                        "Execution time of single database statements of requests.")
+        self.requests_rejected = registry.counter("http_requests_rejected_total",
+                                                  "Requests rejected by the admission control, by reason.", ["reason"])
+        self.auth_duration = registry.histogram("auth_duration_seconds",
+                                                "Time spent authenticating requests, by result.", ["result"])
+        self.startup_duration = registry.gauge("startup_duration_seconds",
+                                               "Time from the start of the server until the process was ready.")
+        self.startup_phase_duration = registry.gauge("startup_phase_seconds",
+                                                     "Time the start of the process spent per phase.", ["phase"])
+        # Pools are labeled with their driver, and with the database: the primary, or replica<n>
+        pool_labels = ["driver", "database"]
+        self.db_pool_size = registry.gauge("db_pool_size", "Connections the pool keeps open.", pool_labels)
+        self.db_pool_checked_out = registry.gauge("db_pool_checked_out", "Connections currently in use.", pool_labels)
+        self.db_pool_overflow = registry.gauge("db_pool_overflow", "Connections opened beyond the pool size.",
+                                               pool_labels)
+        self.db_pool_checkout_wait_max = registry.gauge("db_pool_checkout_wait_seconds_max",
+                                                        "Longest time a connection checkout had to wait.", pool_labels)
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording the in-flight count, latency and database usage of every HTTP request.
+
+    The latency is measured until the last body chunk has been sent, so streamed responses are
+    measured completely.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: AppMetrics, routes: Sequence[BaseRoute]) -> None:
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            metrics (AppMetrics): The metrics to record the requests in.
+            routes (Sequence[BaseRoute]): The routes of the application, to label the requests with.
+        """
+        self._app = app
+        self._metrics = metrics
+        self._routes = routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        labels = {"method": scope["method"], "route": route_template(self._routes, scope)}
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self._metrics.requests_in_flight.inc(**labels)
+        start = time.perf_counter()
+        with track_statements() as statement_log:
+            try:
+                await self._app(scope, receive, send_with_status)
+            finally:
+                duration_secs = time.perf_counter() - start
+                self._metrics.requests_in_flight.dec(**labels)
+                self._metrics.request_duration.observe(duration_secs, status=str(status_code), **labels)
+                self._metrics.request_db_statements.observe(statement_log.count, **labels)
+                self._metrics.request_db_duration.observe(statement_log.duration_secs, **labels)
+                for statement in statement_log.statements:
+                    self._metrics.db_statement_duration.observe(statement.duration_secs)
+
+
+def register_metrics_api(app: FastAPI, metrics: AppMetrics, db_connections: Sequence[DbConnection | AsyncDbConnection]):
+    """
+    Registers the `/metrics` endpoint, which serves the metrics in the Prometheus text format, and
+    starts recording the requests and the database statements of the given connections.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+        metrics (AppMetrics): The metrics to record and serve.
+        db_connections (Sequence[DbConnection | AsyncDbConnection]): The connections whose statements and
+            connection pool are reported, together with those of their read replicas.
+    """
+
+    databases: list[tuple[str, DbConnection | AsyncDbConnection]] = []
+    for db_connection in db_connections:
+        databases.append(("primary", db_connection))
+        databases.extend((f"replica{index}", replica) for index, replica in enumerate(db_connection.read_replicas, 1))
+
+    for _, db_connection in databases:
+        engine = db_connection.engine
+        instrument_engine(engine if isinstance(engine, Engine) else engine.sync_engine)
+
+    def collect_pool_stats() -> None:
+        for database, db_connection in databases:
+            labels = {"driver": db_connection.engine.dialect.driver, "database": database}
+            stats = db_connection.pool_stats()
+            metrics.db_pool_size.set(stats.pool_size, **labels)
+            metrics.db_pool_checked_out.set(stats.checked_out, **labels)
+            metrics.db_pool_overflow.set(stats.overflow, **labels)
+            metrics.db_pool_checkout_wait_max.set(stats.checkout_wait_secs_max, **labels)
+
+    metrics.registry.add_collector(collect_pool_stats)
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics, routes=app.router.routes)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return Response(metrics.registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def route_template(routes: Sequence[BaseRoute], scope: Scope) -> str:
+    """
+    Finds the path template of the route a request is dispatched to, as the router does.
+
+    Args:
+        routes (Sequence[BaseRoute]): The routes of the application.
+        scope (Scope): The scope of the request.
+
+    Returns:
+        str: The path of the route, or 'unmatched' if no route matches.
+    """
+
+    partial: BaseRoute | None = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    return getattr(partial, "path", "unmatched")
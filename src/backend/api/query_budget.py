@@ -0,0 +1,120 @@
+import logging
+from typing import Sequence
+
+from fastapi import FastAPI
+from sqlalchemy import Engine
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.api.metrics import route_template
+from utils.dbconnection import AsyncDbConnection, DbConnection
+from utils.query_budget import QueryBudgetExceededError, budget_violations
+from utils.statement_log import StatementLog, instrument_engine, track_statements
+
+
+class QueryBudgetMiddleware:
+    """
+    ASGI middleware counting the SQL statements of every HTTP request, and reporting requests that
+    exceed their statement budget or repeat the same statement, a sign of an N+1 query pattern.
+
+    The budget is checked when the response starts, so in raise mode a violating request fails with a
+    server error instead of sending its response. The statements a streamed body executes after the
+    response started are checked when the request ends, and their violations are logged with the route
+    and the statement count, even in raise mode, as the response can no longer be replaced.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        routes: Sequence[BaseRoute],
+        max_statements: int,
+        max_repeats: int,
+        route_max_statements: dict[str, int],
+        raise_on_violation: bool,
+    ) -> None:
+        """
+        Args:
+            app (ASGIApp): The wrapped application.
+            routes (Sequence[BaseRoute]): The routes of the application, to look the route budgets up with.
+            max_statements (int): The maximum number of statements per request.
+            max_repeats (int): The maximum number of executions of the same statement per request.
+            route_max_statements (dict[str, int]): Budgets overriding `max_statements`, by method and route
+                template, e.g. 'GET /v1/tasks/'.
+            raise_on_violation (bool): Whether to raise a `QueryBudgetExceededError` instead of logging a
+                warning if the budget is exceeded before the response starts, e.g. in tests.
+        """
+        self._app = app
+        self._routes = routes
+        self._max_statements = max_statements
+        self._max_repeats = max_repeats
+        self._route_max_statements = route_max_statements
+        self._raise_on_violation = raise_on_violation
+        self._logger = logging.getLogger(__name__)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        route = f"{scope['method']} {route_template(self._routes, scope)}"
+        reported: list[str] = []
+
+        async def send_checked(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                violations = self._violations(route, statement_log)
+                if violations and self._raise_on_violation:
+                    raise QueryBudgetExceededError(self._message(route, violations))
+                self._report(route, violations)
+                reported.extend(violations)
+            await send(message)
+
+        with track_statements() as statement_log:
+            await self._app(scope, receive, send_checked)
+
+        self._report(route,
+                     [violation for violation in self._violations(route, statement_log) if violation not in reported])
+
+    def _violations(self, route: str, statement_log: StatementLog) -> list[str]:
+        max_statements = self._route_max_statements.get(route, self._max_statements)
+        return budget_violations(statement_log, max_statements, self._max_repeats)
+
+    def _report(self, route: str, violations: list[str]) -> None:
+        if violations:
+            self._logger.warning(self._message(route, violations))
+
+    @staticmethod
+    def _message(route: str, violations: list[str]) -> str:
+        return f"Query budget of {route} exceeded: {'; '.join(violations)}"
+
+
+def register_query_budget(
+    app: FastAPI,
+    db_connections: Sequence[DbConnection | AsyncDbConnection],
+    max_statements: int,
+    max_repeats: int,
+    route_max_statements: dict[str, int] | None = None,
+    raise_on_violation: bool = False,
+):
+    """
+    Checks the SQL statements every request executes on the given connections against a budget.
+    See `QueryBudgetMiddleware` for the arguments.
+
+    Args:
+        app (FastAPI): The FastAPI application instance.
+        db_connections (Sequence[DbConnection | AsyncDbConnection]): The connections whose statements are
+            counted, together with those of their read replicas.
+    """
+
+    for db_connection in db_connections:
+        for connection in (db_connection, *db_connection.read_replicas):
+            engine = connection.engine
+            instrument_engine(engine if isinstance(engine, Engine) else engine.sync_engine)
+
+    app.add_middleware(
+        QueryBudgetMiddleware,
+        routes=app.router.routes,
+        max_statements=max_statements,
+        max_repeats=max_repeats,
+        route_max_statements=route_max_statements or {},
+        raise_on_violation=raise_on_violation,
+    )
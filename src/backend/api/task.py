@@ -1,37 +1,77 @@
-from typing import Optional
+import asyncio
+from typing import Any, AsyncIterator, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, FastAPI, Query
+from fastapi import APIRouter, Depends, FastAPI, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from backend.auth.authenticator import Authenticator
 from backend.auth.role_checker import RoleChecker
-from backend.model.user import UserType
+from backend.model.user import LoggedInUser, UserType
 from backend.viewdata.task import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    MAX_SEARCH_QUERY_LENGTH,
+    AsyncViewTask,
     EmployeeTaskSummary,
+    TaskBulkCreate,
+    TaskBulkResult,
+    TaskBulkStatusUpdate,
     TaskCreate,
+    TaskExportFormat,
     TaskOut,
+    TaskPage,
+    TaskPageContent,
     TaskUpdate,
     ViewTask,
 )
+from backend.viewdata.task_feed import TaskChangeFeed
+from utils.concurrency import call_maybe_async
+from utils.etag import etag_matches, make_etag
 
+EXPORT_MEDIA_TYPES = {
+    TaskExportFormat.ndjson: "application/x-ndjson",
+    TaskExportFormat.csv: "text/csv",
+}
 
-def register_task_api(app: FastAPI, task_view: ViewTask, auth: Authenticator):
+CHANGE_FEED_HEARTBEAT_SECS = 15.0
+
+
+def register_task_api(app: FastAPI,
+                      task_view: ViewTask | AsyncViewTask,
+                      auth: Authenticator,
+                      change_feed: Optional[TaskChangeFeed] = None,
+                      heartbeat_secs: float = CHANGE_FEED_HEARTBEAT_SECS):
     """
     Register task-related API endpoints with the FastAPI application.
 
+    The endpoints run on the event loop. Calls into a synchronous `ViewTask` are moved to the
+    threadpool, while an `AsyncViewTask` is awaited directly. The authenticated user is resolved per
+    request by the `RoleChecker` dependency, so concurrent requests never share it. The task pages are
+    built from plain rows and encoded with orjson as they are, skipping the validation and encoding
+    of the `response_model`, which only documents them.
+
+    If the view maintains change versions, the task lists and the task summary carry an ETag derived
+    from the change version. A request whose `If-None-Match` matches it is answered with 304 Not
+    Modified after reading the version only.
+
+    Given a change feed, the changes of the tasks assigned to or created by the authenticated user are
+    streamed as server-sent events, so clients no longer poll the task lists.
+
     Args:
         app (FastAPI): The FastAPI application instance.
-        task_view (ViewTask): The view handling task-related operations.
+        task_view (ViewTask | AsyncViewTask): The view handling task-related operations.
         auth (Authenticator): The authentication handler.
+        change_feed (Optional[TaskChangeFeed]): The feed of the published task changes, if any.
+        heartbeat_secs (float): The time without changes after which a comment keeps the stream alive.
     """
     router = APIRouter(prefix="/v1/tasks")
 
-    @router.post(
-        "/",
-        dependencies=[Depends(RoleChecker(auth, allowed_roles=[UserType.employer]))],
-        response_model=TaskOut,
-    )
-    def create_task(task_create: TaskCreate):
+    @router.post("/", response_model=TaskOut)
+    async def create_task(
+            task_create: TaskCreate,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employer])),
+    ):
         """
         Create a new task.
 
@@ -42,44 +82,149 @@ def register_task_api(app: FastAPI, task_view: ViewTask, auth: Authenticator):
         Response:
             TaskOut
         """
-        current_user = auth.get_current_user()
-        return TaskOut.model_validate(task_view.create_task(task_create, current_user))
+        return TaskOut.model_validate(await call_maybe_async(task_view.create_task, task_create, current_user))
+
+    @router.post("/bulk", response_model=TaskBulkResult)
+    async def create_tasks(
+            task_bulk_create: TaskBulkCreate,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employer])),
+    ):
+        """
+        Create many tasks in one transaction. Tasks with an invalid assignee are skipped and reported.
 
-    @router.get(
-        "/",
-        dependencies=[Depends(RoleChecker(auth, allowed_roles=[UserType.employer]))],
-        response_model=list[TaskOut],
-    )
-    def get_tasks(
-            assignee_id: Optional[int] = Query(None),
+        Dependencies:
+            RoleChecker(auth, allowed_roles=[UserType.employer])
+        Request Body:
+            TaskBulkCreate
+        Response:
+            TaskBulkResult
+        """
+        return await call_maybe_async(task_view.create_tasks, task_bulk_create.tasks, current_user)
+
+    @router.get("/", response_model=TaskPage, response_class=ORJSONResponse)
+    async def get_tasks(
+            request: Request,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employer])),
+            assignee_id: Optional[UUID] = Query(None),
             status_filter: Optional[str] = Query(None),
-            sort_by: Optional[str] = Query("created_at", regex="^(created_at|due_date|status)$"),
-            order: Optional[str] = Query("asc", regex="^(asc|desc)$"),
+            sort_by: str = Query("created_at", regex="^(created_at|due_date|status)$"),
+            order: str = Query("asc", regex="^(asc|desc)$"),
+            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+            cursor: Optional[str] = Query(None),
     ):
         """
-        Retrieve a list of tasks.
+        Retrieve a page of tasks.
 
         Dependencies:
             RoleChecker(auth, allowed_roles=[UserType.employer])
         Query Parameters:
-            assignee_id (Optional[int]): Filter tasks by assignee ID.
+            assignee_id (Optional[UUID]): Filter tasks by assignee ID.
             status_filter (Optional[str]): Filter tasks by status.
-            sort_by (Optional[str]): Sort tasks by 'created_at', 'due_date', or 'status'.
-            order (Optional[str]): Order of sorting, 'asc' or 'desc'.
+            sort_by (str): Sort tasks by 'created_at', 'due_date', or 'status'.
+            order (str): Order of sorting, 'asc' or 'desc'.
+            limit (int): Maximum number of tasks in the page.
+            cursor (Optional[str]): The `next_cursor` of the previous page.
         Response:
-            List[TaskOut]
+            TaskPage, or 304 Not Modified
         """
-        tasks = task_view.get_tasks(assignee_id, status_filter, sort_by, order)
-        return [TaskOut.model_validate(task) for task in tasks]
+        etag_check = _ChangeETagCheck(request, current_user) if task_view.change_versions else None
+        page = await call_maybe_async(task_view.get_tasks, assignee_id, status_filter, sort_by, order, limit, cursor,
+                                      current_user, etag_check)
+        return _page_response(page, etag_check)
 
-    @router.put(
-        "/{task_id}",
-        dependencies=[Depends(RoleChecker(auth, allowed_roles=[UserType.employee]))],
-        response_model=TaskOut,
-    )
-    def update_task(task_id: UUID, task_update: TaskUpdate):
+    @router.get("/search", response_model=TaskPage, response_class=ORJSONResponse)
+    async def search_tasks(
+            request: Request,
+            q: str = Query(..., min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH),
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employer])),
+            assignee_id: Optional[UUID] = Query(None),
+            status_filter: Optional[str] = Query(None),
+            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+            cursor: Optional[str] = Query(None),
+    ):
         """
-        Update an existing task.
+        Search the titles and descriptions of the tasks, returning a page of the matches, best match first.
+
+        Dependencies:
+            RoleChecker(auth, allowed_roles=[UserType.employer])
+        Query Parameters:
+            q (str): The search, e.g. `invoice "quarterly report" -draft`.
+            assignee_id (Optional[UUID]): Filter tasks by assignee ID.
+            status_filter (Optional[str]): Filter tasks by status.
+            limit (int): Maximum number of tasks in the page.
+            cursor (Optional[str]): The `next_cursor` of the previous page.
+        Response:
+            TaskPage, or 304 Not Modified
+        """
+        etag_check = _ChangeETagCheck(request, current_user) if task_view.change_versions else None
+        page = await call_maybe_async(task_view.search_tasks, q, assignee_id, status_filter, limit, cursor,
+                                      current_user, etag_check)
+        return _page_response(page, etag_check)
+
+    @router.get("/export", response_class=StreamingResponse)
+    async def export_tasks(
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employer])),
+            assignee_id: Optional[UUID] = Query(None),
+            status_filter: Optional[str] = Query(None),
+            sort_by: str = Query("created_at", regex="^(created_at|due_date|status)$"),
+            order: str = Query("asc", regex="^(asc|desc)$"),
+            export_format: TaskExportFormat = Query(TaskExportFormat.ndjson, alias="format"),
+    ):
+        """
+        Stream all tasks matching the filters as NDJSON or CSV.
+
+        Dependencies:
+            RoleChecker(auth, allowed_roles=[UserType.employer])
+        Query Parameters:
+            assignee_id (Optional[UUID]): Filter tasks by assignee ID.
+            status_filter (Optional[str]): Filter tasks by status.
+            sort_by (str): Sort tasks by 'created_at', 'due_date', or 'status'.
+            order (str): Order of sorting, 'asc' or 'desc'.
+            format (TaskExportFormat): 'ndjson' for one JSON task per line, or 'csv'.
+        Response:
+            The tasks, streamed in the requested format.
+        """
+        # The chunks of a synchronous view are produced in the threadpool by the StreamingResponse
+        chunks = task_view.export_tasks(assignee_id, status_filter, sort_by, order, export_format, current_user)
+        return StreamingResponse(
+            chunks,
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="tasks.{export_format.value}"'},
+        )
+
+    if change_feed is not None:
+
+        @router.get("/changes", response_class=StreamingResponse)
+        async def get_task_changes(current_user: LoggedInUser = Depends(RoleChecker(auth))):
+            """
+            Stream the changes of the tasks assigned to or created by the authenticated user.
+
+            Every change is an event named after its `TaskChangeType` with a `TaskChangeEvent` as data.
+            A `resync` event tells the client that changes were missed and its tasks have to be read again.
+
+            Dependencies:
+                RoleChecker(auth)
+            Response:
+                The changes, streamed as server-sent events.
+            """
+            return StreamingResponse(
+                _task_change_events(change_feed, current_user.id, heartbeat_secs),
+                media_type="text/event-stream",
+                headers={
+                    "Cache-Control": "no-cache",
+                    "X-Accel-Buffering": "no"
+                },
+            )
+
+    @router.put("/{task_id}", response_model=TaskOut)
+    async def update_task(
+            task_id: UUID,
+            task_update: TaskUpdate,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employee])),
+    ):
+        """
+        Update an existing task. Given the version of the task the client read, the update fails
+        with 409 Conflict if the task changed since.
 
         Dependencies:
             RoleChecker(auth, allowed_roles=[UserType.employee])
@@ -90,42 +235,124 @@ def register_task_api(app: FastAPI, task_view: ViewTask, auth: Authenticator):
         Response:
             TaskOut
         """
-        current_user = auth.get_current_user()
-        return TaskOut.model_validate(task_view.update_task(task_id, task_update, current_user))
+        return TaskOut.model_validate(await call_maybe_async(task_view.update_task, task_id, task_update, current_user))
 
-    @router.get(
-        "/my-tasks",
-        dependencies=[Depends(RoleChecker(auth, allowed_roles=[UserType.employee]))],
-        response_model=list[TaskOut],
-    )
-    def get_my_tasks():
+    @router.patch("/bulk-status", response_model=TaskBulkResult)
+    async def update_task_statuses(
+            task_bulk_update: TaskBulkStatusUpdate,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employee])),
+    ):
+        """
+        Update the status of many tasks in one transaction. Tasks that are not found are reported.
+
+        Dependencies:
+            RoleChecker(auth, allowed_roles=[UserType.employee])
+        Request Body:
+            TaskBulkStatusUpdate
+        Response:
+            TaskBulkResult
+        """
+        return await call_maybe_async(task_view.update_task_statuses, task_bulk_update.updates, current_user)
+
+    @router.get("/my-tasks", response_model=TaskPage, response_class=ORJSONResponse)
+    async def get_my_tasks(
+            request: Request,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employee])),
+            sort_by: str = Query("created_at", regex="^(created_at|due_date|status)$"),
+            order: str = Query("asc", regex="^(asc|desc)$"),
+            limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+            cursor: Optional[str] = Query(None),
+    ):
         """
-        Retrieve tasks assigned to the authenticated user.
+        Retrieve a page of the tasks assigned to the authenticated user.
 
         Dependencies:
             RoleChecker(auth, allowed_roles=[UserType.employee])
+        Query Parameters:
+            sort_by (str): Sort tasks by 'created_at', 'due_date', or 'status'.
+            order (str): Order of sorting, 'asc' or 'desc'.
+            limit (int): Maximum number of tasks in the page.
+            cursor (Optional[str]): The `next_cursor` of the previous page.
         Response:
-            List[TaskOut]
+            TaskPage, or 304 Not Modified
         """
-        current_user = auth.get_current_user()
-        tasks = task_view.get_task_by_authenticated_user(current_user)
-        return [TaskOut.model_validate(task) for task in tasks]
+        etag_check = _ChangeETagCheck(request, current_user) if task_view.change_versions else None
+        page = await call_maybe_async(task_view.get_task_by_authenticated_user, current_user, sort_by, order, limit,
+                                      cursor, etag_check)
+        return _page_response(page, etag_check)
 
-    @router.get(
-        "/task-summary",
-        response_model=list[EmployeeTaskSummary],
-        dependencies=[Depends(RoleChecker(auth, allowed_roles=[UserType.employer]))],
-    )
-    def get_task_summary():
+    @router.get("/task-summary", response_model=list[EmployeeTaskSummary])
+    async def get_task_summary(
+            request: Request,
+            response: Response,
+            current_user: LoggedInUser = Depends(RoleChecker(auth, allowed_roles=[UserType.employer])),
+    ):
         """
         Retrieve a summary of tasks for employees.
 
         Dependencies:
             RoleChecker(auth, allowed_roles=[UserType.employer])
         Response:
-            List[EmployeeTaskSummary]
+            List[EmployeeTaskSummary], or 304 Not Modified
         """
-        task_summary = task_view.get_employee_task_summary()
+        etag_check = _ChangeETagCheck(request, current_user) if task_view.change_versions else None
+        task_summary = await call_maybe_async(task_view.get_employee_task_summary, current_user, etag_check)
+        if etag_check is not None and etag_check.etag is not None:
+            if task_summary is None:
+                return Response(status_code=304, headers=_etag_headers(etag_check.etag))
+            response.headers.update(_etag_headers(etag_check.etag))
         return [EmployeeTaskSummary.model_validate(summary) for summary in task_summary]
 
     app.include_router(router)
+
+
+class _ChangeETagCheck:
+    """
+    Derives the ETag of a response from the change version of its data, the requested URL and the
+    caller, so every route, filter, page and user has its own tag, and checks the If-None-Match header
+    of the request against it. The views call it with the version they read in the session that then
+    reads the data, see `ViewTask.get_tasks`.
+    """
+
+    def __init__(self, request: Request, current_user: LoggedInUser) -> None:
+        self._request = request
+        self._current_user = current_user
+        self.etag: Optional[str] = None
+
+    def __call__(self, *version: Any) -> bool:
+        self.etag = make_etag(*version, self._request.url.path, self._request.url.query, self._current_user.id)
+        return etag_matches(self._request.headers.get("if-none-match"), self.etag)
+
+
+def _page_response(page: Optional[TaskPageContent], etag_check: Optional[_ChangeETagCheck]) -> Response:
+    """
+    The response of a task page, tagged if the change version of the tasks was checked, and 304 Not
+    Modified if the check found the client's copy current, so no page was read.
+    """
+
+    if etag_check is None or etag_check.etag is None:
+        return ORJSONResponse(page)
+    if page is None:
+        return Response(status_code=304, headers=_etag_headers(etag_check.etag))
+    return ORJSONResponse(page, headers=_etag_headers(etag_check.etag))
+
+
+async def _task_change_events(change_feed: TaskChangeFeed, user_id: UUID, heartbeat_secs: float) -> AsyncIterator[str]:
+    # The subscription ends when the response is cancelled on disconnect
+    with change_feed.subscribe(user_id) as subscription:
+        yield ": subscribed\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat_secs)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                yield f"event: {event.event.value}\ndata: {event.model_dump_json()}\n\n"
+
+
+def _etag_headers(etag: str) -> dict[str, str]:
+    # The responses depend on the caller, so shared caches must not serve them to other users
+    return {"ETag": etag, "Cache-Control": "private", "Vary": "Authorization"}
@@ -4,17 +4,20 @@ from backend.viewdata.user import (
     ApiCreateUserReq,
     ApiLoginReq,
     ApiTokenResponse,
+    AsyncViewUser,
     ViewUser,
 )
+from utils.concurrency import call_maybe_async
 
 
-def register_user_api(app: FastAPI, user_view: ViewUser):
+def register_user_api(app: FastAPI, user_view: ViewUser | AsyncViewUser):
     """
     Registers the user-related API endpoints with the given FastAPI application.
 
     Args:
         app (FastAPI): The FastAPI application instance to register the routes with.
-        user_view (ViewUser): An instance of ViewUser that handles the user-related operations.
+        user_view (ViewUser | AsyncViewUser): The view that handles the user-related operations. Calls into a
+            synchronous ViewUser are moved to the threadpool.
 
     Endpoints:
         POST /v1/users/login: Logs in a user and returns an API token.
@@ -29,11 +32,12 @@ def register_user_api(app: FastAPI, user_view: ViewUser):
     router = APIRouter(prefix="/v1/users")
 
     @router.post("/login", response_model=ApiTokenResponse)
-    def login(login_req: ApiLoginReq):
-        return user_view.login(login_req.username, login_req.password)
+    async def login(login_req: ApiLoginReq):
+        return await call_maybe_async(user_view.login, login_req.username, login_req.password)
 
     @router.post("/")
-    def create_user(create_user_req: ApiCreateUserReq):
-        return user_view.create_user(create_user_req.username, create_user_req.password, create_user_req.role)
+    async def create_user(create_user_req: ApiCreateUserReq):
+        return await call_maybe_async(user_view.create_user, create_user_req.username, create_user_req.password,
+                                      create_user_req.role)
 
     app.include_router(router)
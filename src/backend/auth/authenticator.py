@@ -1,4 +1,6 @@
+import hashlib
 import logging
+import time
 from abc import ABC, abstractmethod
 from typing import Any
 from uuid import UUID
@@ -6,20 +8,37 @@ from uuid import UUID
 from fastapi import HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import bindparam, select
+from starlette.concurrency import run_in_threadpool
 
 from backend.model.user import LoggedInUser, User, UserType
-from utils.dbconnection import DbConnection
+from utils.dbconnection import AsyncDbConnection, DbConnection
+from utils.metrics import Histogram
+from utils.ttl_cache import CacheStats, TTLCache
+
+# Built once, so the lookup of every request skips building the statement and its cache key
+_SELECT_USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
 
 
 class Authenticator(ABC):
+    """
+    Authenticates requests. Authenticators are shared by all requests, so they must not keep any
+    per-request state; the authenticated user is handed to the handlers through `RoleChecker`.
+    """
 
     @abstractmethod
     async def authenticate(self, request: Request) -> LoggedInUser:
         pass
 
-    @abstractmethod
-    def get_current_user(self) -> LoggedInUser:
-        pass
+    def invalidate_user(self, username: str) -> None:
+        """
+        Drops what is cached about a user, after the user was created or changed. Every path that
+        changes a user calls it, so the next request of the user sees the change. Authenticators that
+        cache nothing have nothing to drop.
+
+        Args:
+            username (str): The username of the changed user.
+        """
 
 
 class DebugAuthenticator(Authenticator):
@@ -40,29 +59,64 @@ class DebugAuthenticator(Authenticator):
     async def authenticate(self, request: Request) -> LoggedInUser:
         return self._user
 
-    def get_current_user(self) -> LoggedInUser:
-
-        return self._user
-
 
 class JwtAuthenticator(Authenticator):
 
-    def __init__(self, secret_key: str, db_connection: DbConnection) -> None:
+    def __init__(
+        self,
+        secret_key: str,
+        db_connection: DbConnection | AsyncDbConnection,
+        user_cache: TTLCache[str, LoggedInUser] | None = None,
+        auth_duration: Histogram | None = None,
+        token_cache: TTLCache[bytes, dict[str, Any]] | None = None,
+    ) -> None:
+        """
+        Args:
+            secret_key (str): The secret key the access tokens are signed with.
+            db_connection (DbConnection | AsyncDbConnection): The connection the users are looked up with.
+            user_cache (TTLCache[str, LoggedInUser] | None): Caches the looked up users by username, so most
+                requests skip the database. Users are not cached if omitted.
+            auth_duration (Histogram | None): Records the duration of every authentication, labeled with
+                its `result`, 'ok' or 'error'.
+            token_cache (TTLCache[bytes, dict[str, Any]] | None): Caches the verified claims by the SHA-256 digest
+                of the token until the token expires, so repeated requests skip the signature verification.
+                Claims are not cached if omitted.
+        """
         self._oauth = OAuth2PasswordBearer(tokenUrl="token")
         self._secret_key = secret_key
         self._logger = logging.getLogger(__name__)
         self._db_connection = db_connection
-        self._user: LoggedInUser | None = None
+        self._user_cache: TTLCache[str, LoggedInUser] = user_cache if user_cache is not None else TTLCache(0, 0)
+        self._token_cache: TTLCache[bytes, dict[str, Any]] = token_cache if token_cache is not None else TTLCache(0, 0)
+        self._auth_duration = auth_duration
 
     async def authenticate(self, request: Request) -> LoggedInUser:
         """
         Extends call to also validate the token.
         """
+        if self._auth_duration is None:
+            return await self._authenticate(request)
+        start = time.perf_counter()
+        result = "error"
+        try:
+            user = await self._authenticate(request)
+            result = "ok"
+            return user
+        finally:
+            self._auth_duration.observe(time.perf_counter() - start, result=result)
+
+    async def _authenticate(self, request: Request) -> LoggedInUser:
         access_token = await self._get_access_token(request)
-        _, claims = self._extract_token_info(access_token)
+        username = self._verified_claims(access_token).get("sub")
+        if username is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
 
-        self._user = self._validate_and_decode_token(access_token, self._secret_key, claims)
-        return self._user
+        logged_in_user = self._user_cache.get(username)
+        if logged_in_user is None:
+            db_user = await self._get_db_user(username)
+            logged_in_user = LoggedInUser(username=db_user.username, role=db_user.role, id=db_user.id)
+            self._user_cache.put(username, logged_in_user)
+        return logged_in_user
 
     async def _get_access_token(self, request: Request) -> str:
         """
@@ -84,89 +138,102 @@ class JwtAuthenticator(Authenticator):
             self._logger.warning("Failed to retrieve access token. Error: %s", error, exc_info=True)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    def _extract_token_info(self, access_token: str) -> tuple[dict[str, str], dict[str, Any]]:
+    def _verified_claims(self, access_token: str) -> dict[str, Any]:
         """
-        Extracts header and claims information from a given access token.
+        Returns the claims of a JWT access token after verifying its signature and expiry.
+
+        The token is parsed and verified in a single decode. The verified claims are cached by the digest
+        of the token until the token expires, so repeated requests with the same token skip the decode and
+        its signature verification.
 
         Args:
-            access_token (str): The JWT access token from which to extract information.
+            access_token (str): The JWT access token to be verified.
 
         Returns:
-            tuple[dict[str, str], dict[str, Any]]: A tuple containing two dictionaries:
-                - The first dictionary contains the header information.
-                - The second dictionary contains the claims information.
+            dict[str, Any]: The verified claims of the token.
 
         Raises:
-            HTTPException: If the token is malformed or invalid, an HTTP 401 Unauthorized exception is raised.
+            HTTPException: If the token is malformed, its signature is invalid or it has expired, an HTTP 401
+                Unauthorized exception is raised.
         """
 
+        digest = hashlib.sha256(access_token.encode()).digest()
+        claims = self._token_cache.get(digest)
+        if claims is not None:
+            return claims
         try:
-            header = jwt.get_unverified_header(token=access_token) or {}
-            claims = jwt.get_unverified_claims(token=access_token) or {}
-            return header, claims
-        except Exception as error:
-            self._logger.warning("Malformed token received. %s. Error: %s", access_token, error, exc_info=True)
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+            claims = jwt.decode(access_token, key=self._secret_key, algorithms=["HS256"])
+        except JWTError as error:
+            self._logger.warning("Invalid token received. Error: %s", error)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+        self._token_cache.put(digest, claims, _seconds_until_expiry(claims))
+        return claims
 
-    def _validate_and_decode_token(self, access_token: str, key: str, claims: dict[str, Any]):
+    async def _get_db_user(self, username: str) -> User:
         """
-        Validates and decodes a JWT access token.
+        Retrieve a user from the database by username.
+
+        With a synchronous database connection the query runs in the threadpool, so it does not block
+        the event loop. The user is read through a read session, so the lookup may be served by a read
+        replica.
 
         Args:
-            access_token (str): The JWT access token to be validated and decoded.
-            key (str): The secret key used to decode the JWT.
-            claims (dict[str, Any]): The claims extracted from the JWT.
+            username (str): The username of the user to retrieve.
 
         Returns:
-            LoggedInUser: An instance of LoggedInUser containing the username, role, and id of the authenticated user.
+            User: The user object corresponding to the given username.
 
         Raises:
-            HTTPException: If the token is invalid or the credentials could not be validated.
+            HTTPException: If no user is found with the given username, an HTTP 401 Unauthorized exception is raised.
         """
 
-        try:
-            jwt.decode(access_token, key=key, algorithms=["HS256"])
-            username = claims.get("sub")
-            if username is None:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
-            db_user = self._get_db_user(username)
-            return LoggedInUser(username=db_user.username, role=db_user.role, id=db_user.id)
-
-        except JWTError:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+        if isinstance(self._db_connection, AsyncDbConnection):
+            async with self._db_connection.create_read_session(username) as session:
+                user = await session.scalar(_SELECT_USER_BY_USERNAME, {"username": username})
+        else:
+            user = await run_in_threadpool(self._query_db_user, self._db_connection, username)
+        if user is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        return user
+
+    @staticmethod
+    def _query_db_user(db_connection: DbConnection, username: str) -> User | None:
+        with db_connection.create_read_session(username) as session:
+            return session.scalar(_SELECT_USER_BY_USERNAME, {"username": username})
 
-    def _get_db_user(self, username: str) -> User:
+    def invalidate_user(self, username: str) -> None:
         """
-        Retrieve a user from the database by username.
+        Evicts the user from the user cache of this process. The caches of other processes keep the user
+        until the entry expires, after `user_cache_ttl_secs` at the latest.
 
         Args:
-            username (str): The username of the user to retrieve.
+            username (str): The username of the changed user.
+        """
 
-        Returns:
-            User: The user object corresponding to the given username.
+        self._user_cache.invalidate(username)
 
-        Raises:
-            HTTPException: If no user is found with the given username, an HTTP 401 Unauthorized exception is raised.
+    def user_cache_stats(self) -> CacheStats:
         """
+        Return the hit and miss counters of the user cache.
 
-        with self._db_connection.create_session() as session:
-            user = session.query(User).filter(User.username == username).first()
-            if user is None:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-            return user
+        Returns:
+            CacheStats: The current size and hit and miss counters of the user cache.
+        """
+        return self._user_cache.stats()
 
-    def get_current_user(self) -> LoggedInUser:
+    def token_cache_stats(self) -> CacheStats:
         """
-        Retrieve the currently authenticated user.
+        Return the hit and miss counters of the verified-token cache.
 
         Returns:
-            LoggedInUser: The currently authenticated user.
-
-        Raises:
-            HTTPException: If no user is authenticated, raises an HTTP 401 Unauthorized error.
+            CacheStats: The current size and hit and miss counters of the verified-token cache.
         """
+        return self._token_cache.stats()
 
-        if self._user is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
-        return self._user
+def _seconds_until_expiry(claims: dict[str, Any]) -> float | None:
+    """
+    Returns the number of seconds until the `exp` claim, or None if the claims do not expire.
+    """
+    expiry = claims.get("exp")
+    return None if expiry is None else float(expiry) - time.time()
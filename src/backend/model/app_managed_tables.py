@@ -1,12 +1,75 @@
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from sqlalchemy import Connection, Dialect
+from sqlalchemy import Enum as SQLAEnum
+from sqlalchemy import Index, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+from backend.model.schema_fingerprint import SchemaFingerprint
 from backend.model.task import Task
+from backend.model.task_summary import AssigneeTaskCounter
+from backend.model.task_version import AssigneeTaskVersion
 from backend.model.user import User
 from settings import AppSettings
 from utils.dbconnection import DbConnection, SqlDataTableBase
 
-_APP_MANAGED_MODELS: list[type[SqlDataTableBase]] = [Task, User]
+_APP_MANAGED_MODELS: list[type[SqlDataTableBase]] = [
+    Task, User, AssigneeTaskCounter, AssigneeTaskVersion, SchemaFingerprint
+]
 
 _APP_MANAGED_TABLES = [model.__table__ for model in _APP_MANAGED_MODELS]
 
+# The key of the PostgreSQL advisory lock held while the app managed schema is changed
+_SCHEMA_LOCK_KEY = 0x7461736b73
+
+# The time between two attempts to take the schema lock while another instance holds it
+_SCHEMA_LOCK_POLL_SECS = 0.1
+
+# The name the fingerprint of the app managed schema is stored under
+_SCHEMA_NAME = "app_managed"
+
+# The indexes earlier versions created on the app managed tables, which no query needs any more
+_RETIRED_INDEXES = {
+    "tasks": ["ix_tasks_id", "ix_tasks_assignee_id_created_at", "ix_tasks_assignee_id_due_date"],
+}
+
+
+@contextmanager
+def app_managed_schema_lock(db_connection: DbConnection, timeout_secs: float = 600) -> Iterator[None]:
+    """
+    Holds a PostgreSQL advisory lock while the app managed schema is created or its data reconciled,
+    so instances starting at the same time do so one after another instead of racing. The lock is
+    held by a connection of its own, outside of any transaction, and is released when the context
+    exits or the connection is lost. Other databases are not locked.
+
+    The lock is polled with `pg_try_advisory_lock` rather than waited for with `pg_advisory_lock`. A
+    statement waiting for the lock would hold a snapshot, and `CREATE INDEX CONCURRENTLY` run by the
+    holder of the lock waits for every older snapshot, so the two would wait for each other forever.
+    :param db_connection: The database connection to use.
+    :param timeout_secs: How long to wait for the lock, which covers index builds on large tables.
+    :raises TimeoutError: If the lock was not taken within `timeout_secs`.
+    """
+    with db_connection.engine.connect() as connection:
+        if connection.dialect.name != "postgresql":
+            yield
+            return
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        deadline = time.monotonic() + timeout_secs
+        while not connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _SCHEMA_LOCK_KEY}).scalar():
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"The app managed schema lock was not released within {timeout_secs} seconds")
+            time.sleep(_SCHEMA_LOCK_POLL_SECS)
+        try:
+            yield
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _SCHEMA_LOCK_KEY})
+
 
 def drop_app_managed_tables(db_connection: DbConnection):
     """
@@ -18,23 +81,159 @@ def drop_app_managed_tables(db_connection: DbConnection):
         session.commit()
 
 
-def create_app_managed_tables(db_connection: DbConnection):
+def create_app_managed_tables(db_connection: DbConnection, skip_unchanged: bool = False) -> bool:
     """
-    Creates all tables that are managed by the application.
+    Creates all tables that are managed by the application, together with their indexes.
+    Columns and indexes missing on tables that already exist are added by `create_app_managed_columns`
+    and `create_app_managed_indexes`.
+
+    Afterwards the fingerprint of the schema is stored, see `app_managed_schema_fingerprint`. Checking
+    the catalog can then be skipped while the models are unchanged, which saves several catalog
+    queries per table on start-up, but does not restore tables or indexes dropped by hand.
     :param db_connection: The database connection to use.
+    :param skip_unchanged: Whether to skip the catalog checks if the stored fingerprint matches the models.
+    :return: False if the checks were skipped, True if the schema was checked and created.
     """
+    fingerprint = app_managed_schema_fingerprint(db_connection.engine.dialect)
+    if skip_unchanged and _stored_schema_fingerprint(db_connection) == fingerprint:
+        return False
     with db_connection.create_session() as session:
         SqlDataTableBase.metadata.create_all(db_connection.engine, tables=_APP_MANAGED_TABLES, checkfirst=True)
         session.commit()
+    create_app_managed_columns(db_connection)
+    create_app_managed_indexes(db_connection)
+    with db_connection.create_session() as session:
+        stmt = insert(SchemaFingerprint).values(name=_SCHEMA_NAME,
+                                                fingerprint=fingerprint,
+                                                applied_at=datetime.now(timezone.utc))
+        session.execute(
+            stmt.on_conflict_do_update(index_elements=[SchemaFingerprint.name],
+                                       set_={
+                                           "fingerprint": stmt.excluded.fingerprint,
+                                           "applied_at": stmt.excluded.applied_at
+                                       }))
+        session.commit()
+    return True
+
+
+def app_managed_schema_fingerprint(dialect: Dialect) -> str:
+    """
+    Hashes the DDL that creates the app managed tables and their indexes on the given dialect, and the
+    values of their enum types, so any change to the models changes the fingerprint.
+    :param dialect: The dialect of the database.
+    :return: The fingerprint, a hex digest.
+    """
+    digest = hashlib.sha256()
+    for table in _APP_MANAGED_TABLES:
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode("utf-8"))
+        for index in sorted(table.indexes, key=lambda index: str(index.name)):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode("utf-8"))
+        for column in table.columns:
+            if isinstance(column.type, SQLAEnum):
+                digest.update(repr(column.type.enums).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stored_schema_fingerprint(db_connection: DbConnection) -> Optional[str]:
+    with db_connection.engine.connect() as connection:
+        if not inspect(connection).has_table(SchemaFingerprint.__tablename__):
+            return None
+        stmt = select(SchemaFingerprint.fingerprint).where(SchemaFingerprint.name == _SCHEMA_NAME)
+        return connection.execute(stmt).scalar_one_or_none()
+
+
+def create_app_managed_columns(db_connection: DbConnection):
+    """
+    Adds the declared columns that are missing on the app managed tables.
+
+    The columns are added with `ALTER TABLE ... ADD COLUMN`. Adding a stored generated column, such as
+    the task search vector, computes it for every existing row while holding an exclusive lock on the
+    table, so on large tables it should be added during a maintenance window by running this module.
+    :param db_connection: The database connection to use.
+    """
+    logger = logging.getLogger(__name__)
+    with db_connection.engine.connect() as connection:
+        inspector = inspect(connection)
+        for table in _APP_MANAGED_TABLES:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                logger.info("Adding column %s to %s", column.name, table.name)
+                column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(
+                    text(f"ALTER TABLE {connection.dialect.identifier_preparer.format_table(table)} "
+                         f"ADD COLUMN {column_ddl}"))
+        connection.commit()
+
+
+def create_app_managed_indexes(db_connection: DbConnection):
+    """
+    Creates the declared indexes that are missing on the app managed tables, and drops their retired indexes.
+
+    On PostgreSQL the indexes are built with `CREATE INDEX CONCURRENTLY`, which does not block writes
+    to large existing tables. An index left invalid by an interrupted concurrent build is rebuilt.
+    Retired indexes are dropped with `DROP INDEX CONCURRENTLY` for the same reason.
+    :param db_connection: The database connection to use.
+    """
+    logger = logging.getLogger(__name__)
+    with db_connection.engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        postgresql = connection.dialect.name == "postgresql"
+        inspector = inspect(connection)
+        for table in _APP_MANAGED_TABLES:
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            invalid = _invalid_index_names(connection, table.name) if postgresql else set()
+            for index in sorted(table.indexes, key=lambda index: str(index.name)):
+                if index.name in existing and index.name not in invalid:
+                    continue
+                logger.info("Creating index %s on %s", index.name, table.name)
+                if postgresql:
+                    _create_index_concurrently(connection, index, drop_first=index.name in invalid)
+                else:
+                    index.create(connection)
+            for name in _RETIRED_INDEXES.get(table.name, []):
+                if name not in existing:
+                    continue
+                logger.info("Dropping retired index %s on %s", name, table.name)
+                concurrently = "CONCURRENTLY " if postgresql else ""
+                connection.execute(text(f"DROP INDEX {concurrently}IF EXISTS "
+                                        f"{connection.dialect.identifier_preparer.quote(name)}"))
+
+
+def _invalid_index_names(connection: Connection, table_name: str) -> set[str]:
+    rows = connection.execute(
+        text("""
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = to_regclass(:table_name) AND NOT i.indisvalid
+            """),
+        {"table_name": table_name},
+    )
+    return set(rows.scalars())
+
+
+def _create_index_concurrently(connection: Connection, index: Index, drop_first: bool) -> None:
+    preparer = connection.dialect.identifier_preparer
+    name = preparer.quote(str(index.name))
+    if drop_first:
+        connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    columns = ", ".join(preparer.quote(column.name) for column in index.columns)
+    unique = "UNIQUE " if index.unique else ""
+    using = index.dialect_options["postgresql"]["using"]
+    method = f"USING {using} " if using else ""
+    connection.execute(
+        text(f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {name} ON {preparer.format_table(index.table)} "
+             f"{method}({columns})"))
 
 
 def main():
     """
-    Main function for executing this file directly, which creates the app managed tables.
+    Main function for executing this file directly, which creates the app managed tables and indexes.
     """
     config = AppSettings.get_config()
     db_connection = config.db.create()
-    create_app_managed_tables(db_connection)
+    with app_managed_schema_lock(db_connection):
+        create_app_managed_tables(db_connection)
 
 
 if __name__ == "__main__":
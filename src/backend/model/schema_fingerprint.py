@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from utils.dbconnection import SqlDataTableBase
+from utils.sqltypes import UtcDateTime
+
+
+class SchemaFingerprint(SqlDataTableBase):
+    """
+    Represents the fingerprint of a schema the application created.
+
+    The fingerprint is a hash of the DDL the models compile to, stored once the schema has been
+    created. A start whose models hash to the stored fingerprint can skip checking the catalog for
+    missing tables and indexes.
+
+    Attributes:
+        name (str): The name of the schema.
+        fingerprint (str): The hash of the DDL of the schema.
+        applied_at (datetime): The time the schema was last created or checked.
+    """
+
+    __tablename__ = "schema_fingerprints"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String, nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(UtcDateTime, nullable=False)
@@ -4,11 +4,20 @@ from enum import Enum
 from uuid import UUID
 
 from sqlalchemy import UUID as SQLAUUID
-from sqlalchemy import DateTime, ForeignKey, String
+from sqlalchemy import Computed
 from sqlalchemy import Enum as SQLAEnum
+from sqlalchemy import ForeignKey, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from utils.dbconnection import SqlDataTableBase
+from utils.sqltypes import SearchVector, TsVector, UtcDateTime
+
+# The text search configuration the task search vector is built, and searches are parsed with
+TASK_SEARCH_CONFIG = "english"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
 
 
 class TaskStatus(str, Enum):
@@ -41,13 +50,42 @@ class Task(SqlDataTableBase):
         creator_id (UUID): The ID of the user who created the task.
         assignee (User): The user to whom the task is assigned.
         creator (User): The user who created the task.
+        version (int): The number of writes to the task, starting at 1. Every update increases it, so a
+            client can update a task only if it did not change since the client read it.
+        search_vector (str): The full-text search vector of the title and description, generated by the
+            database. Title matches rank higher than description matches. It is deferred, so loading a
+            task does not load it.
+
+    The secondary indexes follow the task list queries: an optional assignee and status filter, ordered
+    by a sort column with the ID as keyset tiebreaker. Every index serves a query shape none of the
+    others can read in order:
+
+    - `(created_at, id)`, `(due_date, id)` and `(status, id)`: the unfiltered list, by each sort column.
+      The composites below lead with a filter column, so they cannot return all tasks in sort order.
+    - `(status, created_at, id)` and `(status, due_date, id)`: the status filtered list. Filtering a
+      sort column index instead reads past every task of the other statuses, which is slow for the
+      rare status of a skewed table, e.g. the few pending tasks among many completed ones.
+    - `(assignee_id, status, created_at, id)`: the per-employee task summary, as an index-only scan,
+      and every list and search of the tasks of one assignee.
+
+    The tasks of one assignee are few enough to be sorted after the assignee prefixed index scan, so
+    no other index leads with the assignee. The primary key finds a task by ID, and the search vector
+    has a GIN index, which finds the tasks matching a search.
     """
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_assignee_id_status_created_at", "assignee_id", "status", "created_at", "id"),
+        Index("ix_tasks_status_created_at", "status", "created_at", "id"),
+        Index("ix_tasks_status_due_date", "status", "due_date", "id"),
+        Index("ix_tasks_status", "status", "id"),
+        Index("ix_tasks_created_at", "created_at", "id"),
+        Index("ix_tasks_due_date", "due_date", "id"),
+        Index("ix_tasks_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[UUID] = mapped_column(
         SQLAUUID,
         primary_key=True,
-        index=True,
         default=uuid.uuid4,
     )
     title: Mapped[str] = mapped_column(String)
@@ -57,15 +95,23 @@ class Task(SqlDataTableBase):
                                                default=TaskStatus.pending,
                                                nullable=False)
 
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now(timezone.utc))
-    due_date: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(UtcDateTime, default=_utc_now)
+    due_date: Mapped[datetime | None] = mapped_column(UtcDateTime, nullable=True)
 
     assignee_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"))
     creator_id: Mapped[UUID] = mapped_column(ForeignKey("users.id"))
 
-    updated_at: Mapped[datetime | None] = mapped_column(DateTime, onupdate=datetime.now(timezone.utc), nullable=True)
+    updated_at: Mapped[datetime | None] = mapped_column(UtcDateTime, onupdate=_utc_now, nullable=True)
     updated_by: Mapped[UUID | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
+
+    search_vector: Mapped[str] = mapped_column(TsVector,
+                                               Computed(SearchVector(TASK_SEARCH_CONFIG, ("title", "A"),
+                                                                     ("description", "B")),
+                                                        persisted=True),
+                                               deferred=True)
 
-    assignee = relationship("User", back_populates="tasks_assigned", foreign_keys=[assignee_id])
-    creator = relationship("User", back_populates="tasks_created", foreign_keys=[creator_id])
-    updater = relationship("User", foreign_keys=[updated_by], back_populates="tasks_updated")
+    # Lazy loading the related users would run a query per task, so it raises instead of querying
+    assignee = relationship("User", back_populates="tasks_assigned", foreign_keys=[assignee_id], lazy="raise_on_sql")
+    creator = relationship("User", back_populates="tasks_created", foreign_keys=[creator_id], lazy="raise_on_sql")
+    updater = relationship("User", foreign_keys=[updated_by], back_populates="tasks_updated", lazy="raise_on_sql")
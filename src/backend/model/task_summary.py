@@ -0,0 +1,26 @@
+from uuid import UUID
+
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from utils.dbconnection import SqlDataTableBase
+
+
+class AssigneeTaskCounter(SqlDataTableBase):
+    """
+    Represents the precomputed task counts of an assignee.
+
+    The rows are maintained by the task write operations when the counter based task summary is
+    enabled, so the summary can be read without aggregating the tasks table.
+
+    Attributes:
+        assignee_id (UUID): The ID of the user the tasks are assigned to.
+        total_tasks (int): The number of tasks assigned to the user.
+        completed_tasks (int): The number of assigned tasks that are completed.
+    """
+
+    __tablename__ = "assignee_task_counters"
+
+    assignee_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_tasks: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    completed_tasks: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,26 @@
+from uuid import UUID
+
+from sqlalchemy import BigInteger, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from utils.dbconnection import SqlDataTableBase
+
+
+class AssigneeTaskVersion(SqlDataTableBase):
+    """
+    Represents the change version of the tasks of an assignee.
+
+    The version is increased by every task write in the same transaction as the write, when task
+    change versions are enabled. Readers therefore see a version at least as old as the tasks they
+    read afterwards, and can tell whether the tasks changed without reading them. Keeping one row per
+    assignee lets writes for different assignees proceed without waiting for each other.
+
+    Attributes:
+        assignee_id (UUID): The ID of the user the tasks are assigned to.
+        version (int): The number of writes to the tasks of the user.
+    """
+
+    __tablename__ = "assignee_task_versions"
+
+    assignee_id: Mapped[UUID] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
@@ -55,17 +55,20 @@ class User(SqlDataTableBase):
         "Task",
         back_populates="assignee",
         foreign_keys='Task.assignee_id',
+        lazy="raise_on_sql",
     )
     tasks_created: Mapped[list["Task"]] = relationship(
         "Task",
         back_populates="creator",
         foreign_keys="Task.creator_id",
+        lazy="raise_on_sql",
     )
 
     tasks_updated: Mapped[list["Task"]] = relationship(
         "Task",
         back_populates="updater",
         foreign_keys="Task.updated_by",
+        lazy="raise_on_sql",
     )
 
 
@@ -1,13 +1,53 @@
-from datetime import datetime
-from typing import Optional
-from uuid import UUID
-
+import csv
+import io
+from datetime import datetime, timezone
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, Optional, Sequence
+from uuid import UUID, uuid4
+
+import orjson
 from fastapi import HTTPException
-from pydantic import BaseModel, ConfigDict
-
-from backend.model.task import Task, TaskStatus
-from backend.model.user import LoggedInUser, User, UserType
-from utils.dbconnection import DbConnection
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.session import Session
+
+from backend.model.task import TaskStatus
+from backend.model.task_summary import AssigneeTaskCounter
+from backend.model.user import LoggedInUser
+from backend.viewdata.task_queries import (
+    TASK_OUT_COLUMNS,
+    completed_delta,
+    delete_summary_counters,
+    delete_task_by_id,
+    encode_task_cursor,
+    insert_employee_task,
+    insert_summary_counters_from_tasks,
+    insert_tasks,
+    notify_task_changes,
+    select_employee_ids,
+    select_employee_task_summary,
+    select_summary_change_version,
+    select_task_change_version,
+    select_task_export,
+    select_task_id,
+    select_task_page,
+    select_task_search_page,
+    select_task_statuses_for_update,
+    task_filters,
+    update_task_status,
+    update_task_statuses,
+    upsert_all_task_versions,
+    upsert_summary_counters,
+    upsert_task_versions,
+)
+from utils.dbconnection import AsyncDbConnection, DbConnection
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_QUERY_LENGTH = 256
+MAX_BULK_SIZE = 5000
+EXPORT_BATCH_SIZE = 1000
 
 
 class TaskBase(BaseModel):
@@ -22,6 +62,8 @@ class TaskCreate(TaskBase):
 
 class TaskUpdate(BaseModel):
     status: TaskStatus
+    # The version of the task the client read, which makes the update fail with 409 Conflict if the task changed since
+    version: Optional[int] = None
 
 
 class TaskOut(BaseModel):
@@ -33,10 +75,83 @@ class TaskOut(BaseModel):
     due_date: Optional[datetime]
     assignee_id: UUID
     creator_id: UUID
+    version: int
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class TaskPage(BaseModel):
+    items: list[TaskOut]
+    next_cursor: Optional[str] = None
+
+
+# A `TaskPage` as JSON serializable values, built from the task rows without validating every task
+TaskPageContent = dict[str, Any]
+
+# The ID, assignee ID, creator ID and status of a written task, which its `TaskChangeEvent` is built from
+TaskChangeKey = tuple[UUID, UUID, UUID, TaskStatus]
+
+# Called by a read of a task list or the summary with the change version of the data, e.g. to derive an
+# ETag from it. Returns True if the caller's copy of the data is current, which skips reading the data.
+ChangeVersionCheck = Callable[..., bool]
+
+
+class TaskExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class TaskBulkCreate(BaseModel):
+    tasks: list[TaskCreate] = Field(min_length=1, max_length=MAX_BULK_SIZE)
+
+
+class TaskStatusChange(TaskUpdate):
+    id: UUID
+
+
+class TaskBulkStatusUpdate(BaseModel):
+    updates: list[TaskStatusChange] = Field(min_length=1, max_length=MAX_BULK_SIZE)
+
+    @field_validator("updates")
+    @classmethod
+    def _unique_task_ids(cls, updates: list[TaskStatusChange]) -> list[TaskStatusChange]:
+        if len({update.id for update in updates}) != len(updates):
+            raise ValueError("Each task may only be updated once per request")
+        return updates
+
+
+class TaskBulkItemResult(BaseModel):
+    status_code: int
+    task: Optional[TaskOut] = None
+    detail: Optional[str] = None
+
+
+class TaskBulkResult(BaseModel):
+    """
+    The results of a bulk operation, in the order of the requested items.
+    """
+
+    items: list[TaskBulkItemResult]
+
+
+class TaskChangeType(str, Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+
+
+class TaskChangeEvent(BaseModel):
+    """
+    A committed change of a task, published to its assignee and its creator.
+    """
+
+    event: TaskChangeType
+    task_id: UUID
+    assignee_id: UUID
+    creator_id: UUID
+    status: TaskStatus
+
+
 class EmployeeTaskSummary(BaseModel):
     employee_id: UUID
     username: str
@@ -46,140 +161,841 @@ class EmployeeTaskSummary(BaseModel):
 
 class ViewTask:
 
-    def __init__(self, db_connection: DbConnection) -> None:
+    def __init__(self,
+                 db_connection: DbConnection,
+                 summary_counters: bool = False,
+                 change_versions: bool = False,
+                 publish_changes: bool = False) -> None:
+        """
+        Args:
+            db_connection (DbConnection): The database connection to use.
+            summary_counters (bool): Whether the employee task summary is read from the per-assignee
+                counters, which the task write operations then keep up to date.
+            change_versions (bool): Whether the task write operations increase the change versions of
+                the assignees, which tell readers whether the tasks changed.
+            publish_changes (bool): Whether the task write operations publish a `TaskChangeEvent` per
+                written task with PostgreSQL NOTIFY, for the task change feed.
+        """
         self._db_connection = db_connection
+        self._summary_counters = summary_counters
+        self._publish_changes = publish_changes
+        self.change_versions = change_versions
 
-    def create_task(self, task: TaskCreate, current_user: LoggedInUser) -> Task:
+    def create_task(self, task: TaskCreate, current_user: LoggedInUser) -> TaskOut:
         """
         Creates a new task and assigns it to an employee.
 
+        The assignee is validated and the task inserted and read back with one
+        `INSERT ... SELECT ... RETURNING` statement, so no row is inserted unless the assignee is an employee.
+
         Args:
             task (TaskCreate): The task details to be created.
             current_user (LoggedInUser): The user who is creating the task.
 
         Returns:
-            Task: The created task object.
+            TaskOut: The created task.
 
         Raises:
             HTTPException: If the assignee is not found or is not an employee.
         """
 
+        stmt = insert_employee_task(_new_task_row(task, current_user, datetime.now(timezone.utc)))
         with self._db_connection.create_session() as session:
-            assignee = session.query(User).filter(User.id == task.assignee_id, User.role == UserType.employee).first()
-            if not assignee:
+            row = session.execute(*stmt).one_or_none()
+            if row is None:
                 raise HTTPException(status_code=404, detail="Assignee not found or not an employee")
-            db_task = Task(title=task.title,
-                           description=task.description,
-                           due_date=task.due_date,
-                           assignee_id=task.assignee_id,
-                           creator_id=current_user.id,
-                           status="Pending")
-            session.add(db_task)
+            self._update_summary_counters(session, {row.assignee_id: (1, 0)})
+            self._update_change_versions(session, {row.assignee_id})
+            self._publish_task_changes(session, TaskChangeType.created, [_task_change_key(row)])
+            session.commit()
+            self._db_connection.record_write(current_user.id)
+            return TaskOut.model_validate(row)
+
+    def create_tasks(self, tasks: list[TaskCreate], current_user: LoggedInUser) -> TaskBulkResult:
+        """
+        Creates many tasks in one transaction.
+
+        The assignees of all tasks are validated with one query, and the tasks with a valid assignee are
+        written with batched multi-row INSERT statements. Tasks whose assignee is not found or not an
+        employee are skipped. The created tasks are read back with `RETURNING`, like the task of `create_task`.
+
+        Args:
+            tasks (list[TaskCreate]): The task details to be created.
+            current_user (LoggedInUser): The user who is creating the tasks.
+
+        Returns:
+            TaskBulkResult: The created task or the error of every requested task.
+        """
+
+        with self._db_connection.create_session() as session:
+            employee_ids = set(session.scalars(select_employee_ids({task.assignee_id for task in tasks})).all())
+            rows = _new_task_rows(tasks, employee_ids, current_user)
+            created = session.execute(insert_tasks(), rows).all() if rows else []
+            self._update_summary_counters(session, _created_task_deltas(created))
+            self._update_change_versions(session, {row.assignee_id for row in created})
+            self._publish_task_changes(session, TaskChangeType.created, [_task_change_key(row) for row in created])
             session.commit()
-            session.refresh(db_task)
-            return db_task
+        self._db_connection.record_write(current_user.id)
+        return _bulk_create_result(tasks, employee_ids, created)
 
     def get_tasks(
         self,
-        assignee_id: Optional[int] = None,
+        assignee_id: Optional[UUID] = None,
         status_filter: Optional[str] = None,
-        sort_by: Optional[str] = None,
-        order: Optional[str] = None,
-    ) -> list[Task]:
+        sort_by: str = "created_at",
+        order: str = "asc",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        current_user: Optional[LoggedInUser] = None,
+        is_current: Optional[ChangeVersionCheck] = None,
+    ) -> Optional[TaskPageContent]:
         """
-        Retrieve a list of tasks based on optional filters and sorting criteria.
+        Retrieve a page of tasks based on optional filters and sorting criteria.
+
+        Like all reads of the task lists and the summary, the page is read through a read session, so it
+        may be served by a read replica, unless the reading user wrote recently.
+
+        Given `is_current`, the change version of the tasks is read first, in the session that then reads
+        the page, and passed to it. The version so comes from the same database as the page and is never
+        newer than the page, so a version can not label a page older than the one it was read for.
 
         Args:
-            assignee_id (Optional[int]): The ID of the assignee to filter tasks by.
+            assignee_id (Optional[UUID]): The ID of the assignee to filter tasks by.
             status_filter (Optional[str]): The status to filter tasks by.
-            sort_by (Optional[str]): The field to sort tasks by.
-            order (Optional[str]): The order of sorting, either 'asc' for ascending or 'desc' for descending.
+            sort_by (str): The field to sort tasks by.
+            order (str): The order of sorting, either 'asc' for ascending or 'desc' for descending.
+            limit (int): The maximum number of tasks in the page.
+            cursor (Optional[str]): The `next_cursor` of the previous page, or None for the first page.
+            current_user (Optional[LoggedInUser]): The reading user.
+            is_current (Optional[ChangeVersionCheck]): Checks the change version of the tasks of the assignee,
+                or of all tasks, before the page is read.
 
         Returns:
-            list[Task]: A list of tasks that match the given filters and sorting criteria.
+            Optional[TaskPageContent]: The tasks that match the given filters and sorting criteria, and the
+                cursor of the next page, or None if `is_current` found the caller's copy current.
+
+        Raises:
+            HTTPException: If the cursor is invalid.
         """
-        with self._db_connection.create_session() as session:
-            query = session.query(Task)
-            if assignee_id:
-                query = query.filter(Task.assignee_id == assignee_id)
-            if status_filter:
-                query = query.filter(Task.status == status_filter)
-            if sort_by:
-                sort_column = getattr(Task, sort_by)
-                sort_column = sort_column.desc() if order == "desc" else sort_column.asc()
-                query = query.order_by(sort_column)
-            return query.all()
-
-    def update_task(self, task_id: UUID, task_update: TaskUpdate, current_user: LoggedInUser) -> Task:
+        stmt = select_task_page(task_filters(assignee_id, status_filter), sort_by, order, limit, cursor)
+        with self._db_connection.create_read_session(_reader(current_user)) as session:
+            if self._is_current(session, is_current, assignee_id):
+                return None
+            return _build_page(session.execute(*stmt).all(), sort_by, order, limit)
+
+    def search_tasks(
+        self,
+        query: str,
+        assignee_id: Optional[UUID] = None,
+        status_filter: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        current_user: Optional[LoggedInUser] = None,
+        is_current: Optional[ChangeVersionCheck] = None,
+    ) -> Optional[TaskPageContent]:
+        """
+        Retrieve a page of the tasks whose title or description matches a full-text search, best match
+        first, with the optional filters and the change version check of `get_tasks`.
+
+        Args:
+            query (str): The search, in web search syntax.
+            assignee_id (Optional[UUID]): The ID of the assignee to filter tasks by.
+            status_filter (Optional[str]): The status to filter tasks by.
+            limit (int): The maximum number of tasks in the page.
+            cursor (Optional[str]): The `next_cursor` of the previous page, or None for the first page.
+            current_user (Optional[LoggedInUser]): The reading user.
+            is_current (Optional[ChangeVersionCheck]): Checks the change version of the tasks of the assignee,
+                or of all tasks, before the page is read.
+
+        Returns:
+            Optional[TaskPageContent]: The matching tasks, and the cursor of the next page, or None if
+                `is_current` found the caller's copy current.
+
+        Raises:
+            HTTPException: If the cursor is invalid.
+        """
+        stmt = select_task_search_page(query, task_filters(assignee_id, status_filter), limit, cursor)
+        with self._db_connection.create_read_session(_reader(current_user)) as session:
+            if self._is_current(session, is_current, assignee_id):
+                return None
+            return _build_page(session.execute(*stmt).all(), "rank", "desc", limit)
+
+    def export_tasks(
+        self,
+        assignee_id: Optional[UUID] = None,
+        status_filter: Optional[str] = None,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        export_format: TaskExportFormat = TaskExportFormat.ndjson,
+        current_user: Optional[LoggedInUser] = None,
+    ) -> Iterator[str]:
+        """
+        Streams all tasks matching the filters of `get_tasks` as NDJSON or CSV.
+
+        The rows are fetched through a server-side cursor in batches of `EXPORT_BATCH_SIZE`, and every
+        batch is encoded into one chunk, so memory use does not grow with the number of exported tasks.
+        The query only runs once iteration starts, and the read session, with its pooled connection and
+        open transaction, is held until the export has been consumed or the iterator is closed.
+
+        Args:
+            assignee_id (Optional[UUID]): The ID of the assignee to filter tasks by.
+            status_filter (Optional[str]): The status to filter tasks by.
+            sort_by (str): The field to sort tasks by.
+            order (str): The order of sorting, either 'asc' for ascending or 'desc' for descending.
+            export_format (TaskExportFormat): The encoding of the tasks.
+            current_user (Optional[LoggedInUser]): The reading user.
+
+        Returns:
+            Iterator[str]: The encoded tasks, in chunks of up to `EXPORT_BATCH_SIZE` tasks.
+        """
+
+        stmt = select_task_export(task_filters(assignee_id, status_filter), sort_by, order)
+        if export_format == TaskExportFormat.csv:
+            yield _csv_line(TASK_OUT_COLUMNS)
+        with self._db_connection.create_read_session(_reader(current_user)) as session:
+            result = session.execute(*stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+            for rows in result.partitions():
+                yield _export_chunk(rows, export_format)
+
+    def update_task(self, task_id: UUID, task_update: TaskUpdate, current_user: LoggedInUser) -> TaskOut:
         """
         Updates the status of an existing task.
 
+        The task is updated and read back with one `UPDATE ... RETURNING` statement, and whether it was
+        found is told from the returned row. If the update carries a version, the task is only updated
+        while its version matches, so concurrent writers do not overwrite each other's changes.
+
         Args:
             task_id (UUID): The unique identifier of the task to be updated.
             task_update (TaskUpdate): An object containing the updated task information.
             current_user (LoggedInUser): The user performing the update.
 
         Returns:
-            Task: The updated task object.
+            TaskOut: The updated task.
 
         Raises:
-            HTTPException: If the task with the given ID is not found.
+            HTTPException: If the task with the given ID is not found, or its version differs.
+        """
+
+        stmt = update_task_status(task_id, task_update.status, current_user.id, datetime.now(timezone.utc),
+                                  task_update.version, self._summary_counters)
+        with self._db_connection.create_session() as session:
+            row = session.execute(*stmt).one_or_none()
+            if row is None:
+                raise _task_not_written(task_update.version is not None
+                                        and session.scalar(*select_task_id(task_id)) is not None)
+            delta = completed_delta(row.old_status, row.status) if self._summary_counters else 0
+            if delta:
+                self._update_summary_counters(session, {row.assignee_id: (0, delta)})
+            self._update_change_versions(session, {row.assignee_id})
+            self._publish_task_changes(session, TaskChangeType.updated, [_task_change_key(row)])
+            session.commit()
+            self._db_connection.record_write(current_user.id)
+            return TaskOut.model_validate(row)
+
+    def update_task_statuses(self, updates: list[TaskStatusChange], current_user: LoggedInUser) -> TaskBulkResult:
+        """
+        Updates the status of many tasks in one transaction.
+
+        The tasks are locked and their current status read with one query, then updated with one
+        multi-row UPDATE statement per target status. Tasks that are not found, or whose version differs
+        from the version of their update, are skipped.
+
+        Args:
+            updates (list[TaskStatusChange]): The task IDs and their new status.
+            current_user (LoggedInUser): The user performing the update.
+
+        Returns:
+            TaskBulkResult: The updated task or the error of every requested update.
         """
 
+        updated_at = datetime.now(timezone.utc)
         with self._db_connection.create_session() as session:
-            db_task = session.query(Task).filter(Task.id == task_id).first()
-            if not db_task:
-                raise HTTPException(status_code=404, detail="Task not found")
-            db_task.status = task_update.status
-            db_task.updated_by = current_user.id
+            rows = session.execute(select_task_statuses_for_update([u.id for u in updates])).all()
+            conflicts = _version_conflicts(updates, rows)
+            current = _current_statuses(row for row in rows if row.id not in conflicts)
+            updated: list[Any] = []
+            for status, task_ids in _task_ids_by_status(updates, current).items():
+                updated.extend(session.execute(update_task_statuses(task_ids, status, current_user.id, updated_at)))
+            self._update_summary_counters(session, _status_change_deltas(updates, current))
+            self._update_change_versions(session, {assignee_id for assignee_id, _ in current.values()})
+            self._publish_task_changes(session, TaskChangeType.updated, [_task_change_key(row) for row in updated])
             session.commit()
-            session.refresh(db_task)
-            return db_task
+        self._db_connection.record_write(current_user.id)
+        return _bulk_update_result(updates, updated, conflicts)
 
-    def delete_task(self, task_id: UUID) -> None:
+    def delete_task(self, task_id: UUID, current_user: LoggedInUser, version: Optional[int] = None) -> None:
         """
-        Deletes a task from the database.
+        Deletes a task from the database with one `DELETE ... RETURNING` statement.
 
         Args:
             task_id (UUID): The ID of the task to be deleted.
+            current_user (LoggedInUser): The user deleting the task.
+            version (Optional[int]): The version of the task the caller read, to only delete the task
+                while it is unchanged.
 
         Raises:
-            HTTPException: If the task with the given ID is not found.
+            HTTPException: If the task with the given ID is not found, or its version differs.
         """
 
         with self._db_connection.create_session() as session:
-            db_task = session.query(Task).filter(Task.id == task_id).first()
-            if not db_task:
-                raise HTTPException(status_code=404, detail="Task not found")
-            session.delete(db_task)
+            row = session.execute(*delete_task_by_id(task_id, version)).one_or_none()
+            if row is None:
+                raise _task_not_written(version is not None and session.scalar(*select_task_id(task_id)) is not None)
+            self._update_summary_counters(session, {row.assignee_id: (-1, completed_delta(row.status, None))})
+            self._update_change_versions(session, {row.assignee_id})
+            self._publish_task_changes(session, TaskChangeType.deleted, [_task_change_key(row)])
             session.commit()
+        self._db_connection.record_write(current_user.id)
 
-    def get_employee_task_summary(self) -> list[EmployeeTaskSummary]:
+    def get_employee_task_summary(
+            self,
+            current_user: Optional[LoggedInUser] = None,
+            is_current: Optional[ChangeVersionCheck] = None) -> Optional[list[EmployeeTaskSummary]]:
         """
         Retrieves a summary of tasks for each employee.
 
-        This method queries the database to get a list of all users with the role "employee".
-        For each employee, it calculates the total number of tasks assigned to them and the number of tasks they have completed.
-        It then returns a list of EmployeeTaskSummary objects containing this information.
+        The total and completed task counts of every employee are either aggregated from the tasks
+        table in a single grouped query, or, when the summary counters are enabled, read from the
+        per-assignee counters. The change version is checked as in `get_tasks`.
+
+        Args:
+            current_user (Optional[LoggedInUser]): The reading user.
+            is_current (Optional[ChangeVersionCheck]): Checks the change version of all tasks and the number
+                of employees, which together determine whether the summary changed, before it is read.
 
         Returns:
-            list[EmployeeTaskSummary]: A list of summaries, each containing the employee's ID, username, total tasks, and completed tasks.
+            Optional[list[EmployeeTaskSummary]]: A list of summaries, each containing the employee's ID, username,
+                total tasks, and completed tasks, or None if `is_current` found the caller's copy current.
+        """
+
+        with self._db_connection.create_read_session(_reader(current_user)) as session:
+            if is_current is not None and is_current(*session.execute(select_summary_change_version()).one()):
+                return None
+            return _build_summary(session.execute(select_employee_task_summary(self._summary_counters)).all())
+
+    def get_task_by_authenticated_user(
+        self,
+        current_user: LoggedInUser,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        is_current: Optional[ChangeVersionCheck] = None,
+    ) -> Optional[TaskPageContent]:
+        """
+        Retrieve a page of the tasks assigned to the authenticated user, with the change version check of `get_tasks`.
+
+        Args:
+            current_user (LoggedInUser): The authenticated user.
+            sort_by (str): The field to sort tasks by.
+            order (str): The order of sorting, either 'asc' for ascending or 'desc' for descending.
+            limit (int): The maximum number of tasks in the page.
+            cursor (Optional[str]): The `next_cursor` of the previous page, or None for the first page.
+            is_current (Optional[ChangeVersionCheck]): Checks the change version of the tasks of the user before
+                the page is read.
+
+        Returns:
+            Optional[TaskPageContent]: The tasks assigned to the user, and the cursor of the next page, or None
+                if `is_current` found the caller's copy current.
+
+        Raises:
+            HTTPException: If the cursor is invalid.
+        """
+        stmt = select_task_page(task_filters(assignee_id=current_user.id), sort_by, order, limit, cursor)
+        with self._db_connection.create_read_session(current_user.id) as session:
+            if self._is_current(session, is_current, current_user.id):
+                return None
+            return _build_page(session.execute(*stmt).all(), sort_by, order, limit)
+
+    def advance_change_versions(self) -> None:
+        """
+        Increases the change version of every user's tasks.
+
+        The versions are only maintained while change versions are enabled, so they are advanced when
+        enabling them, and no version handed out before matches tasks changed in between.
         """
 
         with self._db_connection.create_session() as session:
-            employees = session.query(User).filter(User.role == "employee").all()
-            summary: list[EmployeeTaskSummary] = []
-            for emp in employees:
-                total_tasks = session.query(Task).filter(Task.assignee_id == emp.id).count()
-                completed_tasks = session.query(Task).filter(Task.assignee_id == emp.id,
-                                                             Task.status == TaskStatus.completed).count()
-                summary.append(
-                    EmployeeTaskSummary(employee_id=emp.id,
-                                        username=emp.username,
-                                        total_tasks=total_tasks,
-                                        completed_tasks=completed_tasks))
-            return summary
-
-    def get_task_by_authenticated_user(self, current_user: LoggedInUser) -> list[Task]:
+            session.execute(upsert_all_task_versions())
+            session.commit()
+
+    def rebuild_summary_counters(self) -> None:
+        """
+        Recomputes the per-assignee task counters from the tasks table.
+
+        The counters table is locked against concurrent writers while it is rebuilt, so task writes
+        that are in flight update the rebuilt counters once the rebuild has committed.
+        """
+
         with self._db_connection.create_session() as session:
-            return session.query(Task).filter(Task.assignee_id == current_user.id).all()
+            session.execute(text(f"LOCK TABLE {AssigneeTaskCounter.__tablename__} IN EXCLUSIVE MODE"))
+            session.execute(delete_summary_counters())
+            session.execute(insert_summary_counters_from_tasks())
+            session.commit()
+
+    @staticmethod
+    def _is_current(session: Session, is_current: Optional[ChangeVersionCheck], assignee_id: Optional[UUID]) -> bool:
+        if is_current is None:
+            return False
+        return is_current(session.execute(*select_task_change_version(assignee_id)).scalar_one())
+
+    def _update_summary_counters(self, session: Session, deltas: dict[UUID, tuple[int, int]]) -> None:
+        """
+        Applies task count changes to the per-assignee counters, if the summary counters are enabled.
+
+        Args:
+            session (Session): The session of the task write, so the counters change in the same transaction.
+            deltas (dict[UUID, tuple[int, int]]): The total and completed task count changes per assignee ID.
+        """
+
+        if self._summary_counters and deltas:
+            session.execute(upsert_summary_counters(deltas))
+
+    def _update_change_versions(self, session: Session, assignee_ids: set[UUID]) -> None:
+        """
+        Increases the change versions of the given assignees, if change versions are enabled.
+
+        Args:
+            session (Session): The session of the task write, so the versions change in the same transaction.
+            assignee_ids (set[UUID]): The IDs of the assignees whose tasks are written.
+        """
+
+        if self.change_versions and assignee_ids:
+            session.execute(upsert_task_versions(assignee_ids))
+
+    def _publish_task_changes(self, session: Session, change: TaskChangeType, tasks: list[TaskChangeKey]) -> None:
+        """
+        Publishes the changes of the given tasks, if publishing is enabled.
+
+        Args:
+            session (Session): The session of the task write, so the changes are only published once it commits.
+            change (TaskChangeType): How the tasks were changed.
+            tasks (list[TaskChangeKey]): The written tasks.
+        """
+
+        if self._publish_changes and tasks:
+            session.execute(notify_task_changes(_task_change_payloads(change, tasks)))
+
+
+class AsyncViewTask:
+    """
+    Asyncio counterpart of `ViewTask`, running the same statements through an `AsyncDbConnection`.
+    """
+
+    def __init__(self,
+                 db_connection: AsyncDbConnection,
+                 summary_counters: bool = False,
+                 change_versions: bool = False,
+                 publish_changes: bool = False) -> None:
+        """
+        Args:
+            db_connection (AsyncDbConnection): The asyncio database connection to use.
+            summary_counters (bool): Whether the employee task summary is read from the per-assignee
+                counters, which the task write operations then keep up to date.
+            change_versions (bool): Whether the task write operations increase the change versions of
+                the assignees, which tell readers whether the tasks changed.
+            publish_changes (bool): Whether the task write operations publish a `TaskChangeEvent` per
+                written task with PostgreSQL NOTIFY, for the task change feed.
+        """
+        self._db_connection = db_connection
+        self._summary_counters = summary_counters
+        self._publish_changes = publish_changes
+        self.change_versions = change_versions
+
+    async def create_task(self, task: TaskCreate, current_user: LoggedInUser) -> TaskOut:
+        """
+        See `ViewTask.create_task`.
+        """
+
+        stmt = insert_employee_task(_new_task_row(task, current_user, datetime.now(timezone.utc)))
+        async with self._db_connection.create_session() as session:
+            row = (await session.execute(*stmt)).one_or_none()
+            if row is None:
+                raise HTTPException(status_code=404, detail="Assignee not found or not an employee")
+            await self._update_summary_counters(session, {row.assignee_id: (1, 0)})
+            await self._update_change_versions(session, {row.assignee_id})
+            await self._publish_task_changes(session, TaskChangeType.created, [_task_change_key(row)])
+            await session.commit()
+            self._db_connection.record_write(current_user.id)
+            return TaskOut.model_validate(row)
+
+    async def create_tasks(self, tasks: list[TaskCreate], current_user: LoggedInUser) -> TaskBulkResult:
+        """
+        See `ViewTask.create_tasks`.
+        """
+
+        async with self._db_connection.create_session() as session:
+            employee_ids = set((await session.scalars(select_employee_ids({task.assignee_id for task in tasks}))).all())
+            rows = _new_task_rows(tasks, employee_ids, current_user)
+            created = (await session.execute(insert_tasks(), rows)).all() if rows else []
+            await self._update_summary_counters(session, _created_task_deltas(created))
+            await self._update_change_versions(session, {row.assignee_id for row in created})
+            await self._publish_task_changes(session, TaskChangeType.created,
+                                             [_task_change_key(row) for row in created])
+            await session.commit()
+        self._db_connection.record_write(current_user.id)
+        return _bulk_create_result(tasks, employee_ids, created)
+
+    async def get_tasks(
+        self,
+        assignee_id: Optional[UUID] = None,
+        status_filter: Optional[str] = None,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        current_user: Optional[LoggedInUser] = None,
+        is_current: Optional[ChangeVersionCheck] = None,
+    ) -> Optional[TaskPageContent]:
+        """
+        See `ViewTask.get_tasks`.
+        """
+
+        stmt = select_task_page(task_filters(assignee_id, status_filter), sort_by, order, limit, cursor)
+        async with self._db_connection.create_read_session(_reader(current_user)) as session:
+            if await self._is_current(session, is_current, assignee_id):
+                return None
+            return _build_page((await session.execute(*stmt)).all(), sort_by, order, limit)
+
+    async def search_tasks(
+        self,
+        query: str,
+        assignee_id: Optional[UUID] = None,
+        status_filter: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        current_user: Optional[LoggedInUser] = None,
+        is_current: Optional[ChangeVersionCheck] = None,
+    ) -> Optional[TaskPageContent]:
+        """
+        See `ViewTask.search_tasks`.
+        """
+
+        stmt = select_task_search_page(query, task_filters(assignee_id, status_filter), limit, cursor)
+        async with self._db_connection.create_read_session(_reader(current_user)) as session:
+            if await self._is_current(session, is_current, assignee_id):
+                return None
+            return _build_page((await session.execute(*stmt)).all(), "rank", "desc", limit)
+
+    async def export_tasks(
+        self,
+        assignee_id: Optional[UUID] = None,
+        status_filter: Optional[str] = None,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        export_format: TaskExportFormat = TaskExportFormat.ndjson,
+        current_user: Optional[LoggedInUser] = None,
+    ) -> AsyncIterator[str]:
+        """
+        See `ViewTask.export_tasks`.
+        """
+
+        stmt = select_task_export(task_filters(assignee_id, status_filter), sort_by, order)
+        if export_format == TaskExportFormat.csv:
+            yield _csv_line(TASK_OUT_COLUMNS)
+        async with self._db_connection.create_read_session(_reader(current_user)) as session:
+            result = await session.stream(*stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+            async for rows in result.partitions():
+                yield _export_chunk(rows, export_format)
+
+    async def update_task(self, task_id: UUID, task_update: TaskUpdate, current_user: LoggedInUser) -> TaskOut:
+        """
+        See `ViewTask.update_task`.
+        """
+
+        stmt = update_task_status(task_id, task_update.status, current_user.id, datetime.now(timezone.utc),
+                                  task_update.version, self._summary_counters)
+        async with self._db_connection.create_session() as session:
+            row = (await session.execute(*stmt)).one_or_none()
+            if row is None:
+                raise _task_not_written(task_update.version is not None
+                                        and await session.scalar(*select_task_id(task_id)) is not None)
+            delta = completed_delta(row.old_status, row.status) if self._summary_counters else 0
+            if delta:
+                await self._update_summary_counters(session, {row.assignee_id: (0, delta)})
+            await self._update_change_versions(session, {row.assignee_id})
+            await self._publish_task_changes(session, TaskChangeType.updated, [_task_change_key(row)])
+            await session.commit()
+            self._db_connection.record_write(current_user.id)
+            return TaskOut.model_validate(row)
+
+    async def update_task_statuses(self, updates: list[TaskStatusChange], current_user: LoggedInUser) -> TaskBulkResult:
+        """
+        See `ViewTask.update_task_statuses`.
+        """
+
+        updated_at = datetime.now(timezone.utc)
+        async with self._db_connection.create_session() as session:
+            rows = (await session.execute(select_task_statuses_for_update([u.id for u in updates]))).all()
+            conflicts = _version_conflicts(updates, rows)
+            current = _current_statuses(row for row in rows if row.id not in conflicts)
+            updated: list[Any] = []
+            for status, task_ids in _task_ids_by_status(updates, current).items():
+                updated.extend(await session.execute(update_task_statuses(task_ids, status, current_user.id,
+                                                                          updated_at)))
+            await self._update_summary_counters(session, _status_change_deltas(updates, current))
+            await self._update_change_versions(session, {assignee_id for assignee_id, _ in current.values()})
+            await self._publish_task_changes(session, TaskChangeType.updated,
+                                             [_task_change_key(row) for row in updated])
+            await session.commit()
+        self._db_connection.record_write(current_user.id)
+        return _bulk_update_result(updates, updated, conflicts)
+
+    async def delete_task(self, task_id: UUID, current_user: LoggedInUser, version: Optional[int] = None) -> None:
+        """
+        See `ViewTask.delete_task`.
+        """
+
+        async with self._db_connection.create_session() as session:
+            row = (await session.execute(*delete_task_by_id(task_id, version))).one_or_none()
+            if row is None:
+                raise _task_not_written(version is not None
+                                        and await session.scalar(*select_task_id(task_id)) is not None)
+            await self._update_summary_counters(session, {row.assignee_id: (-1, completed_delta(row.status, None))})
+            await self._update_change_versions(session, {row.assignee_id})
+            await self._publish_task_changes(session, TaskChangeType.deleted, [_task_change_key(row)])
+            await session.commit()
+        self._db_connection.record_write(current_user.id)
+
+    async def get_employee_task_summary(
+            self,
+            current_user: Optional[LoggedInUser] = None,
+            is_current: Optional[ChangeVersionCheck] = None) -> Optional[list[EmployeeTaskSummary]]:
+        """
+        See `ViewTask.get_employee_task_summary`.
+        """
+
+        async with self._db_connection.create_read_session(_reader(current_user)) as session:
+            if is_current is not None and is_current(*(await session.execute(select_summary_change_version())).one()):
+                return None
+            rows = (await session.execute(select_employee_task_summary(self._summary_counters))).all()
+            return _build_summary(rows)
+
+    async def get_task_by_authenticated_user(
+        self,
+        current_user: LoggedInUser,
+        sort_by: str = "created_at",
+        order: str = "asc",
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        is_current: Optional[ChangeVersionCheck] = None,
+    ) -> Optional[TaskPageContent]:
+        """
+        See `ViewTask.get_task_by_authenticated_user`.
+        """
+
+        stmt = select_task_page(task_filters(assignee_id=current_user.id), sort_by, order, limit, cursor)
+        async with self._db_connection.create_read_session(current_user.id) as session:
+            if await self._is_current(session, is_current, current_user.id):
+                return None
+            return _build_page((await session.execute(*stmt)).all(), sort_by, order, limit)
+
+    @staticmethod
+    async def _is_current(session: AsyncSession, is_current: Optional[ChangeVersionCheck],
+                          assignee_id: Optional[UUID]) -> bool:
+        if is_current is None:
+            return False
+        return is_current((await session.execute(*select_task_change_version(assignee_id))).scalar_one())
+
+    async def _update_summary_counters(self, session: AsyncSession, deltas: dict[UUID, tuple[int, int]]) -> None:
+        if self._summary_counters and deltas:
+            await session.execute(upsert_summary_counters(deltas))
+
+    async def _update_change_versions(self, session: AsyncSession, assignee_ids: set[UUID]) -> None:
+        if self.change_versions and assignee_ids:
+            await session.execute(upsert_task_versions(assignee_ids))
+
+    async def _publish_task_changes(self, session: AsyncSession, change: TaskChangeType,
+                                    tasks: list[TaskChangeKey]) -> None:
+        if self._publish_changes and tasks:
+            await session.execute(notify_task_changes(_task_change_payloads(change, tasks)))
+
+
+def _reader(current_user: Optional[LoggedInUser]) -> Optional[UUID]:
+    return current_user.id if current_user is not None else None
+
+
+def _new_task_row(task: TaskCreate, current_user: LoggedInUser, created_at: datetime) -> dict[str, Any]:
+    """
+    Builds the INSERT parameters of a task, the values of `TASK_INSERT_COLUMNS`.
+    """
+
+    return {
+        "id": uuid4(),
+        "title": task.title,
+        "description": task.description,
+        "due_date": task.due_date,
+        "assignee_id": task.assignee_id,
+        "creator_id": current_user.id,
+        "status": TaskStatus.pending,
+        "created_at": created_at,
+        "version": 1,
+    }
+
+
+def _new_task_rows(tasks: list[TaskCreate], employee_ids: set[UUID],
+                   current_user: LoggedInUser) -> list[dict[str, Any]]:
+    """
+    Builds the INSERT parameters of the tasks whose assignee is an employee.
+    """
+
+    created_at = datetime.now(timezone.utc)
+    return [_new_task_row(task, current_user, created_at) for task in tasks if task.assignee_id in employee_ids]
+
+
+def _task_not_written(task_exists: bool) -> HTTPException:
+    """
+    The error of a task update or delete that matched no row, because the task is not found or, if it
+    exists, because its version differs from the version the client read.
+    """
+
+    if task_exists:
+        return HTTPException(status_code=409, detail="Task was changed since it was read")
+    return HTTPException(status_code=404, detail="Task not found")
+
+
+def _task_change_key(task: Any) -> TaskChangeKey:
+    return task.id, task.assignee_id, task.creator_id, task.status
+
+
+def _task_change_payloads(change: TaskChangeType, tasks: list[TaskChangeKey]) -> list[str]:
+    return [
+        TaskChangeEvent(event=change, task_id=task_id, assignee_id=assignee_id, creator_id=creator_id,
+                        status=status).model_dump_json() for task_id, assignee_id, creator_id, status in tasks
+    ]
+
+
+def _created_task_deltas(created: Sequence[Any]) -> dict[UUID, tuple[int, int]]:
+    deltas: dict[UUID, tuple[int, int]] = {}
+    for row in created:
+        total, completed = deltas.get(row.assignee_id, (0, 0))
+        deltas[row.assignee_id] = (total + 1, completed)
+    return deltas
+
+
+def _bulk_create_result(tasks: list[TaskCreate], employee_ids: set[UUID], created: Sequence[Any]) -> TaskBulkResult:
+    """
+    Pairs the requested tasks with the returned rows, which are in the order of the tasks with a valid assignee.
+    """
+
+    rows = iter(created)
+    items: list[TaskBulkItemResult] = []
+    for task in tasks:
+        if task.assignee_id in employee_ids:
+            items.append(TaskBulkItemResult(status_code=200, task=TaskOut.model_validate(dict(next(rows)._mapping))))
+        else:
+            items.append(TaskBulkItemResult(status_code=404, detail="Assignee not found or not an employee"))
+    return TaskBulkResult(items=items)
+
+
+def _version_conflicts(updates: list[TaskStatusChange], rows: Sequence[Any]) -> set[UUID]:
+    """
+    Collects the IDs of the locked tasks whose version differs from the version of their update.
+    """
+
+    versions = {row.id: row.version for row in rows}
+    return {
+        update.id
+        for update in updates
+        if update.version is not None and update.id in versions and versions[update.id] != update.version
+    }
+
+
+def _current_statuses(rows: Iterable[Any]) -> dict[UUID, tuple[UUID, TaskStatus]]:
+    """
+    Maps the task IDs to their assignee ID and current status.
+    """
+
+    return {row.id: (row.assignee_id, row.status) for row in rows}
+
+
+def _task_ids_by_status(updates: list[TaskStatusChange],
+                        current: dict[UUID, tuple[UUID, TaskStatus]]) -> dict[TaskStatus, list[UUID]]:
+    task_ids: dict[TaskStatus, list[UUID]] = {}
+    for update in updates:
+        if update.id in current:
+            task_ids.setdefault(update.status, []).append(update.id)
+    return task_ids
+
+
+def _status_change_deltas(updates: list[TaskStatusChange],
+                          current: dict[UUID, tuple[UUID, TaskStatus]]) -> dict[UUID, tuple[int, int]]:
+    deltas: dict[UUID, tuple[int, int]] = {}
+    for update in updates:
+        if update.id not in current:
+            continue
+        assignee_id, old_status = current[update.id]
+        delta = completed_delta(old_status, update.status)
+        if delta:
+            deltas[assignee_id] = (0, deltas.get(assignee_id, (0, 0))[1] + delta)
+    return deltas
+
+
+def _bulk_update_result(updates: list[TaskStatusChange], updated: Sequence[Any],
+                        conflicts: set[UUID]) -> TaskBulkResult:
+    tasks = {row.id: dict(row._mapping) for row in updated}
+    items: list[TaskBulkItemResult] = []
+    for update in updates:
+        if update.id in tasks:
+            items.append(TaskBulkItemResult(status_code=200, task=TaskOut.model_validate(tasks[update.id])))
+        elif update.id in conflicts:
+            items.append(TaskBulkItemResult(status_code=409, detail="Task was changed since it was read"))
+        else:
+            items.append(TaskBulkItemResult(status_code=404, detail="Task not found"))
+    return TaskBulkResult(items=items)
+
+
+def _build_page(rows: Sequence[Any], sort_by: str, order: str, limit: int) -> TaskPageContent:
+    """
+    Builds a task page from the rows of `select_task_page` or `select_task_search_page`, which hold one
+    task more than the page if a next page exists.
+    """
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_task_cursor(rows[-1], sort_by, order)
+    return {"items": [dict(zip(TASK_OUT_COLUMNS, row)) for row in rows], "next_cursor": next_cursor}
+
+
+def _export_chunk(rows: Sequence[Any], export_format: TaskExportFormat) -> str:
+    """
+    Encodes a batch of `select_task_export` rows. The plain column values are encoded as they are, like
+    the task pages the API encodes with orjson, without validating every task as a `TaskOut`.
+    """
+
+    if export_format == TaskExportFormat.csv:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+        return buffer.getvalue()
+    return b"".join(orjson.dumps(dict(zip(TASK_OUT_COLUMNS, row)), option=orjson.OPT_APPEND_NEWLINE)
+                    for row in rows).decode()
+
+
+def _csv_value(value: Any) -> Any:
+    """
+    Formats a column value as its JSON encoding does: enums as their value and timestamps in ISO 8601.
+    """
+
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_line(values: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
+
+
+def _build_summary(rows: Sequence[Any]) -> list[EmployeeTaskSummary]:
+    return [
+        EmployeeTaskSummary(employee_id=employee_id,
+                            username=username,
+                            total_tasks=total_tasks,
+                            completed_tasks=completed_tasks)
+        for employee_id, username, total_tasks, completed_tasks in rows
+    ]
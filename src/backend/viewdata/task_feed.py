@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from uuid import UUID
+
+from pydantic import ValidationError
+
+from backend.viewdata.task import TaskChangeEvent
+
+
+class TaskChangeSubscription:
+    """
+    The pending task changes of one connected client.
+
+    The changes are queued up to a bound. A client that falls further behind, or whose changes may
+    have been missed, receives None in place of its pending changes, telling it to read its tasks again.
+    """
+
+    def __init__(self, user_id: UUID, max_pending: int) -> None:
+        """
+        Args:
+            user_id (UUID): The ID of the subscribed user.
+            max_pending (int): The number of changes queued before the client has to read its tasks again.
+        """
+        self.user_id = user_id
+        self._queue: asyncio.Queue[Optional[TaskChangeEvent]] = asyncio.Queue(max_pending)
+
+    async def get(self) -> Optional[TaskChangeEvent]:
+        """
+        Waits for the next change.
+
+        Returns:
+            Optional[TaskChangeEvent]: The change, or None if changes were missed.
+        """
+        return await self._queue.get()
+
+    def put(self, event: TaskChangeEvent) -> None:
+        if self._queue.full():
+            self.resync()
+        else:
+            self._queue.put_nowait(event)
+
+    def resync(self) -> None:
+        # The pending changes are superseded by reading the tasks again
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class TaskChangeFeed:
+    """
+    Fans the published task changes out to the subscriptions of the connected clients.
+
+    Every change is passed to the subscriptions of the task's assignee and creator. A process runs one
+    feed, which receives the changes from one `PgNotificationListener`, and is only used in its event loop.
+    """
+
+    def __init__(self, max_pending: int = 100) -> None:
+        """
+        Args:
+            max_pending (int): The number of changes queued per subscription, see `TaskChangeSubscription`.
+        """
+        self._max_pending = max_pending
+        self._subscriptions: dict[UUID, set[TaskChangeSubscription]] = {}
+        self._logger = logging.getLogger(__name__)
+
+    @property
+    def subscription_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    @contextmanager
+    def subscribe(self, user_id: UUID) -> Iterator[TaskChangeSubscription]:
+        """
+        Subscribes to the changes of the tasks assigned to or created by a user, until the context exits.
+
+        Args:
+            user_id (UUID): The ID of the user.
+
+        Returns:
+            Iterator[TaskChangeSubscription]: The subscription.
+        """
+        subscription = TaskChangeSubscription(user_id, self._max_pending)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscriptions = self._subscriptions[user_id]
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[user_id]
+
+    def dispatch(self, payload: str) -> None:
+        """
+        Passes a published change to the subscriptions of the task's assignee and creator.
+
+        Args:
+            payload (str): The change, a `TaskChangeEvent` as JSON.
+        """
+        try:
+            event = TaskChangeEvent.model_validate_json(payload)
+        except ValidationError:
+            self._logger.warning("Ignoring invalid task change %r", payload)
+            return
+        for user_id in {event.assignee_id, event.creator_id}:
+            for subscription in self._subscriptions.get(user_id, ()):
+                subscription.put(event)
+
+    def resync(self) -> None:
+        """
+        Tells all subscriptions that changes may have been missed, e.g. while the listener reconnected.
+        """
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.resync()
@@ -0,0 +1,578 @@
+"""
+SQL statements of the task views.
+
+The statements are shared by the synchronous and the asyncio task views, so both run exactly the
+same SQL, and can be inspected without executing them.
+
+The statements of the hot reads are built once per shape, e.g. per combination of filters and sort
+order, with the values of a query as bind parameters. They are returned as a `BoundStatement` and
+executed with `session.execute(*bound_statement)`. Reusing the statement objects skips building
+them and their cache key on every query, which costs more Python time than executing them.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Collection, Optional
+from uuid import UUID
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    ColumnElement,
+    Delete,
+    Double,
+    Insert,
+    Integer,
+    Select,
+    String,
+    Text,
+    Update,
+    bindparam,
+    cast,
+    delete,
+    func,
+    literal,
+    select,
+    true,
+    tuple_,
+    type_coerce,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, REGCONFIG, insert
+from sqlalchemy.orm import InstrumentedAttribute
+
+from backend.model.task import TASK_SEARCH_CONFIG, Task, TaskStatus
+from backend.model.task_summary import AssigneeTaskCounter
+from backend.model.task_version import AssigneeTaskVersion
+from backend.model.user import User, UserType
+from utils.cursor import decode_cursor, encode_cursor
+from utils.sqltypes import UuidText
+
+TASK_OUT_COLUMNS = ("id", "title", "description", "status", "created_at", "due_date", "assignee_id", "creator_id",
+                    "version")
+TASK_OUT_UUID_COLUMNS = ("id", "assignee_id", "creator_id")
+TASK_INSERT_COLUMNS = ("id", "title", "description", "due_date", "assignee_id", "creator_id", "status", "created_at",
+                       "version")
+
+# The PostgreSQL notification channel the task views publish task changes on
+TASK_CHANGES_CHANNEL = "task_changes"
+
+SORT_COLUMNS: dict[str, InstrumentedAttribute[Any]] = {
+    "created_at": Task.created_at,
+    "due_date": Task.due_date,
+    "status": Task.status,
+}
+
+# A statement and the values of its bind parameters
+BoundStatement = tuple[Select[Any] | Insert | Update | Delete, dict[str, Any]]
+
+_SELECT_TASK_ID = select(Task.id).where(Task.id == bindparam("task_id"))
+_SELECT_ASSIGNEE_TASK_VERSION = select(func.coalesce(func.max(
+    AssigneeTaskVersion.version), 0)).where(AssigneeTaskVersion.assignee_id == bindparam("assignee_id"))
+_SELECT_TASK_VERSION = select(func.coalesce(func.sum(AssigneeTaskVersion.version), 0))
+
+
+def task_out_text_columns() -> list[ColumnElement[Any]]:
+    """
+    The `TaskOut` columns with the UUIDs read as text, for rows that are serialized without being
+    validated into a `TaskOut`. Constructing a UUID object per value costs the driver more than
+    fetching the rest of the row.
+    """
+
+    table = Task.__table__
+    return [
+        type_coerce(table.c[name], UuidText()).label(name) if name in TASK_OUT_UUID_COLUMNS else table.c[name]
+        for name in TASK_OUT_COLUMNS
+    ]
+
+
+def select_employee_ids(user_ids: Collection[UUID]) -> Select[tuple[UUID]]:
+    """
+    Selects the IDs of the given users that are employees.
+    """
+
+    return select(User.id).where(User.id.in_(user_ids), User.role == UserType.employee)
+
+
+@lru_cache(maxsize=None)
+def insert_tasks() -> Insert:
+    """
+    Inserts tasks and returns the output columns of the inserted tasks. Executed with a list of
+    parameter sets, the rows are sent as batched multi-row INSERT statements, and returned in the order
+    of the parameter sets.
+    """
+
+    table = Task.__table__
+    return insert(table).returning(*[table.c[name] for name in TASK_OUT_COLUMNS], sort_by_parameter_order=True)
+
+
+def insert_employee_task(values: dict[str, Any]) -> BoundStatement:
+    """
+    Inserts a task if its assignee is an employee, in one `INSERT ... SELECT` statement that selects
+    the values from the row of the assignee, and returns the output columns of the inserted task. No
+    task is inserted, and no row returned, if the assignee is not found or not an employee.
+
+    Args:
+        values (dict[str, Any]): The value of every column in `TASK_INSERT_COLUMNS`.
+    """
+
+    return _insert_employee_task_statement(), values
+
+
+@lru_cache(maxsize=None)
+def _insert_employee_task_statement() -> Insert:
+    table = Task.__table__
+    values = select(*[bindparam(name, type_=table.c[name].type) for name in TASK_INSERT_COLUMNS])
+    values = values.where(User.id == bindparam("assignee_id"), User.role == UserType.employee)
+    stmt = insert(table).from_select(TASK_INSERT_COLUMNS, values)
+    return stmt.returning(*[table.c[name] for name in TASK_OUT_COLUMNS])
+
+
+def select_task_statuses_for_update(task_ids: Collection[UUID]) -> Select[tuple[UUID, UUID, TaskStatus]]:
+    """
+    Selects and locks the assignee and status of the given tasks. The rows are locked in ID order, so
+    concurrent bulk updates of overlapping tasks can not deadlock.
+    """
+
+    return select(Task.id, Task.assignee_id, Task.status,
+                  Task.version).where(Task.id.in_(task_ids)).order_by(Task.id).with_for_update()
+
+
+def update_task_statuses(task_ids: Collection[UUID], status: TaskStatus, updated_by: UUID,
+                         updated_at: datetime) -> Update:
+    """
+    Sets the status of the given tasks in one statement, increasing their version, and returns the updated rows.
+    """
+
+    table = Task.__table__
+    stmt = update(table).where(table.c.id.in_(task_ids))
+    stmt = stmt.values(status=status, updated_by=updated_by, updated_at=updated_at, version=table.c.version + 1)
+    return stmt.returning(*[table.c[name] for name in TASK_OUT_COLUMNS])
+
+
+def update_task_status(task_id: UUID, status: TaskStatus, updated_by: UUID, updated_at: datetime,
+                       version: Optional[int], returning_old_status: bool) -> BoundStatement:
+    """
+    Sets the status of a task and increases its version in one statement, which returns the output
+    columns of the updated task. No row is returned if the task is not found or, given a version, if
+    its version differs.
+
+    RETURNING only sees the updated row. With `returning_old_status` the task is therefore joined with
+    its row locked by a subquery, whose status from before the update is returned as `old_status`.
+    Returning columns of a joined table requires PostgreSQL; SQLite only returns the updated table.
+    """
+
+    params = {"task_id": task_id, "new_status": status, "user_id": updated_by, "now": updated_at}
+    if version is not None:
+        params["expected_version"] = version
+    return _update_task_status_statement(version is not None, returning_old_status), params
+
+
+@lru_cache(maxsize=None)
+def _update_task_status_statement(check_version: bool, returning_old_status: bool) -> Update:
+    table = Task.__table__
+    stmt = update(table).where(table.c.id == bindparam("task_id"))
+    if check_version:
+        stmt = stmt.where(table.c.version == bindparam("expected_version"))
+    stmt = stmt.values(status=bindparam("new_status", type_=table.c.status.type),
+                       updated_by=bindparam("user_id", type_=table.c.updated_by.type),
+                       updated_at=bindparam("now", type_=table.c.updated_at.type),
+                       version=table.c.version + 1)
+    returning = [table.c[name] for name in TASK_OUT_COLUMNS]
+    if returning_old_status:
+        old = select(table.c.id, table.c.status.label("old_status")).where(
+            table.c.id == bindparam("task_id")).with_for_update().subquery("old")
+        stmt = stmt.where(table.c.id == old.c.id)
+        returning.append(old.c.old_status)
+    return stmt.returning(*returning)
+
+
+def delete_task_by_id(task_id: UUID, version: Optional[int]) -> BoundStatement:
+    """
+    Deletes a task in one statement, which returns the ID, assignee ID, creator ID and status of the
+    deleted task. No row is returned if the task is not found or, given a version, if its version differs.
+    """
+
+    params: dict[str, Any] = {"task_id": task_id}
+    if version is not None:
+        params["expected_version"] = version
+    return _delete_task_statement(version is not None), params
+
+
+@lru_cache(maxsize=None)
+def _delete_task_statement(check_version: bool) -> Delete:
+    table = Task.__table__
+    stmt = delete(table).where(table.c.id == bindparam("task_id"))
+    if check_version:
+        stmt = stmt.where(table.c.version == bindparam("expected_version"))
+    return stmt.returning(table.c.id, table.c.assignee_id, table.c.creator_id, table.c.status)
+
+
+def task_filters(assignee_id: Optional[UUID] = None, status_filter: Optional[str] = None) -> dict[str, Any]:
+    """
+    Collects the values of the optional task list filters, the bind parameters of the conditions
+    added by `_filter_criteria`.
+    """
+
+    filters: dict[str, Any] = {}
+    if assignee_id:
+        filters["assignee_id"] = assignee_id
+    if status_filter:
+        filters["status"] = status_filter
+    return filters
+
+
+def select_task_page(
+    filters: dict[str, Any],
+    sort_by: str,
+    order: str,
+    limit: int,
+    cursor: Optional[str],
+) -> BoundStatement:
+    """
+    Selects the output columns of one page of tasks using keyset pagination.
+
+    The tasks are ordered by the sort column with the task ID as tiebreaker, and the page starts right
+    after the task the cursor points to. The cursor position bounds the scan of the `(sort column, id)`
+    index, so every page reads about as many index entries as it returns, however deep the client
+    pages. One task more than `limit` is selected to tell whether a next page exists. Plain columns are
+    selected, so the rows are not loaded into ORM objects.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+
+    params = {**filters, "limit": limit + 1}
+    cursor_at_null = None
+    if cursor:
+        sort_value, params["cursor_id"] = _decode_task_cursor(cursor, sort_by, order)
+        cursor_at_null = sort_value is None
+        if not cursor_at_null:
+            params["cursor_value"] = sort_value
+    return _task_page_statement(tuple(filters), sort_by, order, cursor_at_null), params
+
+
+@lru_cache(maxsize=None)
+def _task_page_statement(filters: tuple[str, ...], sort_by: str, order: str,
+                         cursor_at_null: Optional[bool]) -> Select[Any]:
+    """
+    Builds the statement of `select_task_page` for the given filters, sort order and cursor position,
+    which is None without a cursor.
+
+    The tasks after the cursor are selected as one or more ranges of the sort order, each of which
+    PostgreSQL scans from a bound on the `(sort column, id)` index:
+
+    - Non-NULL sort values after the cursor position, by a row value comparison with it.
+    - The status has three values, so most tasks tie on it. The row value comparison would be
+      estimated by its first column alone, and started at the first task of the status when the list
+      is filtered by status, so the rest of the status of the cursor, by ID, and the following statuses
+      are selected as two ranges instead.
+    - NULL sort values sort last in ascending and first in descending order, as PostgreSQL does by
+      default, and can not be compared with a sort value, so they are selected as a range of their own.
+
+    Several ranges are merged, ordered and limited again.
+    """
+
+    column = SORT_COLUMNS[sort_by]
+    descending = order == "desc"
+    if cursor_at_null is None:
+        return _task_range(filters, column, descending)
+
+    task_id = bindparam("cursor_id", type_=Task.id.type)
+    id_after = Task.id < task_id if descending else Task.id > task_id
+    if cursor_at_null:
+        ranges = [_task_range(filters, column, descending, column.is_(None), id_after)]
+        if descending:
+            ranges.append(_task_range(filters, column, descending, column.is_not(None)))
+    elif column is Task.status:
+        sort_value = bindparam("cursor_value", type_=column.type)
+        ranges = [
+            _task_range(filters, column, descending, column == sort_value, id_after),
+            _task_range(filters, column, descending, column < sort_value if descending else column > sort_value),
+        ]
+    else:
+        ranges = [_task_range(filters, column, descending, _after_cursor(column, descending))]
+        if not descending and Task.__table__.c[column.key].nullable:
+            ranges.append(_task_range(filters, column, descending, column.is_(None)))
+    if len(ranges) == 1:
+        return ranges[0]
+
+    page = union_all(*[task_range.subquery().select() for task_range in ranges]).subquery("page")
+    if descending:
+        stmt = select(*page.c).order_by(page.c[sort_by].desc(), page.c.id.desc())
+    else:
+        stmt = select(*page.c).order_by(page.c[sort_by].asc(), page.c.id.asc())
+    return stmt.limit(bindparam("limit", type_=Integer))
+
+
+def _task_range(filters: tuple[str, ...], column: InstrumentedAttribute[Any], descending: bool, *criteria:
+                ColumnElement[bool]) -> Select[Any]:
+    """
+    Selects the first `limit` tasks matching the filters and criteria, in the sort order of the task list.
+    """
+
+    stmt = select(*task_out_text_columns()).where(*_filter_criteria(filters), *criteria)
+    if descending:
+        stmt = stmt.order_by(column.desc(), Task.id.desc())
+    else:
+        stmt = stmt.order_by(column.asc(), Task.id.asc())
+    return stmt.limit(bindparam("limit", type_=Integer))
+
+
+def select_task_search_page(
+    query: str,
+    filters: dict[str, Any],
+    limit: int,
+    cursor: Optional[str],
+) -> BoundStatement:
+    """
+    Selects the output columns of one page of the tasks matching a full-text search, best match first.
+
+    The query is parsed with `websearch_to_tsquery`, which accepts the syntax of web search engines
+    ("quoted phrases", `or`, `-excluded`) and never fails on malformed input. The matching tasks are
+    found through the GIN index on the search vector and ranked with `ts_rank`, title matches above
+    description matches. Pages are keyset paginated on the rank with the task ID as tiebreaker, and one
+    task more than `limit` is selected. The rank is computed, so no index bounds the following pages:
+    every page ranks all matching tasks, and the cost of a page grows with the number of matches.
+
+    Raises:
+        HTTPException: If the cursor is invalid.
+    """
+
+    params = {**filters, "query": query, "limit": limit + 1}
+    if cursor:
+        params["cursor_value"], params["cursor_id"] = _decode_task_cursor(cursor, "rank", "desc")
+    return _task_search_statement(tuple(filters), cursor is not None), params
+
+
+@lru_cache(maxsize=None)
+def _task_search_statement(filters: tuple[str, ...], after_cursor: bool) -> Select[Any]:
+    tsquery = func.websearch_to_tsquery(cast(literal(TASK_SEARCH_CONFIG), REGCONFIG), bindparam("query", type_=String))
+    # The real rank is read as double precision, whose text survives the round trip through the cursor exactly
+    rank = cast(func.ts_rank(Task.search_vector, tsquery), Double)
+    stmt = select(*task_out_text_columns(),
+                  rank.label("rank")).where(Task.search_vector.bool_op("@@")(tsquery), *_filter_criteria(filters))
+    if after_cursor:
+        stmt = stmt.where(_after_cursor(rank, True))
+    return stmt.order_by(rank.desc(), Task.id.desc()).limit(bindparam("limit", type_=Integer))
+
+
+def select_task_export(filters: dict[str, Any], sort_by: str, order: str) -> BoundStatement:
+    """
+    Selects the output columns of all tasks matching the filters, in the sort order of the task list.
+    Plain columns are selected, so the streamed rows are not loaded into ORM objects.
+    """
+
+    return _task_export_statement(tuple(filters), sort_by, order), filters
+
+
+@lru_cache(maxsize=None)
+def _task_export_statement(filters: tuple[str, ...], sort_by: str, order: str) -> Select[Any]:
+    column = SORT_COLUMNS[sort_by]
+    stmt = select(*task_out_text_columns()).where(*_filter_criteria(filters))
+    if order == "desc":
+        return stmt.order_by(column.desc(), Task.id.desc())
+    return stmt.order_by(column.asc(), Task.id.asc())
+
+
+def select_task_id(task_id: UUID) -> BoundStatement:
+    """
+    Selects the ID of a task, to tell whether a task that was not written exists.
+    """
+
+    return _SELECT_TASK_ID, {"task_id": task_id}
+
+
+def encode_task_cursor(task: Any, sort_by: str, order: str) -> str:
+    """
+    Creates the cursor of the page that follows the given task, a `Task` or a row of `select_task_page`
+    or `select_task_search_page`, which are sorted by "rank".
+    """
+
+    sort_value = getattr(task, sort_by)
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, TaskStatus):
+        sort_value = sort_value.value
+    return encode_cursor({"sort_by": sort_by, "order": order, "value": sort_value, "id": str(task.id)})
+
+
+@lru_cache(maxsize=None)
+def select_employee_task_summary(summary_counters: bool) -> Select[tuple[UUID, str, int, int]]:
+    """
+    Selects the ID, username, total and completed task count of every employee.
+
+    The counts are either aggregated from the tasks table in one grouped query, or read from the
+    per-assignee counters.
+    """
+
+    if summary_counters:
+        stmt = select(
+            User.id,
+            User.username,
+            func.coalesce(AssigneeTaskCounter.total_tasks, 0),
+            func.coalesce(AssigneeTaskCounter.completed_tasks, 0),
+        ).outerjoin(AssigneeTaskCounter, AssigneeTaskCounter.assignee_id == User.id)
+    else:
+        stmt = select(
+            User.id,
+            User.username,
+            func.count(Task.id),
+            func.count(Task.id).filter(Task.status == TaskStatus.completed),
+        ).outerjoin(Task, Task.assignee_id == User.id).group_by(User.id, User.username)
+    return stmt.where(User.role == UserType.employee)
+
+
+def upsert_summary_counters(deltas: dict[UUID, tuple[int, int]]) -> Insert:
+    """
+    Adds task count changes to the per-assignee counters.
+
+    Args:
+        deltas (dict[UUID, tuple[int, int]]): The total and completed task count changes per assignee ID.
+    """
+
+    # The counters are locked in a fixed order, so concurrent writes of several assignees can not deadlock
+    stmt = insert(AssigneeTaskCounter).values([{
+        "assignee_id": assignee_id,
+        "total_tasks": total_delta,
+        "completed_tasks": completed_delta,
+    } for assignee_id, (total_delta, completed_delta) in sorted(deltas.items())])
+    return stmt.on_conflict_do_update(
+        index_elements=[AssigneeTaskCounter.assignee_id],
+        set_={
+            "total_tasks": AssigneeTaskCounter.total_tasks + stmt.excluded.total_tasks,
+            "completed_tasks": AssigneeTaskCounter.completed_tasks + stmt.excluded.completed_tasks,
+        },
+    )
+
+
+def delete_summary_counters() -> Delete:
+    return delete(AssigneeTaskCounter)
+
+
+def insert_summary_counters_from_tasks() -> Insert:
+    """
+    Recomputes the per-assignee counters from the tasks table.
+    """
+
+    counts = select(
+        Task.assignee_id,
+        func.count(Task.id),
+        func.count(Task.id).filter(Task.status == TaskStatus.completed),
+    ).group_by(Task.assignee_id)
+    return insert(AssigneeTaskCounter).from_select(["assignee_id", "total_tasks", "completed_tasks"], counts)
+
+
+def select_task_change_version(assignee_id: Optional[UUID] = None) -> BoundStatement:
+    """
+    Selects the change version of the tasks of one assignee, or of all tasks. The version of all tasks
+    is the sum of the assignee versions, which grows with the version of every assignee.
+    """
+
+    if assignee_id:
+        return _SELECT_ASSIGNEE_TASK_VERSION, {"assignee_id": assignee_id}
+    return _SELECT_TASK_VERSION, {}
+
+
+@lru_cache(maxsize=None)
+def select_summary_change_version() -> Select[tuple[int, int]]:
+    """
+    Selects the change version of all tasks and the number of employees, which together determine
+    whether the employee task summary changed.
+    """
+
+    employees = select(func.count(User.id)).where(User.role == UserType.employee).scalar_subquery()
+    return select(func.coalesce(func.sum(AssigneeTaskVersion.version), 0), employees)
+
+
+def upsert_task_versions(assignee_ids: Collection[UUID]) -> Insert:
+    """
+    Increases the change version of the tasks of the given assignees.
+    """
+
+    # The versions are locked in a fixed order, so concurrent writes of several assignees can not deadlock
+    stmt = insert(AssigneeTaskVersion).values([{
+        "assignee_id": assignee_id,
+        "version": 1
+    } for assignee_id in sorted(assignee_ids)])
+    return stmt.on_conflict_do_update(index_elements=[AssigneeTaskVersion.assignee_id],
+                                      set_={"version": AssigneeTaskVersion.version + 1})
+
+
+def upsert_all_task_versions() -> Insert:
+    """
+    Increases the change version of the tasks of every user, so no version read before matches anymore.
+    """
+
+    # SQLite can not tell ON CONFLICT from a join constraint after a SELECT without a WHERE clause
+    users = select(User.id, literal(1)).where(true())
+    stmt = insert(AssigneeTaskVersion).from_select(["assignee_id", "version"], users)
+    return stmt.on_conflict_do_update(index_elements=[AssigneeTaskVersion.assignee_id],
+                                      set_={"version": AssigneeTaskVersion.version + 1})
+
+
+def notify_task_changes(payloads: list[str]) -> Select[tuple[Any]]:
+    """
+    Sends one notification per payload on the task changes channel, in one statement. PostgreSQL
+    delivers the notifications to the listeners when the transaction commits, and drops them if it
+    rolls back, so listeners only learn about committed changes.
+    """
+
+    payload = func.unnest(literal(payloads, ARRAY(Text))).column_valued("payload")
+    return select(func.pg_notify(TASK_CHANGES_CHANNEL, payload))
+
+
+def completed_delta(old_status: Optional[TaskStatus], new_status: Optional[TaskStatus]) -> int:
+    """
+    Returns how the number of completed tasks changes when a task moves from one status to another.
+    A status of None stands for a task that does not exist (yet).
+    """
+
+    return int(new_status == TaskStatus.completed) - int(old_status == TaskStatus.completed)
+
+
+def _filter_criteria(filters: tuple[str, ...]) -> list[ColumnElement[bool]]:
+    """
+    Builds the conditions of the task list filters collected by `task_filters`.
+    """
+
+    criteria: list[ColumnElement[bool]] = []
+    if "assignee_id" in filters:
+        criteria.append(Task.assignee_id == bindparam("assignee_id"))
+    if "status" in filters:
+        criteria.append(Task.status == bindparam("status"))
+    return criteria
+
+
+def _after_cursor(column: ColumnElement[Any], descending: bool) -> ColumnElement[bool]:
+    """
+    Builds the condition selecting the tasks that come after the cursor position in the sort order,
+    given by the `cursor_value` and `cursor_id` parameters, as a row value comparison of the sort value
+    and the ID. PostgreSQL starts the scan of a `(sort column, id)` index at that position, where the
+    equivalent OR of comparisons would be checked against every index entry from the start.
+    """
+
+    position = tuple_(column, Task.id)
+    cursor = tuple_(bindparam("cursor_value", type_=column.type), bindparam("cursor_id", type_=Task.id.type))
+    return position < cursor if descending else position > cursor
+
+
+def _decode_task_cursor(cursor: str, sort_by: str, order: str) -> tuple[Any, UUID]:
+    """
+    Decodes a task cursor into the sort value and ID of the last task of the previous page.
+
+    Raises:
+        HTTPException: If the cursor is malformed or was created for a different sort order.
+    """
+
+    try:
+        values = decode_cursor(cursor)
+        if values.get("sort_by") != sort_by or values.get("order") != order:
+            raise ValueError("Cursor does not match the sort order")
+        sort_value = values["value"]
+        if sort_by == "rank":
+            sort_value = float(sort_value)
+        elif sort_value is not None:
+            sort_value = TaskStatus(sort_value) if sort_by == "status" else datetime.fromisoformat(sort_value)
+        return sort_value, UUID(values["id"])
+    except (ValueError, KeyError, TypeError) as error:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from error
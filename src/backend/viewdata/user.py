@@ -2,9 +2,11 @@ from datetime import timedelta
 
 from fastapi import HTTPException, status
 from pydantic import BaseModel
+from sqlalchemy import Update, update
 
+from backend.auth.authenticator import Authenticator
 from backend.model.user import User, UserType
-from utils.dbconnection import DbConnection
+from utils.dbconnection import AsyncDbConnection, DbConnection
 from utils.jwt_token import JWTUtils
 
 
@@ -26,10 +28,21 @@ class ApiLoginReq(BaseModel):
 
 class ViewUser:
 
-    def __init__(self, db_connection: DbConnection, jwt_utils: JWTUtils, token_expire_mins: int) -> None:
+    def __init__(
+        self,
+        db_connection: DbConnection,
+        jwt_utils: JWTUtils,
+        token_expire_mins: int,
+        authenticator: Authenticator | None = None,
+    ) -> None:
+        """
+        Every user change is passed to `authenticator.invalidate_user`, so the authenticator of the
+        requests does not serve the changed user from its cache.
+        """
         self._db_connection = db_connection
         self._jwt_utils = jwt_utils
         self._token_expire_mins = token_expire_mins
+        self._authenticator = authenticator
 
     def login(self, username: str, password: str) -> ApiTokenResponse:
         with self._db_connection.create_session() as session:
@@ -50,3 +63,84 @@ class ViewUser:
             user = User(username=username, hashed_password=hashed_password, role=role)
             session.add(user)
             session.commit()
+        self._user_changed(username)
+
+    def update_user_role(self, username: str, role: UserType) -> None:
+        """
+        Changes the role of a user. The user's next request is authorized with the new role by this
+        process, and by the other processes once their cached user expires.
+
+        Raises:
+            HTTPException: If no user has the given username.
+        """
+        with self._db_connection.create_session() as session:
+            updated = session.execute(_update_user_role(username, role)).one_or_none()
+            session.commit()
+        if updated is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        self._user_changed(username)
+
+    def _user_changed(self, username: str) -> None:
+        # The authenticator looks the user up through a read session for the username
+        self._db_connection.record_write(username)
+        if self._authenticator is not None:
+            self._authenticator.invalidate_user(username)
+
+
+class AsyncViewUser:
+    """
+    Asyncio counterpart of `ViewUser`, using an `AsyncDbConnection`.
+    """
+
+    def __init__(
+        self,
+        db_connection: AsyncDbConnection,
+        jwt_utils: JWTUtils,
+        token_expire_mins: int,
+        authenticator: Authenticator | None = None,
+    ) -> None:
+        self._db_connection = db_connection
+        self._jwt_utils = jwt_utils
+        self._token_expire_mins = token_expire_mins
+        self._authenticator = authenticator
+
+    async def login(self, username: str, password: str) -> ApiTokenResponse:
+        async with self._db_connection.create_session() as session:
+            user = await self._jwt_utils.authenticate_user_async(session, username, password)
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Incorrect username or password",
+                )
+            access_token_expires = timedelta(minutes=self._token_expire_mins)
+            access_token = self._jwt_utils.create_access_token(data={"sub": user.username},
+                                                               expires_delta=access_token_expires)
+            return ApiTokenResponse(access_token=access_token, token_type="bearer")
+
+    async def create_user(self, username: str, password: str, role: UserType) -> None:
+        hashed_password = await self._jwt_utils.get_password_hash_async(password)
+        async with self._db_connection.create_session() as session:
+            user = User(username=username, hashed_password=hashed_password, role=role)
+            session.add(user)
+            await session.commit()
+        self._user_changed(username)
+
+    async def update_user_role(self, username: str, role: UserType) -> None:
+        """
+        See `ViewUser.update_user_role`.
+        """
+        async with self._db_connection.create_session() as session:
+            updated = (await session.execute(_update_user_role(username, role))).one_or_none()
+            await session.commit()
+        if updated is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        self._user_changed(username)
+
+    def _user_changed(self, username: str) -> None:
+        self._db_connection.record_write(username)
+        if self._authenticator is not None:
+            self._authenticator.invalidate_user(username)
+
+
+def _update_user_role(username: str, role: UserType) -> Update:
+    return update(User).where(User.username == username).values(role=role).returning(User.id)
@@ -0,0 +1,147 @@
+"""
+Reports the PostgreSQL query plans of the `ViewTask` queries.
+
+Runs EXPLAIN for every statement the task views issue, with sample parameters taken from the
+configured database, to confirm that the managed indexes are used. The plans only reflect production
+behaviour on realistically sized tables, e.g. seeded with `benchmarks.task_summary --keep`. Finally
+lists the indexes of the tasks table with the queries whose plans use them, and the unused ones.
+
+A page in the middle of every task list is explained as well, and its plan must bound an index scan
+on the sort column: a page that filters the index from its start gets slower the deeper the client
+pages. The tasks of one assignee are few enough to be sorted, so their scan may be bounded on the
+assignee instead. The script fails if any such plan is not bounded.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.explain_task_queries -c config.yml --analyze
+"""
+import re
+from argparse import ArgumentParser
+from typing import Any, Iterator
+from uuid import UUID
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.orm import Session
+
+from backend.model.app_managed_tables import create_app_managed_tables
+from backend.model.task import Task, TaskStatus
+from backend.viewdata.task import DEFAULT_PAGE_SIZE
+from backend.viewdata.task_queries import (
+    SORT_COLUMNS,
+    BoundStatement,
+    encode_task_cursor,
+    select_employee_task_summary,
+    select_task_id,
+    select_task_page,
+    select_task_search_page,
+    task_filters,
+)
+from settings import AppSettings
+from utils.dbconnection import DbConnection
+
+# The index names in the scan nodes of a plan, e.g. `Index Scan Backward using ix_tasks_created_at on tasks`
+_SCANNED_INDEX = re.compile(r"Scan(?: Backward)? using (\w+)|Bitmap Index Scan on (\w+)")
+
+
+def _page_queries(name: str, session: Session, assignee_id: UUID | None,
+                  status_filter: str | None) -> Iterator[tuple[str, BoundStatement, str | None]]:
+    """
+    Yields the first, a following and a deep page of every sort order for the given filters, with the
+    column whose index scan the deep page must bound.
+    """
+
+    filters = task_filters(assignee_id, status_filter)
+    tasks = session.scalar(select(func.count()).select_from(Task).filter_by(**filters))
+    for sort_by in SORT_COLUMNS:
+        for order in ("asc", "desc"):
+            first_page = select_task_page(filters, sort_by, order, DEFAULT_PAGE_SIZE, None)
+            yield f"{name} sort_by={sort_by} order={order}", first_page, None
+            page = session.execute(*first_page).all()
+            if len(page) > DEFAULT_PAGE_SIZE:
+                cursor = encode_task_cursor(page[DEFAULT_PAGE_SIZE - 1], sort_by, order)
+                yield (f"{name} sort_by={sort_by} order={order} next page",
+                       select_task_page(filters, sort_by, order, DEFAULT_PAGE_SIZE, cursor), None)
+
+            statement, params = first_page
+            deep_task = session.execute(statement.offset(tasks // 2), params).first()
+            if deep_task is not None:
+                cursor = encode_task_cursor(deep_task, sort_by, order)
+                yield (f"{name} sort_by={sort_by} order={order} page after {tasks // 2} tasks",
+                       select_task_page(filters, sort_by, order, DEFAULT_PAGE_SIZE,
+                                        cursor), "assignee_id" if assignee_id else sort_by)
+
+
+def _task_queries(session: Session) -> Iterator[tuple[str, BoundStatement, str | None]]:
+    stmt = select(Task.assignee_id, Task.id, Task.title).order_by(func.random()).limit(1)  # type: ignore
+    sample = session.execute(stmt).first()
+    if sample is None:
+        raise SystemExit("The tasks table is empty, seed it first, e.g. with benchmarks.task_summary --keep")
+    assignee_id, task_id, title = sample
+    term = (title.split() or ["task"])[0]
+
+    yield "update_task / delete_task: task by ID, after a version conflict", select_task_id(task_id), None
+    yield from _page_queries("get_tasks", session, None, None)
+    yield from _page_queries("get_tasks assignee_id", session, assignee_id, None)
+    yield from _page_queries("get_tasks status_filter", session, None, TaskStatus.completed.value)
+    yield from _page_queries("get_tasks assignee_id status_filter", session, assignee_id, TaskStatus.completed.value)
+    yield f"search_tasks q={term}", select_task_search_page(term, {}, DEFAULT_PAGE_SIZE, None), None
+    yield f"search_tasks q={title}", select_task_search_page(title, {}, DEFAULT_PAGE_SIZE, None), None
+    yield (f"search_tasks q={term} assignee_id",
+           select_task_search_page(term, task_filters(assignee_id, None), DEFAULT_PAGE_SIZE, None), None)
+    yield "get_employee_task_summary", (select_employee_task_summary(summary_counters=False), {}), None
+    yield "get_employee_task_summary counters", (select_employee_task_summary(summary_counters=True), {}), None
+
+
+def _explain(session: Session, stmt: BoundStatement, options: str) -> list[Any]:
+    statement, params = stmt
+    sql = statement.params(params).compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+    # Executed as is, since rendered literals like timestamps could be mistaken for bind parameters
+    return list(session.connection().exec_driver_sql(f"EXPLAIN ({options}) {sql}").scalars())
+
+
+def _task_index_names(db_connection: DbConnection) -> list[str]:
+    inspector = inspect(db_connection.engine)
+    names = [index["name"] for index in inspector.get_indexes(Task.__tablename__)]
+    return [inspector.get_pk_constraint(Task.__tablename__)["name"], *sorted(names)]
+
+
+def _scanned_indexes(plan: list[Any]) -> set[str]:
+    return {name for line in plan for match in _SCANNED_INDEX.findall(line) for name in match if name}
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--analyze", action="store_true", help="Execute the queries and report actual timings.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    db_connection = config.db.create()
+    create_app_managed_tables(db_connection)
+
+    options = "ANALYZE, BUFFERS" if args.analyze else "COSTS"
+    unbounded = []
+    index_queries: dict[str, list[str]] = {name: [] for name in _task_index_names(db_connection)}
+    with db_connection.create_session() as session:
+        for name, stmt, bound_column in _task_queries(session):
+            print(f"== {name}")
+            plan = _explain(session, stmt, options)
+            for line in plan:
+                print(line)
+            print()
+            for index_name in _scanned_indexes(plan):
+                index_queries.setdefault(index_name, []).append(name)
+            if bound_column and not any("Index Cond" in line and bound_column in line for line in plan):
+                unbounded.append(name)
+        session.rollback()
+
+    print(f"== Indexes of {Task.__tablename__}")
+    for index_name, queries in index_queries.items():
+        print(f"{index_name}: " + (f"{len(queries)} queries" if queries else "unused"))
+        for query in queries:
+            print(f"    {query}")
+    if unbounded:
+        raise SystemExit("No bounded index scan: " + ", ".join(unbounded))
+
+
+if __name__ == "__main__":
+    main()
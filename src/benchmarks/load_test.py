@@ -0,0 +1,375 @@
+"""
+Load test of the task API.
+
+Starts the app with `create_app` in a separate process against the configured database, seeds an
+employer, employees and tasks through the API, and then drives a weighted mix of login, create, list,
+my-tasks, update and task-summary requests from concurrent clients for a fixed duration. Prints a JSON
+report with the request rate and latency percentiles of every route, and the rate of created tasks of the
+routes creating tasks, so releases can be compared.
+The seeded users and their tasks are removed again afterwards unless --keep is given.
+
+The clients run in this process, so on a small machine they compete with the server for CPU. Compare
+reports taken on the same machine with the same options only.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.load_test -c config.yml --concurrency 32 --duration 60 --output report.json
+
+The bulk scenario creates tasks in requests of --bulk-size tasks, e.g. `--mix bulk=1 --concurrency 4`.
+"""
+import asyncio
+import json
+import math
+import multiprocessing
+import random
+import time
+import uuid
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+from uuid import UUID
+
+import httpx
+import uvicorn
+from sqlalchemy import text
+
+from app import create_app
+from settings import AppSettings
+from utils.dbconnection import DbConnection
+
+_USERNAME_PREFIX = "load-test-"
+_PASSWORD = "load-test-password"
+_DEFAULT_MIX = "login=1,create=5,list=10,my_tasks=10,update=5,summary=2"
+_STATUSES = ["Pending", "In Progress", "Completed"]
+
+
+@dataclass
+class _Sample:
+    route: str
+    status_code: int
+    latency_secs: float
+    created_tasks: int = 0
+
+
+@dataclass
+class _Fixture:
+    """
+    The users and tasks seeded for a run. The task IDs of every employee grow as tasks are created.
+    """
+
+    employer_token: str
+    employee_tokens: dict[str, str]
+    employee_ids: dict[str, UUID]
+    task_ids: dict[str, list[UUID]] = field(default_factory=dict)
+
+
+def _serve(conf_file: str) -> None:
+    config = AppSettings.from_yaml(conf_file)
+    uvicorn.run(create_app(config),
+                host=config.webserver.host,
+                port=config.webserver.port,
+                log_config=None,
+                access_log=False)
+
+
+def _start_server(conf_file: str, base_url: str, timeout_secs: float = 60) -> multiprocessing.Process:
+    """
+    Starts the app in a fresh process and waits until it answers requests.
+    """
+
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(conf_file, ))
+    server.start()
+    deadline = time.monotonic() + timeout_secs
+    while time.monotonic() < deadline:
+        if not server.is_alive():
+            raise SystemExit(f"The server exited with code {server.exitcode}")
+        try:
+            httpx.get(f"{base_url}/openapi.json").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit(f"The server did not start within {timeout_secs} seconds")
+
+
+async def _login(client: httpx.AsyncClient, username: str) -> str:
+    response = await client.post("/v1/users/login", json={"username": username, "password": _PASSWORD})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def _seed(client: httpx.AsyncClient, run_id: str, employees: int, tasks_per_employee: int,
+                hash_concurrency: int) -> _Fixture:
+    """
+    Creates and logs in the users of the run, and creates the initial tasks of every employee.
+    """
+
+    employer = f"{_USERNAME_PREFIX}{run_id}-employer"
+    employee_names = [f"{_USERNAME_PREFIX}{run_id}-employee-{n}" for n in range(employees)]
+    # Password hashing is bounded on the server, more concurrent requests would be rejected with 503
+    hashing = asyncio.Semaphore(hash_concurrency)
+
+    async def create_and_login(username: str, role: str) -> str:
+        async with hashing:
+            response = await client.post("/v1/users/", json={"username": username, "password": _PASSWORD, "role": role})
+            response.raise_for_status()
+            return await _login(client, username)
+
+    tokens = await asyncio.gather(create_and_login(employer, "Employer"),
+                                  *[create_and_login(name, "Employee") for name in employee_names])
+    fixture = _Fixture(employer_token=tokens[0], employee_tokens=dict(zip(employee_names, tokens[1:])), employee_ids={})
+
+    response = await client.get("/v1/tasks/task-summary", headers=_auth(fixture.employer_token))
+    response.raise_for_status()
+    fixture.employee_ids = {
+        summary["username"]: UUID(summary["employee_id"])
+        for summary in response.json() if summary["username"] in fixture.employee_tokens
+    }
+
+    for name, employee_id in fixture.employee_ids.items():
+        fixture.task_ids[name] = []
+        if tasks_per_employee:
+            tasks = [{
+                "title": f"Load test task {n}",
+                "description": "",
+                "assignee_id": str(employee_id)
+            } for n in range(tasks_per_employee)]
+            response = await client.post("/v1/tasks/bulk", json={"tasks": tasks}, headers=_auth(fixture.employer_token))
+            response.raise_for_status()
+            fixture.task_ids[name] = [UUID(item["task"]["id"]) for item in response.json()["items"]]
+    return fixture
+
+
+def _auth(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _operations(client: httpx.AsyncClient, fixture: _Fixture,
+                bulk_size: int) -> dict[str, Callable[[], Awaitable[tuple[str, httpx.Response]]]]:
+    """
+    Builds the operations of the traffic mix. Every operation sends one request with random parameters,
+    and returns the route it is reported under together with the response.
+    """
+
+    async def login() -> tuple[str, httpx.Response]:
+        username = random.choice(list(fixture.employee_tokens))
+        return "POST /v1/users/login", await client.post("/v1/users/login",
+                                                         json={
+                                                             "username": username,
+                                                             "password": _PASSWORD
+                                                         })
+
+    async def create() -> tuple[str, httpx.Response]:
+        username, employee_id = random.choice(list(fixture.employee_ids.items()))
+        task = {"title": "Load test task", "description": "", "assignee_id": str(employee_id)}
+        response = await client.post("/v1/tasks/", json=task, headers=_auth(fixture.employer_token))
+        if response.status_code == 200:
+            fixture.task_ids[username].append(UUID(response.json()["id"]))
+        return "POST /v1/tasks/", response
+
+    async def bulk() -> tuple[str, httpx.Response]:
+        username, employee_id = random.choice(list(fixture.employee_ids.items()))
+        tasks = [{"title": "Load test task", "description": "", "assignee_id": str(employee_id)}] * bulk_size
+        response = await client.post("/v1/tasks/bulk", json={"tasks": tasks}, headers=_auth(fixture.employer_token))
+        if response.status_code == 200:
+            fixture.task_ids[username].extend(UUID(item["task"]["id"]) for item in response.json()["items"])
+        return "POST /v1/tasks/bulk", response
+
+    async def list_tasks() -> tuple[str, httpx.Response]:
+        params: dict[str, Any] = {
+            "sort_by": random.choice(["created_at", "due_date", "status"]),
+            "order": random.choice(["asc", "desc"]),
+        }
+        if random.random() < 0.5:
+            params["assignee_id"] = str(random.choice(list(fixture.employee_ids.values())))
+        if random.random() < 0.5:
+            params["status_filter"] = random.choice(_STATUSES)
+        return "GET /v1/tasks/", await client.get("/v1/tasks/", params=params, headers=_auth(fixture.employer_token))
+
+    async def my_tasks() -> tuple[str, httpx.Response]:
+        token = random.choice(list(fixture.employee_tokens.values()))
+        return "GET /v1/tasks/my-tasks", await client.get("/v1/tasks/my-tasks", headers=_auth(token))
+
+    async def update() -> tuple[str, httpx.Response]:
+        username = random.choice([name for name, task_ids in fixture.task_ids.items() if task_ids])
+        task_id = random.choice(fixture.task_ids[username])
+        return "PUT /v1/tasks/{task_id}", await client.put(f"/v1/tasks/{task_id}",
+                                                           json={"status": random.choice(_STATUSES)},
+                                                           headers=_auth(fixture.employee_tokens[username]))
+
+    async def summary() -> tuple[str, httpx.Response]:
+        return "GET /v1/tasks/task-summary", await client.get("/v1/tasks/task-summary",
+                                                              headers=_auth(fixture.employer_token))
+
+    return {
+        "login": login,
+        "create": create,
+        "bulk": bulk,
+        "list": list_tasks,
+        "my_tasks": my_tasks,
+        "update": update,
+        "summary": summary,
+    }
+
+
+def _parse_mix(mix: str) -> dict[str, float]:
+    weights: dict[str, float] = {}
+    for entry in mix.split(","):
+        name, _, weight = entry.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+async def _drive(client: httpx.AsyncClient, fixture: _Fixture, weights: dict[str, float], concurrency: int,
+                 warmup_secs: float, duration_secs: float, bulk_size: int) -> list[_Sample]:
+    """
+    Sends requests from `concurrency` clients, each waiting for its previous response, and records the
+    requests completed after the warmup.
+    """
+
+    operations = _operations(client, fixture, bulk_size)
+    unknown = set(weights) - set(operations)
+    if unknown:
+        raise SystemExit(f"Unknown operations in the mix: {', '.join(sorted(unknown))}")
+    names = [name for name in weights if weights[name] > 0]
+    samples: list[_Sample] = []
+    measure_from = time.monotonic() + warmup_secs
+    deadline = measure_from + duration_secs
+
+    async def run_client() -> None:
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights=[weights[name] for name in names])[0]
+            start = time.monotonic()
+            try:
+                route, response = await operations[name]()
+                status_code, created_tasks = response.status_code, _created_tasks(route, response)
+            except httpx.HTTPError:
+                route, status_code, created_tasks = name, 0, 0
+            if start >= measure_from:
+                samples.append(_Sample(route, status_code, time.monotonic() - start, created_tasks))
+
+    await asyncio.gather(*[run_client() for _ in range(concurrency)])
+    return samples
+
+
+def _created_tasks(route: str, response: httpx.Response) -> int:
+    """
+    The number of tasks a response reports created.
+    """
+
+    if response.status_code != 200:
+        return 0
+    if route == "POST /v1/tasks/bulk":
+        return sum(1 for item in response.json()["items"] if item["status_code"] == 200)
+    return 1 if route == "POST /v1/tasks/" else 0
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    """
+    The nearest-rank percentile of a sorted, non-empty list.
+    """
+
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def _route_report(samples: list[_Sample], duration_secs: float) -> dict[str, Any]:
+    latencies = sorted(sample.latency_secs * 1000 for sample in samples)
+    status_codes: dict[str, int] = {}
+    for sample in samples:
+        status_codes[str(sample.status_code)] = status_codes.get(str(sample.status_code), 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if not 200 <= sample.status_code < 400),
+        "rps": round(len(samples) / duration_secs, 2),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "status_codes": status_codes,
+        "created_tasks_per_sec": round(sum(sample.created_tasks for sample in samples) / duration_secs, 2),
+    }
+
+
+def _report(samples: list[_Sample], duration_secs: float) -> dict[str, Any]:
+    by_route: dict[str, list[_Sample]] = {}
+    for sample in samples:
+        by_route.setdefault(sample.route, []).append(sample)
+    return {
+        "routes": {
+            route: _route_report(by_route[route], duration_secs)
+            for route in sorted(by_route)
+        },
+        "total": _route_report(samples, duration_secs) if samples else None,
+    }
+
+
+def _cleanup(db_connection: DbConnection) -> None:
+    with db_connection.create_session() as session:
+        load_users = "SELECT id FROM users WHERE username LIKE :prefix || '%'"
+        params = {"prefix": _USERNAME_PREFIX}
+        session.execute(text(f"DELETE FROM tasks WHERE assignee_id IN ({load_users}) OR creator_id IN ({load_users})"),
+                        params)
+        session.execute(text(f"DELETE FROM assignee_task_counters WHERE assignee_id IN ({load_users})"), params)
+        session.execute(text("DELETE FROM users WHERE username LIKE :prefix || '%'"), params)
+        session.commit()
+
+
+async def _run(args: Any, config: AppSettings, base_url: str) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        fixture = await _seed(client,
+                              uuid.uuid4().hex[:8], args.employees, args.tasks_per_employee,
+                              config.passwords.hash_workers)
+        samples = await _drive(client, fixture, _parse_mix(args.mix), args.concurrency, args.warmup, args.duration,
+                               args.bulk_size)
+    return _report(samples, args.duration)
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured traffic.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured traffic before.")
+    parser.add_argument("--employees", type=int, default=20, help="Number of employees to seed.")
+    parser.add_argument("--tasks-per-employee", type=int, default=100, help="Number of tasks to seed per employee.")
+    parser.add_argument("--mix", default=_DEFAULT_MIX, help=f"Operation weights, default {_DEFAULT_MIX}.")
+    parser.add_argument("--bulk-size", type=int, default=1000, help="Number of tasks per bulk create request.")
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout in seconds.")
+    parser.add_argument("--output", help="Path to write the JSON report to, instead of printing it.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded users and tasks.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    base_url = f"http://{config.webserver.host}:{config.webserver.port}"
+    server = _start_server(args.conf_file, base_url)
+    try:
+        report = asyncio.run(_run(args, config, base_url))
+    finally:
+        server.terminate()
+        server.join()
+        if not args.keep:
+            _cleanup(config.db.create())
+
+    report = {
+        "options": {
+            "concurrency": args.concurrency,
+            "duration_secs": args.duration,
+            "employees": args.employees,
+            "tasks_per_employee": args.tasks_per_employee,
+            "mix": _parse_mix(args.mix),
+            "bulk_size": args.bulk_size,
+            "async_db": config.async_db,
+            "summary_counters": config.tasks.summary_counters,
+        },
+        **report,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark of the Python overhead per query of the cached statements.
+
+Seeds a benchmark employee with a few tasks into the configured database and compares, per query,
+
+- building the statement for every query, as the task views and the authenticator did before, which
+  builds the statement objects and their cache key before the compiled SQL is found in the cache,
+- reusing the statement built once per shape, with the values of the query as bind parameters,
+
+for the first page of the task list, a following page and the user lookup of the authenticator.
+Only a handful of rows is returned, so the timings are dominated by the Python work of a query
+rather than by the database. The seeded rows are removed again afterwards unless --keep is given.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.statement_cache -c config.yml --repeat 5000
+"""
+import json
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, select
+
+from backend.auth.authenticator import _SELECT_USER_BY_USERNAME
+from backend.model.app_managed_tables import create_app_managed_tables
+from backend.model.task import Task, TaskStatus
+from backend.model.user import User, UserType
+from backend.viewdata.task_queries import (
+    _task_page_statement,
+    encode_task_cursor,
+    select_task_page,
+    task_filters,
+)
+from settings import AppSettings
+from utils.dbconnection import DbConnection
+
+_USERNAME = "bench-statement-cache-employee"
+_PAGE_SIZE = 5
+
+
+def _seed(db_connection: DbConnection) -> UUID:
+    user = User(id=uuid4(), username=_USERNAME, hashed_password="", role=UserType.employee)
+    created_at = datetime.now(timezone.utc)
+    with db_connection.create_session() as session:
+        session.add(user)
+        session.flush()
+        session.add_all(
+            Task(id=uuid4(),
+                 title=f"Benchmark task {n}",
+                 description="",
+                 status=TaskStatus.pending,
+                 created_at=created_at + timedelta(seconds=n),
+                 assignee_id=user.id,
+                 creator_id=user.id) for n in range(3 * _PAGE_SIZE))
+        session.commit()
+        return user.id
+
+
+def _cleanup(db_connection: DbConnection) -> None:
+    with db_connection.create_session() as session:
+        user_id = session.scalar(select(User.id).where(User.username == _USERNAME))
+        session.execute(delete(Task).where(Task.assignee_id == user_id))
+        session.execute(delete(User).where(User.id == user_id))
+        session.commit()
+
+
+def _measure(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    func()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        func()
+    return {
+        "wall_us_per_query": (time.perf_counter() - start_wall) / repeat * 1e6,
+        "cpu_us_per_query": (time.process_time() - start_cpu) / repeat * 1e6,
+    }
+
+
+def _run(db_connection: DbConnection, user_id: UUID, repeat: int) -> dict[str, dict[str, Any]]:
+    filters = task_filters(assignee_id=user_id)
+    with db_connection.create_session() as session:
+        first_page = session.execute(*select_task_page(filters, "created_at", "asc", _PAGE_SIZE, None)).all()
+        cursor = encode_task_cursor(first_page[_PAGE_SIZE - 1], "created_at", "asc")
+
+        def rebuilt_page(page_cursor):
+            stmt, params = select_task_page(filters, "created_at", "asc", _PAGE_SIZE, page_cursor)
+            # Builds the statement anew, bypassing the cache of statement objects
+            cursor_at_null = None if page_cursor is None else False
+            stmt = _task_page_statement.__wrapped__(tuple(filters), "created_at", "asc", cursor_at_null)
+            return session.execute(stmt, params).all()
+
+        def cached_page(page_cursor):
+            return session.execute(*select_task_page(filters, "created_at", "asc", _PAGE_SIZE, page_cursor)).all()
+
+        queries: dict[str, dict[str, Callable[[], object]]] = {
+            "task_page": {
+                "rebuilt": lambda: rebuilt_page(None),
+                "cached": lambda: cached_page(None),
+            },
+            "task_next_page": {
+                "rebuilt": lambda: rebuilt_page(cursor),
+                "cached": lambda: cached_page(cursor),
+            },
+            "user_by_username": {
+                "rebuilt": lambda: session.scalar(select(User).where(User.username == _USERNAME)),
+                "cached": lambda: session.scalar(_SELECT_USER_BY_USERNAME, {"username": _USERNAME}),
+            },
+        }
+        results: dict[str, dict[str, Any]] = {}
+        for name, implementations in queries.items():
+            results[name] = {label: _measure(func, repeat) for label, func in implementations.items()}
+            saved = results[name]["rebuilt"]["cpu_us_per_query"] - results[name]["cached"]["cpu_us_per_query"]
+            results[name]["cpu_us_saved_per_query"] = round(saved, 1)
+            session.expunge_all()
+        return results
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--repeat", type=int, default=5000, help="Number of timed queries per implementation.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    db_connection = config.db.create()
+    create_app_managed_tables(db_connection)
+
+    user_id = _seed(db_connection)
+    try:
+        results = _run(db_connection, user_id, args.repeat)
+        print(json.dumps({"repeat": args.repeat, "results": results}, indent=2))
+    finally:
+        if not args.keep:
+            _cleanup(db_connection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Benchmark of the task list response serialization.
+
+Seeds benchmark tasks into the configured database and compares the CPU time of building and
+encoding one task page along the former path (ORM entities, validated by the view and again by
+FastAPI's `response_model` handling) with the current one (plain column rows, encoded by orjson
+without validation). The seeded rows are removed again afterwards unless --keep is given.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.task_list_serialization -c config.yml --rows 1000
+"""
+import asyncio
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Awaitable, Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import text
+
+from backend.model.app_managed_tables import create_app_managed_tables
+from backend.model.task import Task
+from backend.viewdata.task import TaskOut, TaskPage, ViewTask
+from backend.viewdata.task_queries import select_task_page, task_filters
+from settings import AppSettings
+from utils.dbconnection import DbConnection
+
+_USERNAME = "bench-serialization-employee"
+
+
+def _seed(db_connection: DbConnection, rows: int) -> None:
+    with db_connection.create_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO users (id, username, hashed_password, role)
+                VALUES (gen_random_uuid(), :username, '', 'employee')
+                """),
+            {"username": _USERNAME},
+        )
+        session.execute(
+            text("""
+                INSERT INTO tasks (id, title, description, status, created_at, due_date, assignee_id, creator_id)
+                SELECT gen_random_uuid(), 'Benchmark task ' || n, 'A task seeded by the serialization benchmark',
+                       (ARRAY['pending', 'in_progress', 'completed']::task_status_enum[])[1 + n % 3],
+                       now() - n * interval '1 second', now() + n * interval '1 hour', u.id, u.id
+                FROM generate_series(1, :rows) AS n, (SELECT id FROM users WHERE username = :username) AS u
+                """),
+            {
+                "username": _USERNAME,
+                "rows": rows
+            },
+        )
+        session.commit()
+        session.execute(text("ANALYZE tasks"))
+
+
+def _cleanup(db_connection: DbConnection) -> None:
+    with db_connection.create_session() as session:
+        params = {"username": _USERNAME}
+        session.execute(
+            text("DELETE FROM tasks WHERE assignee_id IN (SELECT id FROM users WHERE username = :username)"), params)
+        session.execute(text("DELETE FROM users WHERE username = :username"), params)
+        session.commit()
+
+
+def _assignee_id(db_connection: DbConnection):
+    with db_connection.create_session() as session:
+        return session.execute(text("SELECT id FROM users WHERE username = :username"), {
+            "username": _USERNAME
+        }).scalar_one()
+
+
+async def _orm_response_model(db_connection: DbConnection, assignee_id, rows: int) -> bytes:
+    """
+    The former implementation: ORM entities validated into a `TaskPage`, which FastAPI dumps,
+    validates against the `response_model` and encodes with the standard library.
+    """
+
+    stmt, params = select_task_page(task_filters(assignee_id=assignee_id), "created_at", "asc", rows, None)
+    with db_connection.create_session() as session:
+        tasks = session.scalars(stmt.with_only_columns(Task), params).all()[:rows]
+        page = TaskPage(items=[TaskOut.model_validate(task) for task in tasks])
+    content = await serialize_response(field=create_model_field("Response", TaskPage), response_content=page)
+    return JSONResponse(content).body
+
+
+async def _core_rows(view_task: ViewTask, assignee_id, rows: int) -> bytes:
+    page = view_task.get_tasks(assignee_id=assignee_id, limit=rows)
+    return ORJSONResponse(page).body
+
+
+async def _measure(func: Callable[[], Awaitable[bytes]], repeat: int) -> dict[str, float]:
+    await func()
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.process_time()
+        await func()
+        timings.append(time.process_time() - start)
+    return {
+        "min_cpu_ms": min(timings) * 1000,
+        "median_cpu_ms": statistics.median(timings) * 1000,
+        "max_cpu_ms": max(timings) * 1000
+    }
+
+
+async def _run(db_connection: DbConnection, rows: int, repeat: int) -> dict[str, dict[str, float]]:
+    view_task = ViewTask(db_connection)
+    assignee_id = _assignee_id(db_connection)
+    former = await _orm_response_model(db_connection, assignee_id, rows)
+    current = await _core_rows(view_task, assignee_id, rows)
+    if json.loads(former) != json.loads(current):
+        raise AssertionError("The serialization paths produce different responses")
+
+    return {
+        "orm_response_model": await _measure(lambda: _orm_response_model(db_connection, assignee_id, rows), repeat),
+        "core_rows": await _measure(lambda: _core_rows(view_task, assignee_id, rows), repeat),
+    }
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--rows", type=int, default=1000, help="Number of tasks per response.")
+    parser.add_argument("--repeat", type=int, default=50, help="Number of timed responses per implementation.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    db_connection = config.db.create()
+    create_app_managed_tables(db_connection)
+
+    _seed(db_connection, args.rows)
+    try:
+        results = asyncio.run(_run(db_connection, args.rows, args.repeat))
+        speedup = results["orm_response_model"]["median_cpu_ms"] / results["core_rows"]["median_cpu_ms"]
+        print(json.dumps({"rows": args.rows, "results": results, "median_speedup": round(speedup, 2)}, indent=2))
+    finally:
+        if not args.keep:
+            _cleanup(db_connection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Benchmark of the task search.
+
+Seeds benchmark employees and tasks into the configured database, whose titles contain a rare, a
+moderately common and a common term, and compares finding the tasks with a term by
+
+- downloading all tasks and filtering them on the client, as clients did before the search existed,
+- an ILIKE pattern match over the title and description, which scans the tasks table,
+- the full-text search, the first page and a page deep into the results.
+
+The seeded rows are removed again afterwards unless --keep is given.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.task_search -c config.yml --employees 1000 --tasks 1000000
+"""
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Any, Callable, Optional
+
+from sqlalchemy import or_, select, text
+
+from backend.model.app_managed_tables import create_app_managed_tables
+from backend.model.task import Task
+from backend.viewdata.task import DEFAULT_PAGE_SIZE, TaskExportFormat, ViewTask
+from backend.viewdata.task_queries import task_out_text_columns
+from settings import AppSettings
+from utils.dbconnection import DbConnection
+
+_USERNAME_PREFIX = "bench-search-employee-"
+
+# The searched terms, by the share of tasks whose title contains them
+_TERMS = {"rare": "zephyr", "medium": "invoice", "common": "report"}
+
+
+def _seed(db_connection: DbConnection, employees: int, tasks: int) -> None:
+    with db_connection.create_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO users (id, username, hashed_password, role)
+                SELECT gen_random_uuid(), :prefix || n, '', 'employee'
+                FROM generate_series(1, :employees) AS n
+                """),
+            {
+                "prefix": _USERNAME_PREFIX,
+                "employees": employees
+            },
+        )
+        # Every third task mentions the common term, every hundredth the medium and every 100000th the rare one
+        session.execute(
+            text("""
+                INSERT INTO tasks (id, title, description, status, created_at, assignee_id, creator_id)
+                SELECT gen_random_uuid(),
+                       (ARRAY['Prepare', 'Review', 'Send', 'Update', 'Check'])[1 + n % 5] || ' ' ||
+                       CASE WHEN n % 3 = 0 THEN :common WHEN n % 100 = 1 THEN :medium
+                            WHEN n % 100000 = 2 THEN :rare ELSE 'document' END || ' ' || n,
+                       'Task ' || n || ' of the ' ||
+                       (ARRAY['sales', 'finance', 'support', 'engineering', 'marketing'])[1 + n % 5] || ' team',
+                       (ARRAY['pending', 'in_progress', 'completed']::task_status_enum[])[1 + n % 3],
+                       now(), e.ids[1 + n % array_length(e.ids, 1)], e.ids[1]
+                FROM generate_series(1, :tasks) AS n,
+                     (SELECT array_agg(id) AS ids FROM users WHERE username LIKE :prefix || '%') AS e
+                """),
+            {
+                "prefix": _USERNAME_PREFIX,
+                "tasks": tasks,
+                **_TERMS
+            },
+        )
+        session.commit()
+        session.execute(text("ANALYZE users, tasks"))
+
+
+def _cleanup(db_connection: DbConnection) -> None:
+    with db_connection.create_session() as session:
+        bench_users = "SELECT id FROM users WHERE username LIKE :prefix || '%'"
+        params = {"prefix": _USERNAME_PREFIX}
+        session.execute(text(f"DELETE FROM tasks WHERE assignee_id IN ({bench_users})"), params)
+        session.execute(text("DELETE FROM users WHERE username LIKE :prefix || '%'"), params)
+        session.commit()
+
+
+def _client_side(view: ViewTask, term: str) -> int:
+    """
+    Downloads all tasks and keeps those mentioning the term, as clients did before the search existed.
+    """
+
+    matches = 0
+    for chunk in view.export_tasks(export_format=TaskExportFormat.ndjson):
+        for line in chunk.splitlines():
+            task = json.loads(line)
+            matches += term in task["title"].lower() or term in task["description"].lower()
+    return matches
+
+
+def _ilike_page(db_connection: DbConnection, term: str) -> int:
+    pattern = f"%{term}%"
+    stmt = select(*task_out_text_columns()).where(or_(Task.title.ilike(pattern), Task.description.ilike(pattern)))
+    stmt = stmt.order_by(Task.created_at, Task.id).limit(DEFAULT_PAGE_SIZE + 1)
+    with db_connection.create_session() as session:
+        return len(session.execute(stmt).all())
+
+
+def _search_cursor(view: ViewTask, term: str, page: int) -> Optional[str]:
+    """
+    Pages through the search results up to the given page, and returns its cursor.
+    """
+
+    cursor = None
+    for _ in range(page - 1):
+        cursor = view.search_tasks(term, cursor=cursor)["next_cursor"]
+        if cursor is None:
+            break
+    return cursor
+
+
+def _measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"min_secs": min(timings), "median_secs": statistics.median(timings), "max_secs": max(timings)}
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--employees", type=int, default=1_000, help="Number of employees to seed.")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Number of tasks to seed.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per implementation.")
+    parser.add_argument("--deep-page", type=int, default=20, help="The search result page measured besides the first.")
+    parser.add_argument("--skip-client-side", action="store_true", help="Skip downloading all tasks.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    db_connection = config.db.create()
+    create_app_managed_tables(db_connection)
+
+    start = time.perf_counter()
+    _seed(db_connection, args.employees, args.tasks)
+    seed_secs = time.perf_counter() - start
+    try:
+        view = ViewTask(db_connection)
+        results: dict[str, dict[str, dict[str, float]]] = {}
+        for frequency, term in _TERMS.items():
+            results[frequency] = {}
+            if not args.skip_client_side:
+                results[frequency]["client_side"] = _measure(lambda: _client_side(view, term), 1)
+            results[frequency]["ilike_first_page"] = _measure(lambda: _ilike_page(db_connection, term), args.repeat)
+            results[frequency]["search_first_page"] = _measure(lambda: view.search_tasks(term), args.repeat)
+            cursor = _search_cursor(view, term, args.deep_page)
+            if cursor is not None:
+                results[frequency][f"search_page_{args.deep_page}"] = _measure(
+                    lambda: view.search_tasks(term, cursor=cursor), args.repeat)
+
+        report = {"employees": args.employees, "tasks": args.tasks, "seed_secs": seed_secs, "results": results}
+        print(json.dumps(report, indent=2))
+    finally:
+        if not args.keep:
+            _cleanup(db_connection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark of the employee task summary.
+
+Seeds benchmark employees and tasks into the configured database and compares the former
+per-employee COUNT queries with the grouped aggregate query and the counter table read.
+The seeded rows are removed again afterwards unless --keep is given.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.task_summary -c config.yml --employees 10000 --tasks 1000000
+"""
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Callable
+
+from sqlalchemy import text
+
+from backend.model.app_managed_tables import create_app_managed_tables
+from backend.model.task import Task, TaskStatus
+from backend.model.user import User, UserType
+from backend.viewdata.task import EmployeeTaskSummary, ViewTask
+from settings import AppSettings
+from utils.dbconnection import DbConnection
+
+_USERNAME_PREFIX = "bench-employee-"
+
+
+def _seed(db_connection: DbConnection, employees: int, tasks: int) -> None:
+    with db_connection.create_session() as session:
+        session.execute(
+            text("""
+                INSERT INTO users (id, username, hashed_password, role)
+                SELECT gen_random_uuid(), :prefix || n, '', 'employee'
+                FROM generate_series(1, :employees) AS n
+                """),
+            {
+                "prefix": _USERNAME_PREFIX,
+                "employees": employees
+            },
+        )
+        session.execute(
+            text("""
+                INSERT INTO tasks (id, title, description, status, created_at, due_date, assignee_id, creator_id)
+                SELECT gen_random_uuid(), 'Benchmark task ' || n, '',
+                       (ARRAY['pending', 'in_progress', 'completed']::task_status_enum[])[1 + n % 3],
+                       now() - random() * interval '365 days',
+                       CASE WHEN n % 4 <> 0 THEN now() + random() * interval '90 days' END,
+                       e.ids[1 + n % array_length(e.ids, 1)], e.ids[1]
+                FROM generate_series(1, :tasks) AS n,
+                     (SELECT array_agg(id) AS ids FROM users WHERE username LIKE :prefix || '%') AS e
+                """),
+            {
+                "prefix": _USERNAME_PREFIX,
+                "tasks": tasks
+            },
+        )
+        session.commit()
+        session.execute(text("ANALYZE users, tasks"))
+
+
+def _cleanup(db_connection: DbConnection) -> None:
+    with db_connection.create_session() as session:
+        bench_users = "SELECT id FROM users WHERE username LIKE :prefix || '%'"
+        params = {"prefix": _USERNAME_PREFIX}
+        session.execute(text(f"DELETE FROM tasks WHERE assignee_id IN ({bench_users})"), params)
+        session.execute(text(f"DELETE FROM assignee_task_counters WHERE assignee_id IN ({bench_users})"), params)
+        session.execute(text("DELETE FROM users WHERE username LIKE :prefix || '%'"), params)
+        session.commit()
+
+
+def _per_employee_summary(db_connection: DbConnection) -> list[EmployeeTaskSummary]:
+    """
+    The former implementation, which runs two COUNT queries per employee.
+    """
+
+    with db_connection.create_session() as session:
+        employees = session.query(User).filter(User.role == UserType.employee).all()
+        summary: list[EmployeeTaskSummary] = []
+        for emp in employees:
+            total_tasks = session.query(Task).filter(Task.assignee_id == emp.id).count()
+            completed_tasks = session.query(Task).filter(Task.assignee_id == emp.id,
+                                                         Task.status == TaskStatus.completed).count()
+            summary.append(
+                EmployeeTaskSummary(employee_id=emp.id,
+                                    username=emp.username,
+                                    total_tasks=total_tasks,
+                                    completed_tasks=completed_tasks))
+        return summary
+
+
+def _measure(func: Callable[[], list[EmployeeTaskSummary]], repeat: int) -> dict[str, float]:
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"min_secs": min(timings), "median_secs": statistics.median(timings), "max_secs": max(timings)}
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--employees", type=int, default=10_000, help="Number of employees to seed.")
+    parser.add_argument("--tasks", type=int, default=1_000_000, help="Number of tasks to seed.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per implementation.")
+    parser.add_argument("--skip-per-employee", action="store_true", help="Skip the slow per-employee queries.")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    db_connection = config.db.create()
+    create_app_managed_tables(db_connection)
+
+    _seed(db_connection, args.employees, args.tasks)
+    try:
+        aggregate_view = ViewTask(db_connection)
+        counter_view = ViewTask(db_connection, summary_counters=True)
+        counter_view.rebuild_summary_counters()
+
+        results: dict[str, dict[str, float]] = {}
+        if not args.skip_per_employee:
+            results["per_employee"] = _measure(lambda: _per_employee_summary(db_connection), args.repeat)
+        results["aggregate"] = _measure(aggregate_view.get_employee_task_summary, args.repeat)
+        results["counters"] = _measure(counter_view.get_employee_task_summary, args.repeat)
+
+        print(json.dumps({"employees": args.employees, "tasks": args.tasks, "results": results}, indent=2))
+    finally:
+        if not args.keep:
+            _cleanup(db_connection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark of the CPU time spent authenticating a request.
+
+Authenticates the same access token repeatedly and compares, per request,
+
+- parsing the token three times, its header, its claims and the verifying decode, as the
+  authenticator did before,
+- the single verifying decode,
+- serving the verified claims from the token cache.
+
+The user is served from the user cache, so no database is queried and the timings cover the token
+handling alone.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.token_verification -c config.yml --repeat 20000
+"""
+import asyncio
+import json
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+from uuid import uuid4
+
+from jose import jwt
+from starlette.requests import Request
+
+from backend.auth.authenticator import JwtAuthenticator
+from backend.model.user import LoggedInUser, UserType
+from settings import AppSettings
+from utils.ttl_cache import TTLCache
+
+_USERNAME = "bench-token-employee"
+
+
+class _ThreePassAuthenticator(JwtAuthenticator):
+    """
+    Parses the header and the claims of the token before verifying it, as the authenticator did before.
+    """
+
+    def _verified_claims(self, access_token: str) -> dict[str, Any]:
+        jwt.get_unverified_header(access_token)
+        jwt.get_unverified_claims(access_token)
+        return jwt.decode(access_token, key=self._secret_key, algorithms=["HS256"])
+
+
+async def _measure(func: Callable[[], Awaitable[object]], repeat: int) -> dict[str, float]:
+    await func()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        await func()
+    return {
+        "wall_us_per_request": (time.perf_counter() - start_wall) / repeat * 1e6,
+        "cpu_us_per_request": (time.process_time() - start_cpu) / repeat * 1e6,
+    }
+
+
+async def _run(config: AppSettings, repeat: int) -> dict[str, dict[str, float]]:
+    expire = datetime.now(timezone.utc) + timedelta(minutes=config.jwt.token_expire_mins)
+    token = jwt.encode({"sub": _USERNAME, "exp": expire}, config.jwt.secret_key, algorithm="HS256")
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+    user_cache: TTLCache[str, LoggedInUser] = TTLCache(1, 3600)
+    user_cache.put(_USERNAME, LoggedInUser(id=uuid4(), username=_USERNAME, role=UserType.employee))
+    db_connection = config.db.create()
+    authenticators = {
+        "three_pass": _ThreePassAuthenticator(config.jwt.secret_key, db_connection, user_cache),
+        "single_decode": JwtAuthenticator(config.jwt.secret_key, db_connection, user_cache),
+        "token_cache": JwtAuthenticator(config.jwt.secret_key, db_connection, user_cache, token_cache=TTLCache(1,
+                                                                                                               3600)),
+    }
+    return {name: await _measure(lambda: auth.authenticate(request), repeat) for name, auth in authenticators.items()}
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-c", "--conf", dest="conf_file", default="./config.yml", help="Path to config file.")
+    parser.add_argument("--repeat", type=int, default=20000, help="Number of timed requests per implementation.")
+    args = parser.parse_args()
+
+    config = AppSettings.from_yaml(args.conf_file)
+    results = asyncio.run(_run(config, args.repeat))
+    print(json.dumps({"repeat": args.repeat, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 from argparse import ArgumentParser
-from typing import Any
+from typing import Any, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -10,23 +10,84 @@ from utils.postgresql_dbconnection import PostgresqlDbConnectionFactory
 class WebserverConfig(BaseSettings):
     host: str = 'localhost'
     port: int = 8080
+    workers: int = 1
+    backlog: int = 2048
+    limit_concurrency: Optional[int] = None
+    timeout_keep_alive_secs: int = 5
 
 
 class JwtConfig(BaseSettings):
     secret_key: str
     algorithm: str = 'HS256'
     token_expire_mins: int = 30
+    user_cache_size: int = 1024
+    # Users are cached per worker process, and a user change evicts the user from the cache of the process making
+    # it only, so the other processes and instances serve the old user, e.g. its old role, for up to this long
+    user_cache_ttl_secs: float = 60
+    token_cache_size: int = 4096
+
+
+class PasswordConfig(BaseSettings):
+    bcrypt_rounds: int = 12
+    hash_workers: int = 2
+    max_pending: int = 16
+
+
+class MetricsConfig(BaseSettings):
+    enabled: bool = True
+
+
+class QueryBudgetConfig(BaseSettings):
+    enabled: bool = False
+    max_statements: int = 10
+    max_repeats: int = 3
+    route_max_statements: dict[str, int] = {}
+    raise_on_violation: bool = False
+
+
+class TaskConfig(BaseSettings):
+    summary_counters: bool = False
+    change_versions: bool = False
+    change_feed: bool = False
+    change_feed_max_pending: int = 100
+    change_feed_heartbeat_secs: float = 15.0
+
+
+class AdmissionConfig(BaseSettings):
+    enabled: bool = False
+    path_prefix: str = '/v1/tasks'
+    max_pool_wait_secs: float = 0.5
+    max_concurrent_requests: int = 64
+    # The change stream holds its request open for as long as the client listens
+    route_max_concurrent_requests: dict[str, int] = {'GET /v1/tasks/changes': 0}
+    global_rate: float = 1000
+    global_burst: int = 200
+    user_rate: float = 20
+    user_burst: int = 40
+    max_tracked_users: int = 10000
 
 
 class AppSettings(BaseAppSettings):
     webserver: WebserverConfig
     debug: bool = False
+    async_db: bool = False
+    fast_startup: bool = False
+    schema_lock_timeout_secs: float = 600
     db: PostgresqlDbConnectionFactory
     jwt: JwtConfig
+    passwords: PasswordConfig = PasswordConfig()
+    tasks: TaskConfig = TaskConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    query_budget: QueryBudgetConfig = QueryBudgetConfig()
+    admission: AdmissionConfig = AdmissionConfig()
     logging: dict[str, Any]
 
     @classmethod
     def get_config(cls) -> "AppSettings":
+        return cls.from_yaml(cls.get_config_file())
+
+    @staticmethod
+    def get_config_file() -> str:
         parser = ArgumentParser()
         parser.add_argument(
             "-c",
@@ -38,4 +99,4 @@ class AppSettings(BaseAppSettings):
         )
         args = parser.parse_args()
 
-        return cls.from_yaml(args.conf_file)
+        return args.conf_file
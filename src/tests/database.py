@@ -0,0 +1,71 @@
+"""
+Database connections for the tests.
+
+Most tests run against a SQLite file of their own, which is removed when the test ends.
+
+The tests of PostgreSQL specific statements run against the database whose connection string is set
+in the `TEST_POSTGRESQL_URL` environment variable, and are skipped if it is not set. They create,
+change and drop the app managed tables, so it must be a database of its own, e.g.
+`postgresql://postgres@localhost/taskdb_test`.
+"""
+import os
+import tempfile
+import unittest
+
+from utils.dbconnection import AsyncDbConnection, DbConnection
+from utils.postgresql_dbconnection import PostgresqlDbConnectionFactory
+
+POSTGRESQL_URL_ENV = "TEST_POSTGRESQL_URL"
+
+
+def sqlite_db_dir(test_case: unittest.TestCase) -> str:
+    """
+    Creates a directory for SQLite database files, which is removed when the test ends.
+    """
+
+    db_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(db_dir.cleanup)
+    return db_dir.name
+
+
+def sqlite_db_connection(test_case: unittest.TestCase, **settings) -> DbConnection:
+    """
+    Connects to a new SQLite database until the test ends. The settings are passed to the
+    `PostgresqlDbConnectionFactory`, whose pooling works with any SQLAlchemy URL.
+    """
+
+    connection_string = f"sqlite:///{os.path.join(sqlite_db_dir(test_case), 'test.db')}"
+    db_connection = PostgresqlDbConnectionFactory(connection_string=connection_string, **settings).create()
+    test_case.addCleanup(db_connection.engine.dispose)
+    return db_connection
+
+
+def postgresql_url() -> str:
+    """
+    Returns the connection string of the PostgreSQL test database, or skips the test if none is set.
+    """
+
+    url = os.environ.get(POSTGRESQL_URL_ENV)
+    if not url:
+        raise unittest.SkipTest(f"{POSTGRESQL_URL_ENV} is not set")
+    return url
+
+
+def postgresql_db_connection(test_case: unittest.TestCase) -> DbConnection:
+    """
+    Connects to the PostgreSQL test database until the test ends, or skips the test if none is set.
+    """
+
+    db_connection = PostgresqlDbConnectionFactory(connection_string=postgresql_url()).create()
+    test_case.addCleanup(db_connection.engine.dispose)
+    return db_connection
+
+
+def postgresql_async_db_connection(test_case: unittest.IsolatedAsyncioTestCase) -> AsyncDbConnection:
+    """
+    Connects to the PostgreSQL test database with asyncpg until the test ends, or skips the test if none is set.
+    """
+
+    db_connection = PostgresqlDbConnectionFactory(connection_string=postgresql_url()).create_async()
+    test_case.addAsyncCleanup(db_connection.engine.dispose)
+    return db_connection
@@ -0,0 +1,143 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+from uuid import UUID
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from starlette.requests import Request
+
+from backend.api.admission import (
+    UserRateLimitingAuthenticator,
+    register_admission_control,
+)
+from backend.auth.authenticator import DebugAuthenticator
+from utils.dbconnection import DbConnection, PoolStats
+from utils.metrics import MetricsRegistry
+from utils.token_bucket import TokenBucket, TokenBuckets
+
+
+def _pool_stats(checkout_wait_secs_oldest: float) -> PoolStats:
+    return PoolStats(pool_size=1,
+                     checked_out=1,
+                     overflow=0,
+                     checkouts=1,
+                     checkout_wait_secs_total=0,
+                     checkout_wait_secs_max=0,
+                     checkouts_waiting=1 if checkout_wait_secs_oldest else 0,
+                     checkout_wait_secs_oldest=checkout_wait_secs_oldest)
+
+
+class TestAdmissionControlMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.db_connection = MagicMock(spec=DbConnection)
+        self.db_connection.read_replicas = []
+        self.db_connection.pool_stats.return_value = _pool_stats(0)
+        self.registry = MetricsRegistry()
+        self.release = asyncio.Event()
+
+    def _client(self, global_bucket: TokenBucket | None = None) -> httpx.AsyncClient:
+        app = FastAPI()
+        release = self.release
+
+        @app.get("/v1/tasks/slow")
+        async def get_slow():
+            await release.wait()
+            return "slow"
+
+        @app.get("/v1/tasks/fast")
+        async def get_fast():
+            return "fast"
+
+        @app.get("/metrics")
+        async def get_metrics():
+            return "metrics"
+
+        rejections = self.registry.counter("http_requests_rejected_total", "Rejected requests.", ["reason"])
+        register_admission_control(app, [self.db_connection],
+                                   path_prefix="/v1/tasks",
+                                   max_pool_wait_secs=0.5,
+                                   max_concurrent_requests=1,
+                                   route_max_concurrent_requests={"GET /v1/tasks/fast": 0},
+                                   global_bucket=global_bucket,
+                                   rejections=rejections)
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def test_concurrent_requests_are_limited_per_route(self):
+        async with self._client() as client:
+            slow = asyncio.create_task(client.get("/v1/tasks/slow"))
+            await asyncio.sleep(0.05)
+
+            rejected = await client.get("/v1/tasks/slow")
+            fast = await client.get("/v1/tasks/fast")
+            self.release.set()
+
+            self.assertEqual((await slow).status_code, 200)
+            self.assertEqual((rejected.status_code, rejected.headers["Retry-After"]), (503, "1"))
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual((await client.get("/v1/tasks/slow")).status_code, 200)
+        self.assertIn('http_requests_rejected_total{reason="concurrency"} 1', self.registry.render())
+
+    async def test_requests_are_shed_while_the_pool_wait_exceeds_the_threshold(self):
+        async with self._client() as client:
+            self.db_connection.pool_stats.return_value = _pool_stats(0.6)
+            rejected = await client.get("/v1/tasks/fast")
+            unguarded = await client.get("/metrics")
+            self.db_connection.pool_stats.return_value = _pool_stats(0.4)
+            admitted = await client.get("/v1/tasks/fast")
+
+        self.assertEqual((rejected.status_code, rejected.headers["Retry-After"]), (503, "1"))
+        self.assertEqual(unguarded.status_code, 200)
+        self.assertEqual(admitted.status_code, 200)
+        self.assertIn('http_requests_rejected_total{reason="pool_wait"} 1', self.registry.render())
+
+    async def test_global_rate_is_limited(self):
+        now = 0.0
+        async with self._client(TokenBucket(rate=0.5, burst=1, clock=lambda: now)) as client:
+            admitted = await client.get("/v1/tasks/fast")
+            rejected = await client.get("/v1/tasks/fast")
+            now = 2
+            refilled = await client.get("/v1/tasks/fast")
+
+        self.assertEqual(admitted.status_code, 200)
+        self.assertEqual((rejected.status_code, rejected.headers["Retry-After"]), (503, "2"))
+        self.assertEqual(refilled.status_code, 200)
+
+
+class TestUserRateLimitingAuthenticator(unittest.IsolatedAsyncioTestCase):
+
+    async def test_requests_beyond_the_rate_of_the_user_are_rejected(self):
+        now = 0.0
+        user_buckets: TokenBuckets[UUID] = TokenBuckets(rate=0.25, burst=2, max_keys=10, clock=lambda: now)
+        authenticator = UserRateLimitingAuthenticator(DebugAuthenticator(), user_buckets)
+        other_authenticator = UserRateLimitingAuthenticator(
+            DebugAuthenticator({
+                "id": "00000000-0000-0000-0000-000000000001",
+                "role": "Employee",
+                "username": "other"
+            }), user_buckets)
+        request = Request({"type": "http", "headers": []})
+
+        await authenticator.authenticate(request)
+        await authenticator.authenticate(request)
+        with self.assertRaises(HTTPException) as context:
+            await authenticator.authenticate(request)
+        await other_authenticator.authenticate(request)
+
+        self.assertEqual(context.exception.status_code, 429)
+        self.assertEqual(context.exception.headers, {"Retry-After": "4"})
+        now = 4
+        await authenticator.authenticate(request)
+
+    def test_invalidated_users_are_passed_on(self):
+        wrapped = MagicMock(spec=DebugAuthenticator)
+        authenticator = UserRateLimitingAuthenticator(wrapped, TokenBuckets(rate=1, burst=1, max_keys=10))
+
+        authenticator.invalidate_user("alice")
+
+        wrapped.invalidate_user.assert_called_once_with("alice")
+
+
+if __name__ == "__main__":
+    unittest.main()
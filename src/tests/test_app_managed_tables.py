@@ -0,0 +1,142 @@
+import threading
+import unittest
+
+from sqlalchemy import inspect, text
+
+from app import prepare_database
+from backend.model.app_managed_tables import (
+    app_managed_schema_lock,
+    create_app_managed_columns,
+    create_app_managed_indexes,
+    create_app_managed_tables,
+)
+from backend.model.schema_fingerprint import SchemaFingerprint
+from backend.model.task import Task
+from settings import AppSettings
+from tests.database import (
+    postgresql_db_connection,
+    postgresql_url,
+    sqlite_db_connection,
+)
+
+
+class TestAppManagedTables(unittest.TestCase):
+
+    def setUp(self):
+        self.db_connection = sqlite_db_connection(self)
+
+    def _task_index_names(self) -> set[str]:
+        return {index["name"] for index in inspect(self.db_connection.engine).get_indexes(Task.__tablename__)}
+
+    def test_tables_are_created_with_indexes(self):
+        create_app_managed_tables(self.db_connection)
+        self.assertLessEqual({index.name for index in Task.__table__.indexes}, self._task_index_names())
+
+    def test_missing_indexes_are_added_to_existing_tables(self):
+        create_app_managed_tables(self.db_connection)
+        with self.db_connection.engine.begin() as connection:
+            connection.execute(text("DROP INDEX ix_tasks_status_created_at"))
+
+        create_app_managed_indexes(self.db_connection)
+
+        self.assertIn("ix_tasks_status_created_at", self._task_index_names())
+
+    def test_retired_indexes_are_dropped(self):
+        create_app_managed_tables(self.db_connection)
+        with self.db_connection.engine.begin() as connection:
+            connection.execute(text("CREATE INDEX ix_tasks_assignee_id_due_date ON tasks (assignee_id, due_date, id)"))
+
+        create_app_managed_indexes(self.db_connection)
+
+        self.assertNotIn("ix_tasks_assignee_id_due_date", self._task_index_names())
+
+    def test_missing_columns_are_added_to_existing_tables(self):
+        create_app_managed_tables(self.db_connection)
+        with self.db_connection.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE tasks DROP COLUMN updated_at"))
+
+        create_app_managed_columns(self.db_connection)
+
+        columns = {column["name"] for column in inspect(self.db_connection.engine).get_columns(Task.__tablename__)}
+        self.assertIn("updated_at", columns)
+
+    def test_unchanged_schema_is_not_checked_again(self):
+        self.assertTrue(create_app_managed_tables(self.db_connection, skip_unchanged=True))
+        with self.db_connection.engine.begin() as connection:
+            connection.execute(text("DROP INDEX ix_tasks_status_created_at"))
+
+        self.assertFalse(create_app_managed_tables(self.db_connection, skip_unchanged=True))
+        self.assertNotIn("ix_tasks_status_created_at", self._task_index_names())
+
+        self.assertTrue(create_app_managed_tables(self.db_connection))
+        self.assertIn("ix_tasks_status_created_at", self._task_index_names())
+
+    def test_changed_schema_is_checked(self):
+        create_app_managed_tables(self.db_connection)
+        with self.db_connection.engine.begin() as connection:
+            connection.execute(text(f"UPDATE {SchemaFingerprint.__tablename__} SET fingerprint = 'outdated'"))
+            connection.execute(text("DROP INDEX ix_tasks_status_created_at"))
+
+        self.assertTrue(create_app_managed_tables(self.db_connection, skip_unchanged=True))
+        self.assertIn("ix_tasks_status_created_at", self._task_index_names())
+        self.assertFalse(create_app_managed_tables(self.db_connection, skip_unchanged=True))
+
+    def test_schema_lock_does_not_lock_other_databases(self):
+        with app_managed_schema_lock(self.db_connection):
+            create_app_managed_tables(self.db_connection)
+
+        self.assertIn(Task.__tablename__, inspect(self.db_connection.engine).get_table_names())
+
+
+class TestAppManagedTablesOnPostgresql(unittest.TestCase):
+    """
+    Runs against the PostgreSQL test database, see `tests.database`.
+    """
+
+    def setUp(self):
+        self.db_connection = postgresql_db_connection(self)
+        self.config = AppSettings(webserver={},
+                                  db={"connection_string": postgresql_url()},
+                                  jwt={"secret_key": "test"},
+                                  logging={})
+
+    def test_concurrent_starts_create_missing_indexes(self):
+        create_app_managed_tables(self.db_connection)
+        with self.db_connection.engine.begin() as connection:
+            connection.execute(text("DROP INDEX ix_tasks_status_created_at"))
+
+        # The instance holding the schema lock builds the index concurrently, which waits for the
+        # snapshots of the statements running meanwhile, while the other instance waits for the lock
+        started = threading.Barrier(2)
+        errors: list[Exception] = []
+
+        def start_instance():
+            db_connection = self.config.db.create()
+            try:
+                started.wait()
+                prepare_database(self.config, db_connection)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                db_connection.engine.dispose()
+
+        instances = [threading.Thread(target=start_instance, daemon=True) for _ in range(2)]
+        for instance in instances:
+            instance.start()
+        for instance in instances:
+            instance.join(timeout=60)
+
+        self.assertFalse(any(instance.is_alive() for instance in instances), "The starts wait for each other")
+        self.assertEqual(errors, [])
+        indexes = {index["name"] for index in inspect(self.db_connection.engine).get_indexes(Task.__tablename__)}
+        self.assertIn("ix_tasks_status_created_at", indexes)
+
+    def test_schema_lock_times_out(self):
+        with app_managed_schema_lock(self.db_connection):
+            with self.assertRaises(TimeoutError):
+                with app_managed_schema_lock(self.db_connection, timeout_secs=0.3):
+                    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
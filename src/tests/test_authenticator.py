@@ -0,0 +1,122 @@
+import time
+import unittest
+from typing import Any
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from fastapi import HTTPException
+from jose import jwt
+from starlette.requests import Request
+
+import backend.model.task  # noqa: F401  Registers the Task model the relationships of User refer to
+from backend.auth.authenticator import JwtAuthenticator
+from backend.model.user import LoggedInUser, User, UserType
+from utils.dbconnection import DbConnection
+from utils.metrics import MetricsRegistry
+from utils.ttl_cache import TTLCache
+
+SECRET_KEY = "test-secret"
+
+
+def _make_request(username: str, expires_in_secs: float | None = None) -> Request:
+    claims: dict[str, Any] = {"sub": username}
+    if expires_in_secs is not None:
+        claims["exp"] = int(time.time() + expires_in_secs)
+    token = jwt.encode(claims, SECRET_KEY, algorithm="HS256")
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+class TestJwtAuthenticator(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.db_connection = MagicMock(spec=DbConnection)
+        self.session = self.db_connection.create_read_session.return_value.__enter__.return_value
+        self.db_user = User(id=uuid4(), username="alice", role=UserType.employer)
+        self.session.scalar.return_value = self.db_user
+        self.user_cache: TTLCache[str, LoggedInUser] = TTLCache(max_size=10, ttl_secs=60)
+        self.authenticator = JwtAuthenticator(SECRET_KEY, self.db_connection, self.user_cache)
+
+    async def test_authenticate_caches_user(self):
+        first = await self.authenticator.authenticate(_make_request("alice"))
+        second = await self.authenticator.authenticate(_make_request("alice"))
+
+        self.assertEqual(first, LoggedInUser(id=self.db_user.id, username="alice", role=UserType.employer))
+        self.assertEqual(second, first)
+        self.session.scalar.assert_called_once()
+        stats = self.authenticator.user_cache_stats()
+        self.assertEqual((stats.hits, stats.misses), (1, 1))
+
+    async def test_invalidated_user_is_reloaded(self):
+        await self.authenticator.authenticate(_make_request("alice"))
+        self.authenticator.invalidate_user("alice")
+        self.db_user.role = UserType.employee
+
+        user = await self.authenticator.authenticate(_make_request("alice"))
+
+        self.assertEqual(user.role, UserType.employee)
+        self.assertEqual(self.session.scalar.call_count, 2)
+
+    async def test_unknown_user_is_not_cached(self):
+        self.session.scalar.return_value = None
+        for _ in range(2):
+            with self.assertRaises(HTTPException) as context:
+                await self.authenticator.authenticate(_make_request("bob"))
+            self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(self.session.scalar.call_count, 2)
+
+    async def test_without_cache(self):
+        authenticator = JwtAuthenticator(SECRET_KEY, self.db_connection)
+        await authenticator.authenticate(_make_request("alice"))
+        await authenticator.authenticate(_make_request("alice"))
+        self.assertEqual(self.session.scalar.call_count, 2)
+
+    async def test_verified_token_is_cached_until_it_expires(self):
+        self.now = 0.0
+        token_cache: TTLCache[bytes, dict[str, Any]] = TTLCache(max_size=10, ttl_secs=3600, clock=lambda: self.now)
+        authenticator = JwtAuthenticator(SECRET_KEY, self.db_connection, self.user_cache, token_cache=token_cache)
+        request = _make_request("alice", expires_in_secs=600)
+
+        with patch("backend.auth.authenticator.jwt.decode", wraps=jwt.decode) as decode:
+            await authenticator.authenticate(request)
+            await authenticator.authenticate(request)
+            self.assertEqual(decode.call_count, 1)
+
+            self.now = 601
+            await authenticator.authenticate(request)
+            self.assertEqual(decode.call_count, 2)
+
+        stats = authenticator.token_cache_stats()
+        self.assertEqual((stats.hits, stats.misses), (1, 2))
+
+    async def test_invalid_tokens_are_not_cached(self):
+        token_cache: TTLCache[bytes, dict[str, Any]] = TTLCache(max_size=10, ttl_secs=3600)
+        authenticator = JwtAuthenticator(SECRET_KEY, self.db_connection, token_cache=token_cache)
+        expired = _make_request("alice", expires_in_secs=-1)
+        forged_token = jwt.encode({"sub": "alice"}, "other-secret", algorithm="HS256")
+        forged = Request({"type": "http", "headers": [(b"authorization", f"Bearer {forged_token}".encode())]})
+        malformed = Request({"type": "http", "headers": [(b"authorization", b"Bearer not-a-token")]})
+
+        for request in (expired, forged, malformed, forged):
+            with self.assertRaises(HTTPException) as context:
+                await authenticator.authenticate(request)
+            self.assertEqual(context.exception.status_code, 401)
+        self.assertEqual(authenticator.token_cache_stats().size, 0)
+        self.session.scalar.assert_not_called()
+
+    async def test_auth_duration_is_recorded_by_result(self):
+        registry = MetricsRegistry()
+        auth_duration = registry.histogram("auth_duration_seconds", "Auth time.", ["result"])
+        authenticator = JwtAuthenticator(SECRET_KEY, self.db_connection, auth_duration=auth_duration)
+
+        await authenticator.authenticate(_make_request("alice"))
+        self.session.scalar.return_value = None
+        with self.assertRaises(HTTPException):
+            await authenticator.authenticate(_make_request("bob"))
+
+        metrics = registry.render()
+        self.assertIn('auth_duration_seconds_count{result="ok"} 1', metrics)
+        self.assertIn('auth_duration_seconds_count{result="error"} 1', metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from utils.etag import etag_matches, make_etag
+
+
+class TestETag(unittest.TestCase):
+
+    def test_etag_depends_on_all_parts(self):
+        self.assertEqual(make_etag(1, "/v1/tasks/", ""), make_etag(1, "/v1/tasks/", ""))
+        self.assertNotEqual(make_etag(1, "/v1/tasks/", ""), make_etag(2, "/v1/tasks/", ""))
+        self.assertNotEqual(make_etag(1, "/v1/tasks/", ""), make_etag(1, "/v1/tasks/", "limit=5"))
+
+    def test_if_none_match_uses_weak_comparison(self):
+        etag = make_etag(1)
+        self.assertTrue(etag_matches(etag, etag))
+        self.assertTrue(etag_matches(etag.removeprefix("W/"), etag))
+        self.assertTrue(etag_matches(f'"other", {etag}', etag))
+        self.assertTrue(etag_matches("*", etag))
+
+    def test_if_none_match_without_current_etag(self):
+        etag = make_etag(1)
+        self.assertFalse(etag_matches(None, etag))
+        self.assertFalse(etag_matches("", etag))
+        self.assertFalse(etag_matches(make_etag(2), etag))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import text
+
+from backend.api.metrics import AppMetrics, register_metrics_api
+from tests.database import sqlite_db_connection
+from utils.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("request_seconds", "Request time.", ["route"], buckets=[0.1, 1])
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, route="/tasks")
+
+        lines = registry.render().splitlines()
+
+        self.assertEqual(lines[:2], ["# HELP request_seconds Request time.", "# TYPE request_seconds histogram"])
+        self.assertEqual(lines[2:], [
+            'request_seconds_bucket{route="/tasks",le="0.1"} 1',
+            'request_seconds_bucket{route="/tasks",le="1"} 2',
+            'request_seconds_bucket{route="/tasks",le="+Inf"} 3',
+            'request_seconds_sum{route="/tasks"} 5.55',
+            'request_seconds_count{route="/tasks"} 3',
+        ])
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("errors_total", "Errors.", ["detail"]).inc(detail='a "quoted"\\path\n')
+
+        self.assertIn('errors_total{detail="a \\"quoted\\"\\\\path\\n"} 1', registry.render())
+
+    def test_labels_must_match(self):
+        gauge = MetricsRegistry().gauge("in_flight", "In flight.", ["route"])
+        with self.assertRaises(ValueError):
+            gauge.inc(method="GET")
+
+    def test_collectors_run_before_rendering(self):
+        registry = MetricsRegistry()
+        gauge = registry.gauge("pool_size", "Pool size.")
+        registry.add_collector(lambda: gauge.set(5))
+
+        self.assertIn("pool_size 5", registry.render())
+
+
+class TestMetricsApi(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        db_connection = sqlite_db_connection(self)
+
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        def get_item(item_id: int):
+            # Runs in the threadpool, like the handlers calling into a synchronous view
+            with db_connection.create_session() as session:
+                if item_id > 10:
+                    raise HTTPException(status_code=404)
+                return session.execute(text("SELECT :id"), {
+                    "id": item_id
+                }).scalar() + session.execute(text("SELECT 1")).scalar()
+
+        register_metrics_api(app, AppMetrics(MetricsRegistry()), [db_connection])
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_requests_and_statements_are_recorded_per_route(self):
+        for item_id in (1, 2):
+            self.assertEqual((await self.client.get(f"/items/{item_id}")).status_code, 200)
+        self.assertEqual((await self.client.get("/items/11")).status_code, 404)
+
+        response = await self.client.get("/metrics")
+
+        self.assertEqual(response.headers["content-type"], "text/plain; version=0.0.4; charset=utf-8")
+        lines = set(response.text.splitlines())
+        route = 'method="GET",route="/items/{item_id}"'
+        self.assertIn(f'http_request_duration_seconds_count{{{route},status="200"}} 2', lines)
+        self.assertIn(f'http_request_duration_seconds_count{{{route},status="404"}} 1', lines)
+        self.assertIn(f'http_request_db_statements_bucket{{{route},le="0"}} 1', lines)
+        self.assertIn(f'http_request_db_statements_bucket{{{route},le="1"}} 1', lines)
+        self.assertIn(f'http_request_db_statements_bucket{{{route},le="2"}} 3', lines)
+        self.assertIn(f'http_request_db_statements_sum{{{route}}} 4', lines)
+        self.assertIn(f'http_requests_in_flight{{{route}}} 0', lines)
+        self.assertIn('http_requests_in_flight{method="GET",route="/metrics"} 1', lines)
+        self.assertIn('db_pool_checked_out{driver="pysqlite",database="primary"} 0', lines)
@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from utils.password_hasher import PasswordHasher, PasswordHasherSaturatedError
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        # The minimum bcrypt cost keeps the tests fast
+        self.hasher = PasswordHasher(bcrypt_rounds=4, workers=1, max_pending=1)
+        self.addCleanup(self.hasher.shutdown)
+
+    def test_hash_and_verify(self):
+        hashed_password = self.hasher.hash("secret")
+        self.assertTrue(hashed_password.startswith("$2b$04$"))
+        self.assertEqual(self.hasher.verify_and_update("secret", hashed_password), (True, None))
+        self.assertEqual(self.hasher.verify_and_update("wrong", hashed_password), (False, None))
+
+    def test_changed_cost_is_rehashed(self):
+        hashed_password = self.hasher.hash("secret")
+        rehasher = PasswordHasher(bcrypt_rounds=5, workers=1)
+        self.addCleanup(rehasher.shutdown)
+
+        verified, new_hash = rehasher.verify_and_update("secret", hashed_password)
+
+        self.assertTrue(verified)
+        assert new_hash is not None
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertEqual(rehasher.verify_and_update("secret", new_hash), (True, None))
+
+    async def test_saturated_pool_fails_fast(self):
+        pending = asyncio.create_task(self.hasher.hash_async("secret"))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(PasswordHasherSaturatedError):
+            await self.hasher.verify_and_update_async("secret", "")
+
+        hashed_password = await pending
+        self.assertEqual(await self.hasher.verify_and_update_async("secret", hashed_password), (True, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
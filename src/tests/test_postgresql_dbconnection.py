@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from tests.database import sqlite_db_connection, sqlite_db_dir
+from utils.dbconnection import DbConnection
+from utils.postgresql_dbconnection import PostgresqlDbConnectionFactory
+
+
+class TestPostgresqlDbConnection(unittest.TestCase):
+
+    def setUp(self):
+        # Any SQLAlchemy URL exercises the pooling logic, a SQLite file keeps the test self-contained.
+        self.db_connection = sqlite_db_connection(self, pool_size=2, max_overflow=1, pool_timeout_secs=1)
+
+    def test_engine_is_shared(self):
+        self.assertIs(self.db_connection.engine, self.db_connection.engine)
+
+    def test_sessions_share_engine(self):
+        with self.db_connection.create_session() as first, self.db_connection.create_session() as second:
+            self.assertIs(first.get_bind(), self.db_connection.engine)
+            self.assertIs(second.get_bind(), self.db_connection.engine)
+
+    def test_pool_settings_applied(self):
+        pool = self.db_connection.engine.pool
+        self.assertEqual(pool.size(), 2)  # type: ignore
+        self.assertEqual(pool.timeout(), 1)  # type: ignore
+
+    def test_pool_stats(self):
+        with self.db_connection.create_session() as session:
+            session.execute(text("SELECT 1"))
+            stats = self.db_connection.pool_stats()
+            self.assertEqual(stats.pool_size, 2)
+            self.assertEqual(stats.checked_out, 1)
+            self.assertEqual(stats.checkouts, 1)
+            self.assertGreaterEqual(stats.checkout_wait_secs_total, 0)
+
+        stats = self.db_connection.pool_stats()
+        self.assertEqual(stats.checked_out, 0)
+        self.assertEqual(stats.checkouts, 1)
+        self.assertEqual(stats.checkout_wait_secs_max, stats.checkout_wait_secs_total)
+
+    def test_pool_stats_report_waiting_checkouts(self):
+        engine = self.db_connection.engine
+        held = [engine.connect() for _ in range(3)]
+        self.addCleanup(lambda: [connection.close() for connection in held])
+        waiter = threading.Thread(target=lambda: held.append(engine.connect()))
+        waiter.start()
+        time.sleep(0.2)
+
+        stats = self.db_connection.pool_stats()
+        self.assertEqual(stats.checkouts_waiting, 1)
+        self.assertGreaterEqual(stats.checkout_wait_secs_oldest, 0.2)
+
+        held.pop(0).close()
+        waiter.join()
+        stats = self.db_connection.pool_stats()
+        self.assertEqual((stats.checkouts_waiting, stats.checkout_wait_secs_oldest), (0, 0))
+        self.assertGreaterEqual(stats.checkout_wait_secs_max, 0.2)
+
+
+class TestReadReplicas(unittest.TestCase):
+
+    def setUp(self):
+        self.db_dir = sqlite_db_dir(self)
+
+    def _create(self, *replica_names: str, **settings) -> DbConnection:
+        factory = PostgresqlDbConnectionFactory(
+            connection_string=f"sqlite:///{os.path.join(self.db_dir, 'primary.db')}",
+            replicas=[f"sqlite:///{os.path.join(self.db_dir, name)}" for name in replica_names],
+            **settings,
+        )
+        db_connection = factory.create()
+        for connection in (db_connection, *db_connection.read_replicas):
+            self.addCleanup(connection.engine.dispose)
+        return db_connection
+
+    def _read_engine(self, db_connection: DbConnection, reader=None):
+        with db_connection.create_read_session(reader) as session:
+            return session.get_bind()
+
+    def test_reads_from_primary_without_replicas(self):
+        db_connection = self._create()
+
+        self.assertIs(self._read_engine(db_connection, "reader"), db_connection.engine)
+
+    def test_readers_are_spread_over_replicas_and_keep_theirs(self):
+        db_connection = self._create("replica1.db", "replica2.db")
+        first, second = (replica.engine for replica in db_connection.read_replicas)
+
+        self.assertEqual([self._read_engine(db_connection, reader) for reader in ("a", "b", "a", "b")],
+                         [first, second, first, second])
+        self.assertIs(db_connection.create_session().get_bind(), db_connection.engine)
+
+    def test_writer_reads_from_primary_within_read_your_writes_interval(self):
+        db_connection = self._create("replica.db", read_your_writes_secs=60)
+        db_connection.record_write("writer")
+
+        self.assertIs(self._read_engine(db_connection, "writer"), db_connection.engine)
+        self.assertIs(self._read_engine(db_connection, "other"), db_connection.read_replicas[0].engine)
+
+    def test_unreachable_replica_is_skipped(self):
+        db_connection = self._create(os.path.join("missing", "replica.db"), "replica.db")
+        reachable = db_connection.read_replicas[1]
+
+        with self.assertRaises(OperationalError):
+            with db_connection.create_read_session("a") as session:
+                session.execute(text("SELECT 1"))
+
+        self.assertIs(self._read_engine(db_connection, "a"), reachable.engine)
+        self.assertIs(self._read_engine(db_connection, "b"), reachable.engine)
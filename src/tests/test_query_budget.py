@@ -0,0 +1,74 @@
+import unittest
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+from backend.api.query_budget import register_query_budget
+from tests.database import sqlite_db_connection
+from utils.query_budget import QueryBudgetExceededError
+
+
+class TestQueryBudgetMiddleware(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.db_connection = sqlite_db_connection(self)
+
+    def _client(self, raise_on_violation: bool, raise_app_exceptions: bool = True) -> httpx.AsyncClient:
+        app = FastAPI()
+        db_connection = self.db_connection
+
+        @app.get("/items")
+        def get_items(count: int):
+            with db_connection.create_session() as session:
+                return [session.execute(text("SELECT :n"), {"n": n}).scalar() for n in range(count)]
+
+        @app.get("/items/stream")
+        def stream_items(count: int):
+
+            def lines():
+                with db_connection.create_session() as session:
+                    for n in range(count):
+                        yield f"{session.execute(text('SELECT :n'), {'n': n}).scalar()}\n"
+
+            return StreamingResponse(lines())
+
+        register_query_budget(app, [db_connection],
+                              max_statements=3,
+                              max_repeats=2,
+                              route_max_statements={"GET /items": 5},
+                              raise_on_violation=raise_on_violation)
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=raise_app_exceptions),
+                                 base_url="http://test")
+
+    async def test_requests_within_budget_pass(self):
+        async with self._client(raise_on_violation=True) as client:
+            self.assertEqual((await client.get("/items", params={"count": 2})).json(), [0, 1])
+
+    async def test_repeated_statements_raise(self):
+        async with self._client(raise_on_violation=True) as client:
+            with self.assertRaises(QueryBudgetExceededError) as context:
+                await client.get("/items", params={"count": 3})
+        self.assertIn("Query budget of GET /items exceeded", str(context.exception))
+        self.assertIn("statement executed 3 times, possible N+1 query: SELECT ?", str(context.exception))
+
+    async def test_violations_are_logged(self):
+        async with self._client(raise_on_violation=False) as client:
+            with self.assertLogs("backend.api.query_budget", level="WARNING") as logs:
+                response = await client.get("/items", params={"count": 6})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("6 statements executed, at most 5 allowed", logs.output[0])
+
+    async def test_violations_replace_the_response(self):
+        async with self._client(raise_on_violation=True, raise_app_exceptions=False) as client:
+            response = await client.get("/items", params={"count": 3})
+        self.assertEqual(response.status_code, 500)
+
+    async def test_violations_of_streamed_bodies_are_logged(self):
+        async with self._client(raise_on_violation=True) as client:
+            with self.assertLogs("backend.api.query_budget", level="WARNING") as logs:
+                response = await client.get("/items/stream", params={"count": 4})
+        self.assertEqual(response.text, "0\n1\n2\n3\n")
+        self.assertIn("Query budget of GET /items/stream exceeded: 4 statements executed, at most 3 allowed",
+                      logs.output[0])
@@ -0,0 +1,30 @@
+import time
+import unittest
+
+from utils.startup_timing import StartupTimer
+
+
+class TestStartupTimer(unittest.TestCase):
+
+    def test_laps_measure_consecutive_phases(self):
+        timer = StartupTimer()
+        time.sleep(0.01)
+        timer.lap("config")
+        timer.lap("app")
+
+        self.assertEqual(list(timer.phases), ["config", "app"])
+        self.assertGreaterEqual(timer.phases["config"], 0.01)
+        self.assertLess(timer.phases["app"], timer.phases["config"])
+
+    def test_report_includes_time_before_the_timer(self):
+        timer = StartupTimer(started_at=time.time() - 2)
+        timer.add("imports", 1.5)
+        timer.lap("config")
+
+        report = timer.report()
+
+        self.assertRegex(report, r"^2\.\d{3}s \(imports 1\.500s, config 0\.\d{3}s, other 0\.[45]\d{2}s\)$")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import asyncio
+import random
+import time
+import unittest
+from datetime import datetime
+from typing import Any, Callable, Optional
+from unittest.mock import MagicMock
+from uuid import UUID, uuid4
+
+import httpx
+from fastapi import FastAPI
+from jose import jwt
+
+from backend.api.task import register_task_api
+from backend.auth.authenticator import JwtAuthenticator
+from backend.model.user import LoggedInUser, User, UserType
+from backend.viewdata.task import TaskCreate, TaskOut, TaskPage, TaskPageContent
+from utils.dbconnection import DbConnection
+
+SECRET_KEY = "test-secret"
+
+
+def _jitter() -> None:
+    # Yields the thread at a random point, so that concurrent requests interleave
+    time.sleep(random.uniform(0, 0.005))
+
+
+def _echo_task(assignee_id: UUID, creator_id: UUID) -> TaskOut:
+    return TaskOut(
+        id=uuid4(),
+        title="Task",
+        description="",
+        status="Pending",
+        created_at=datetime.now(),
+        due_date=None,
+        assignee_id=assignee_id,
+        creator_id=creator_id,
+        version=1,
+    )
+
+
+class _EchoTaskView:
+    """
+    A task view returning tasks that carry the ID of the user it was called with.
+    """
+
+    change_versions = False
+
+    def create_task(self, task: TaskCreate, current_user: LoggedInUser) -> TaskOut:
+        _jitter()
+        return _echo_task(task.assignee_id, current_user.id)
+
+    def get_task_by_authenticated_user(self, current_user: LoggedInUser, *args: Any) -> TaskPageContent:
+        _jitter()
+        return TaskPage(items=[_echo_task(current_user.id, current_user.id)]).model_dump()
+
+
+class TestTaskApiConcurrency(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.users = {
+            f"user-{index}":
+            User(
+                id=uuid4(),
+                username=f"user-{index}",
+                role=UserType.employee if index % 2 else UserType.employer,
+            )
+            for index in range(20)
+        }
+        db_connection = MagicMock(spec=DbConnection)
+        session = db_connection.create_read_session.return_value.__enter__.return_value
+        session.scalar.side_effect = self._find_user
+
+        # Without a user cache every request looks its user up in the threadpool, maximizing the interleaving
+        app = FastAPI()
+        register_task_api(app, _EchoTaskView(), JwtAuthenticator(SECRET_KEY, db_connection))  # type: ignore
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    def _find_user(self, stmt: Any, params: dict[str, Any]) -> Optional[User]:
+        _jitter()
+        return self.users.get(params["username"])
+
+    async def _request_as(self, user: User) -> UUID:
+        headers = {"Authorization": f"Bearer {jwt.encode({'sub': user.username}, SECRET_KEY, algorithm='HS256')}"}
+        if user.role == UserType.employee:
+            response = await self.client.get("/v1/tasks/my-tasks", headers=headers)
+            self.assertEqual(response.status_code, 200, response.text)
+            return UUID(response.json()["items"][0]["assignee_id"])
+
+        response = await self.client.post("/v1/tasks/",
+                                          headers=headers,
+                                          json={
+                                              "title": "Task",
+                                              "description": "",
+                                              "assignee_id": str(uuid4())
+                                          })
+        self.assertEqual(response.status_code, 200, response.text)
+        return UUID(response.json()["creator_id"])
+
+    async def test_identities_do_not_leak_between_concurrent_requests(self):
+        callers = [random.choice(list(self.users.values())) for _ in range(200)]
+
+        seen_ids = await asyncio.gather(*(self._request_as(user) for user in callers))
+
+        self.assertEqual(seen_ids, [user.id for user in callers])
+
+
+class _VersionedTaskView(_EchoTaskView):
+    """
+    A task view with a change version that the tests advance, counting the task page reads.
+    """
+
+    change_versions = True
+
+    def __init__(self) -> None:
+        self.version = 1
+        self.page_reads = 0
+
+    def get_task_by_authenticated_user(self, current_user: LoggedInUser, sort_by: str, order: str, limit: int,
+                                       cursor: Optional[str], is_current: Callable[...,
+                                                                                   bool]) -> Optional[TaskPageContent]:
+        if is_current(self.version):
+            return None
+        self.page_reads += 1
+        return super().get_task_by_authenticated_user(current_user)
+
+
+class TestTaskApiETags(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.user = User(id=uuid4(), username="employee", role=UserType.employee)
+        self.other_user = User(id=uuid4(), username="other-employee", role=UserType.employee)
+        users = {user.username: user for user in (self.user, self.other_user)}
+        db_connection = MagicMock(spec=DbConnection)
+        session = db_connection.create_read_session.return_value.__enter__.return_value
+        session.scalar.side_effect = lambda stmt, params: users[params["username"]]
+
+        self.task_view = _VersionedTaskView()
+        app = FastAPI()
+        register_task_api(app, self.task_view, JwtAuthenticator(SECRET_KEY, db_connection))  # type: ignore
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        self.headers = {"Authorization": f"Bearer {jwt.encode({'sub': self.user.username}, SECRET_KEY)}"}
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def _get_my_tasks(self, etag: Optional[str] = None, query: str = "") -> httpx.Response:
+        headers = {**self.headers, "If-None-Match": etag} if etag else self.headers
+        return await self.client.get(f"/v1/tasks/my-tasks{query}", headers=headers)
+
+    async def test_unchanged_tasks_are_not_modified(self):
+        response = await self._get_my_tasks()
+        etag = response.headers["ETag"]
+
+        not_modified = await self._get_my_tasks(etag)
+
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.headers["ETag"], etag)
+        self.assertEqual(self.task_view.page_reads, 1)
+        for cached in (response, not_modified):
+            self.assertEqual(cached.headers["Cache-Control"], "private")
+            self.assertEqual(cached.headers["Vary"], "Authorization")
+
+    async def test_changed_tasks_are_sent_again(self):
+        etag = (await self._get_my_tasks()).headers["ETag"]
+        self.task_view.version += 1
+
+        response = await self._get_my_tasks(etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(self.task_view.page_reads, 2)
+
+    async def test_etag_depends_on_the_user(self):
+        etag = (await self._get_my_tasks()).headers["ETag"]
+        other_headers = {
+            "Authorization": f"Bearer {jwt.encode({'sub': self.other_user.username}, SECRET_KEY)}",
+            "If-None-Match": etag,
+        }
+
+        response = await self.client.get("/v1/tasks/my-tasks", headers=other_headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    async def test_etag_depends_on_the_query(self):
+        etag = (await self._get_my_tasks()).headers["ETag"]
+
+        response = await self._get_my_tasks(etag, "?order=desc")
+
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from uuid import uuid4
+
+from backend.api.task import _task_change_events
+from backend.model.task import TaskStatus
+from backend.viewdata.task import TaskChangeEvent, TaskChangeType
+from backend.viewdata.task_feed import TaskChangeFeed
+
+
+class TestTaskChangeFeed(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.feed = TaskChangeFeed(max_pending=2)
+        self.assignee_id, self.creator_id = uuid4(), uuid4()
+
+    def _event(self, change: TaskChangeType = TaskChangeType.created) -> TaskChangeEvent:
+        return TaskChangeEvent(event=change,
+                               task_id=uuid4(),
+                               assignee_id=self.assignee_id,
+                               creator_id=self.creator_id,
+                               status=TaskStatus.pending)
+
+    async def test_dispatch_to_assignee_and_creator(self):
+        event = self._event()
+        with self.feed.subscribe(self.assignee_id) as assignee, self.feed.subscribe(self.creator_id) as creator, \
+                self.feed.subscribe(uuid4()) as other:
+            self.feed.dispatch(event.model_dump_json())
+            self.assertEqual(await assignee.get(), event)
+            self.assertEqual(await creator.get(), event)
+            self.assertTrue(other._queue.empty())
+        self.assertEqual(self.feed.subscription_count, 0)
+
+    async def test_invalid_payload_is_ignored(self):
+        with self.feed.subscribe(self.assignee_id) as subscription:
+            self.feed.dispatch("not a change")
+            self.assertTrue(subscription._queue.empty())
+
+    async def test_overflow_resyncs_subscription(self):
+        with self.feed.subscribe(self.assignee_id) as subscription:
+            for _ in range(3):
+                self.feed.dispatch(self._event().model_dump_json())
+            self.assertIsNone(await subscription.get())
+            self.assertTrue(subscription._queue.empty())
+
+    async def test_resync(self):
+        with self.feed.subscribe(self.assignee_id) as subscription:
+            self.feed.dispatch(self._event().model_dump_json())
+            self.feed.resync()
+            self.assertIsNone(await subscription.get())
+            self.assertTrue(subscription._queue.empty())
+
+    async def test_change_events(self):
+        events = _task_change_events(self.feed, self.assignee_id, heartbeat_secs=0.01)
+        self.assertEqual(await anext(events), ": subscribed\n\n")
+        self.assertEqual(await anext(events), ": keep-alive\n\n")
+
+        event = self._event(TaskChangeType.updated)
+        self.feed.dispatch(event.model_dump_json())
+        self.assertEqual(await anext(events), f"event: updated\ndata: {event.model_dump_json()}\n\n")
+        self.feed.resync()
+        self.assertEqual(await anext(events), "event: resync\ndata: {}\n\n")
+
+        await events.aclose()
+        self.assertEqual(self.feed.subscription_count, 0)
@@ -1,15 +1,35 @@
+import csv
+import json
 import unittest
-from datetime import datetime
-from typing import Any
-from unittest.mock import patch
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Any, Optional
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from pydantic import ValidationError
 
 from backend.model.task import Task, TaskStatus
+from backend.model.task_summary import AssigneeTaskCounter
 from backend.model.user import LoggedInUser, User, UserType
-from backend.viewdata.task import TaskCreate, TaskUpdate, ViewTask
+from backend.viewdata.task import (
+    DEFAULT_PAGE_SIZE,
+    AsyncViewTask,
+    TaskBulkStatusUpdate,
+    TaskChangeEvent,
+    TaskChangeType,
+    TaskCreate,
+    TaskExportFormat,
+    TaskOut,
+    TaskPage,
+    TaskStatusChange,
+    TaskUpdate,
+    ViewTask,
+)
+from backend.viewdata.task_queries import TASK_OUT_COLUMNS, TASK_OUT_UUID_COLUMNS
 
 
 class TestTaskView(unittest.TestCase):
@@ -55,7 +75,7 @@ class TestTaskView(unittest.TestCase):
     def test_create_task(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
         mock_user = User(id=uuid4(), role=UserType.employee)
-        mock_session.query.return_value.filter.return_value.first.return_value = mock_user
+        mock_session.execute.side_effect = _returning_inserted_row
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
@@ -70,10 +90,20 @@ class TestTaskView(unittest.TestCase):
         self.assertEqual(created_task.description, task_data.description)
         self.assertEqual(created_task.assignee_id, task_data.assignee_id)
         self.assertEqual(created_task.creator_id, current_user.id)
+        self.assertEqual(created_task.version, 1)
+        db_connection.record_write.assert_called_once_with(current_user.id)
+        stmt, params = mock_session.execute.call_args.args
+        self.assertIn("INSERT INTO tasks", str(stmt))
+        self.assertIn("FROM users", str(stmt))
+        self.assertEqual(params["created_at"].tzinfo, timezone.utc)
+
+    def test_task_timestamps_default_to_the_time_of_the_write(self):
+        self.assertTrue(Task.created_at.default.is_callable)
+        self.assertTrue(Task.updated_at.onupdate.is_callable)
 
     def test_create_task_invalid_assignee(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_session.query.return_value.filter.return_value.first.return_value = None
+        mock_session.execute.return_value.one_or_none.return_value = None
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
@@ -88,8 +118,8 @@ class TestTaskView(unittest.TestCase):
 
     def test_update_task(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_task = Task(id=uuid4(), title="Test Task", description="This is a test task", status=TaskStatus.pending)
-        mock_session.query.return_value.filter.return_value.first.return_value = mock_task
+        mock_task = _make_task()
+        mock_session.execute.return_value.one_or_none.return_value = _updated_row(mock_task, TaskStatus.completed)
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
@@ -98,60 +128,225 @@ class TestTaskView(unittest.TestCase):
         updated_task = view_task.update_task(mock_task.id, task_update, current_user)
 
         self.assertEqual(updated_task.status, task_update.status)
-        self.assertEqual(updated_task.updated_by, current_user.id)
+        self.assertEqual(updated_task.version, mock_task.version + 1)
+        stmt, params = mock_session.execute.call_args.args
+        self.assertIn("RETURNING", str(stmt))
+        self.assertEqual(params["user_id"], current_user.id)
+        self.assertNotIn("expected_version", params)
+        mock_session.scalar.assert_not_called()
+        mock_session.commit.assert_called_once()
 
     def test_update_task_not_found(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_session.query.return_value.filter.return_value.first.return_value = None
+        mock_session.execute.return_value.one_or_none.return_value = None
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
         task_update = TaskUpdate(status=TaskStatus.completed)
         current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer)
 
-        with self.assertRaises(HTTPException):
+        with self.assertRaises(HTTPException) as context:
             view_task.update_task(uuid4(), task_update, current_user)
+        self.assertEqual(context.exception.status_code, 404)
+
+    def test_update_task_version_conflict(self):
+        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        mock_session.execute.return_value.one_or_none.return_value = None
+        task_id = uuid4()
+        mock_session.scalar.return_value = task_id
+
+        view_task = ViewTask(self._mock_db_connection())
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
+
+        with self.assertRaises(HTTPException) as context:
+            view_task.update_task(task_id, TaskUpdate(status=TaskStatus.completed, version=3), current_user)
+        self.assertEqual(context.exception.status_code, 409)
+        stmt, params = mock_session.execute.call_args.args
+        self.assertIn("tasks.version =", str(stmt))
+        self.assertEqual(params["expected_version"], 3)
+        mock_session.commit.assert_not_called()
 
     def test_delete_task(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_task = Task(id=uuid4(), title="Test Task", description="This is a test task", status=TaskStatus.pending)
-        mock_session.query.return_value.filter.return_value.first.return_value = mock_task
+        mock_task = _make_task()
+        mock_session.execute.return_value.one_or_none.return_value = _updated_row(mock_task, mock_task.status)
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
-        view_task.delete_task(mock_task.id)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer)
+        view_task.delete_task(mock_task.id, current_user)
 
-        mock_session.delete.assert_called_once_with(mock_task)
+        stmt, params = mock_session.execute.call_args.args
+        self.assertTrue(str(stmt).startswith("DELETE FROM tasks"))
+        self.assertEqual(params, {"task_id": mock_task.id})
         mock_session.commit.assert_called_once()
+        db_connection.record_write.assert_called_once_with(current_user.id)
 
     def test_delete_task_not_found(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_session.query.return_value.filter.return_value.first.return_value = None
+        mock_session.execute.return_value.one_or_none.return_value = None
+        mock_session.scalar.return_value = None
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
 
-        with self.assertRaises(HTTPException):
-            view_task.delete_task(uuid4())
+        with self.assertRaises(HTTPException) as context:
+            view_task.delete_task(uuid4(),
+                                  LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer),
+                                  version=1)
+        self.assertEqual(context.exception.status_code, 404)
+        db_connection.record_write.assert_not_called()
 
     def test_get_tasks(self):
-        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_task = Task(id=uuid4(), title="Test Task", description="This is a test task", status=TaskStatus.pending)
-        mock_session.query.return_value.all.return_value = [mock_task]
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_task = _make_task()
+        mock_session.execute.return_value.all.return_value = _page_rows([mock_task])
+
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection)
+        page = view_task.get_tasks()
+
+        self.assertEqual(len(page["items"]), 1)
+        self.assertEqual(page["items"][0]["title"], mock_task.title)
+        self.assertIsNone(page["next_cursor"])
+        params = mock_session.execute.call_args.args[1]
+        self.assertEqual(params["limit"], DEFAULT_PAGE_SIZE + 1)
+
+    def test_get_tasks_next_page(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_tasks = [_make_task() for _ in range(3)]
+        mock_session.execute.return_value.all.return_value = _page_rows(mock_tasks)
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
-        tasks = view_task.get_tasks()
+        page = view_task.get_tasks(limit=2)
+
+        self.assertEqual([task["id"] for task in page["items"]], [task.id for task in mock_tasks[:2]])
+        self.assertIsNotNone(page["next_cursor"])
+
+        mock_session.execute.return_value.all.return_value = _page_rows(mock_tasks[2:])
+        page = view_task.get_tasks(limit=2, cursor=page["next_cursor"])
+
+        self.assertEqual([task["id"] for task in page["items"]], [mock_tasks[2].id])
+        self.assertIsNone(page["next_cursor"])
+        stmt = mock_session.execute.call_args.args[0]
+        self.assertIn("(tasks.created_at, tasks.id) > (", str(stmt))
+        self.assertNotIn(" OR ", str(stmt))
+
+    def test_get_tasks_next_page_by_due_date_includes_tasks_without_due_date(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_tasks = [_make_task() for _ in range(3)]
+        mock_tasks[0].due_date = datetime.now()
+        mock_session.execute.return_value.all.return_value = _page_rows(mock_tasks)
+
+        view_task = ViewTask(self._mock_db_connection())
+        page = view_task.get_tasks(sort_by="due_date", limit=1)
+        view_task.get_tasks(sort_by="due_date", limit=1, cursor=page["next_cursor"])
+
+        stmt = str(mock_session.execute.call_args.args[0])
+        self.assertIn("(tasks.due_date, tasks.id) > (", stmt)
+        self.assertIn("UNION ALL", stmt)
+        self.assertIn("tasks.due_date IS NULL", stmt)
+        self.assertNotIn(" OR ", stmt)
+
+    def test_get_tasks_next_page_by_status_continues_the_status_by_id(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_session.execute.return_value.all.return_value = _page_rows([_make_task() for _ in range(2)])
+
+        view_task = ViewTask(self._mock_db_connection())
+        page = view_task.get_tasks(sort_by="status", order="desc", limit=1)
+        view_task.get_tasks(sort_by="status", order="desc", limit=1, cursor=page["next_cursor"])
+
+        stmt, params = mock_session.execute.call_args.args
+        self.assertEqual(params["cursor_value"], TaskStatus.pending)
+        self.assertIn("tasks.status = :cursor_value AND tasks.id < :cursor_id", str(stmt))
+        self.assertIn("tasks.status < :cursor_value", str(stmt))
+        self.assertNotIn(" OR ", str(stmt))
+
+    def test_search_tasks_next_page(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_tasks = [_make_task() for _ in range(3)]
+        mock_session.execute.return_value.all.return_value = _search_rows(mock_tasks, [0.5, 0.25, 0.25])
+
+        view_task = ViewTask(self._mock_db_connection())
+        page = view_task.search_tasks("test", status_filter=TaskStatus.pending.value, limit=2)
+
+        self.assertEqual([task["id"] for task in page["items"]], [task.id for task in mock_tasks[:2]])
+        self.assertNotIn("rank", page["items"][0])
+        stmt = mock_session.execute.call_args.args[0]
+        self.assertIn("websearch_to_tsquery", str(stmt))
+        self.assertIn("tasks.status", str(stmt))
+
+        mock_session.execute.return_value.all.return_value = _search_rows(mock_tasks[2:], [0.25])
+        page = view_task.search_tasks("test", limit=2, cursor=page["next_cursor"])
+
+        self.assertEqual([task["id"] for task in page["items"]], [mock_tasks[2].id])
+        self.assertIsNone(page["next_cursor"])
+        stmt, params = mock_session.execute.call_args.args
+        self.assertEqual(params["cursor_value"], 0.25)
+        self.assertIn("tasks.id) < (", str(stmt))
+
+    def test_search_tasks_rejects_cursor_of_task_list(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_session.execute.return_value.all.return_value = _page_rows([_make_task() for _ in range(2)])
+
+        view_task = ViewTask(self._mock_db_connection())
+        page = view_task.get_tasks(limit=1)
+
+        with self.assertRaises(HTTPException) as context:
+            view_task.search_tasks("test", cursor=page["next_cursor"])
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_task_page_statement_is_reused(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_session.execute.return_value.all.return_value = []
+
+        view_task = ViewTask(self._mock_db_connection())
+        view_task.get_tasks(assignee_id=uuid4(), limit=5)
+        first_stmt, first_params = mock_session.execute.call_args.args
+        assignee_id = uuid4()
+        view_task.get_tasks(assignee_id=assignee_id, limit=10)
+        stmt, params = mock_session.execute.call_args.args
+
+        self.assertIs(stmt, first_stmt)
+        self.assertEqual(params, {"assignee_id": assignee_id, "limit": 11})
+        self.assertNotEqual(first_params, params)
+
+    def test_get_tasks_response_matches_response_model(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_session.execute.return_value.all.return_value = _page_rows([_make_task() for _ in range(3)])
+
+        view_task = ViewTask(self._mock_db_connection())
+        page = view_task.get_tasks(limit=2)
+
+        self.assertEqual(json.loads(ORJSONResponse(page).body), jsonable_encoder(TaskPage.model_validate(page)))
+
+    def test_get_tasks_invalid_cursor(self):
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection)
+
+        with self.assertRaises(HTTPException) as context:
+            view_task.get_tasks(cursor="invalid cursor")
+        self.assertEqual(context.exception.status_code, 400)
+
+    def test_get_tasks_cursor_of_other_sort_order(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_tasks = [_make_task() for _ in range(2)]
+        mock_session.execute.return_value.all.return_value = _page_rows(mock_tasks)
 
-        self.assertEqual(len(tasks), 1)
-        self.assertEqual(tasks[0].title, mock_task.title)
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection)
+        page = view_task.get_tasks(limit=1)
+
+        with self.assertRaises(HTTPException) as context:
+            view_task.get_tasks(sort_by="due_date", limit=1, cursor=page["next_cursor"])
+        self.assertEqual(context.exception.status_code, 400)
 
     def test_get_employee_task_summary(self):
-        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
         mock_user = User(id=uuid4(), username="testuser", role=UserType.employee)
 
-        mock_session.query.return_value.filter.return_value.all.return_value = [mock_user]
-        mock_session.query.return_value.filter.return_value.count.side_effect = [1, 1]
+        mock_session.execute.return_value.all.return_value = [(mock_user.id, mock_user.username, 1, 1)]
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
@@ -161,16 +356,348 @@ class TestTaskView(unittest.TestCase):
         self.assertEqual(summary[0].username, mock_user.username)
         self.assertEqual(summary[0].total_tasks, 1)
         self.assertEqual(summary[0].completed_tasks, 1)
+        mock_session.execute.assert_called_once()
 
-    def test_get_task_by_authenticated_user(self):
+    def test_get_employee_task_summary_from_counters(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_user = User(id=uuid4(), username="testuser", role=UserType.employee)
+
+        mock_session.execute.return_value.all.return_value = [(mock_user.id, mock_user.username, 2, 1)]
+
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection, summary_counters=True)
+        summary = view_task.get_employee_task_summary()
+
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0].total_tasks, 2)
+        self.assertEqual(summary[0].completed_tasks, 1)
+        stmt = mock_session.execute.call_args.args[0]
+        self.assertIn(AssigneeTaskCounter.__tablename__, str(stmt))
+        self.assertNotIn("GROUP BY", str(stmt))
+
+    def test_create_task_updates_summary_counters(self):
+        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        mock_user = User(id=uuid4(), role=UserType.employee)
+        mock_session.execute.side_effect = _returning_inserted_row
+
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection, summary_counters=True)
+        task_data = TaskCreate(title="Test Task", description="This is a test task", assignee_id=mock_user.id)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer)
+        view_task.create_task(task_data, current_user)
+
+        insert_call, counters_call = mock_session.execute.call_args_list
+        self.assertIn(AssigneeTaskCounter.__tablename__, str(counters_call.args[0]))
+        mock_session.commit.assert_called_once()
+
+    def test_update_task_without_status_change_keeps_summary_counters(self):
         mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
-        mock_task = Task(id=uuid4(), title="Test Task", description="This is a test task", status=TaskStatus.pending)
-        mock_session.query.return_value.filter.return_value.all.return_value = [mock_task]
+        mock_task = _make_task()
+        mock_session.execute.return_value.one_or_none.return_value = _updated_row(mock_task, TaskStatus.in_progress)
+
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection, summary_counters=True)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
+        view_task.update_task(mock_task.id, TaskUpdate(status=TaskStatus.in_progress), current_user)
+
+        mock_session.execute.assert_called_once()
+        self.assertIn("old_status", str(mock_session.execute.call_args.args[0]))
+
+    def test_update_task_to_completed_updates_summary_counters(self):
+        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        mock_task = _make_task()
+        mock_session.execute.return_value.one_or_none.return_value = _updated_row(mock_task, TaskStatus.completed)
+
+        view_task = ViewTask(self._mock_db_connection(), summary_counters=True)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
+        view_task.update_task(mock_task.id, TaskUpdate(status=TaskStatus.completed), current_user)
+
+        update_call, counters_call = mock_session.execute.call_args_list
+        self.assertIn(AssigneeTaskCounter.__tablename__, str(counters_call.args[0]))
+
+    def test_update_task_publishes_change(self):
+        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        mock_task = _make_task()
+        mock_session.execute.return_value.one_or_none.return_value = _updated_row(mock_task, TaskStatus.completed)
+
+        db_connection = self._mock_db_connection()
+        view_task = ViewTask(db_connection, publish_changes=True)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
+        view_task.update_task(mock_task.id, TaskUpdate(status=TaskStatus.completed), current_user)
+
+        stmt = mock_session.execute.call_args.args[0]
+        self.assertIn("pg_notify", str(stmt))
+        payloads = [value for value in stmt.compile().params.values() if isinstance(value, list)][0]
+        self.assertEqual(
+            TaskChangeEvent.model_validate_json(payloads[0]),
+            TaskChangeEvent(event=TaskChangeType.updated,
+                            task_id=mock_task.id,
+                            assignee_id=mock_task.assignee_id,
+                            creator_id=mock_task.creator_id,
+                            status=TaskStatus.completed))
+        mock_session.commit.assert_called_once()
+
+    def test_get_task_by_authenticated_user(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_task = _make_task()
+        mock_session.execute.return_value.all.return_value = _page_rows([mock_task])
 
         db_connection = self._mock_db_connection()
         view_task = ViewTask(db_connection)
         current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
-        tasks = view_task.get_task_by_authenticated_user(current_user)
+        page = view_task.get_task_by_authenticated_user(current_user)
+
+        self.assertEqual(len(page["items"]), 1)
+        self.assertEqual(page["items"][0]["title"], mock_task.title)
+        db_connection.create_read_session.assert_called_once_with(current_user.id)
+        db_connection.create_session.assert_not_called()
+
+    def test_change_version_is_read_in_the_page_session(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        mock_task = _make_task()
+        mock_session.execute.return_value.scalar_one.return_value = 7
+        mock_session.execute.return_value.all.return_value = _page_rows([mock_task])
+        versions: list[int] = []
+
+        db_connection = self._mock_db_connection()
+        page = ViewTask(db_connection).get_tasks(is_current=lambda version: versions.append(version) or False)
+
+        self.assertEqual(versions, [7])
+        self.assertEqual(page["items"][0]["title"], mock_task.title)
+        db_connection.create_read_session.assert_called_once()
+        self.assertEqual(mock_session.execute.call_count, 2)
+
+    def test_create_tasks(self):
+        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        employee_id, unknown_id = uuid4(), uuid4()
+        mock_session.scalars.return_value.all.return_value = [employee_id]
+        mock_session.execute.side_effect = _returning_inserted_row
+
+        view_task = ViewTask(self._mock_db_connection(), summary_counters=True)
+        tasks = [
+            TaskCreate(title="First", description="", assignee_id=employee_id),
+            TaskCreate(title="Second", description="", assignee_id=unknown_id),
+            TaskCreate(title="Third", description="", assignee_id=employee_id),
+        ]
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer)
+        result = view_task.create_tasks(tasks, current_user)
+
+        self.assertEqual([item.status_code for item in result.items], [200, 404, 200])
+        self.assertEqual([item.task.title for item in result.items if item.task], ["First", "Third"])
+        self.assertTrue(all(item.task.creator_id == current_user.id for item in result.items if item.task))
+        mock_session.scalars.assert_called_once()
+        insert_call, counters_call = mock_session.execute.call_args_list
+        self.assertEqual([row["title"] for row in insert_call.args[1]], ["First", "Third"])
+        self.assertIn("assignee_task_counters", str(counters_call.args[0]))
+        mock_session.commit.assert_called_once()
+
+    def test_update_task_statuses(self):
+        mock_session = self._mock_db_connection.return_value.create_session.return_value.__enter__.return_value
+        task, changed_task, missing_id = _make_task(), _make_task(), uuid4()
+        updated_row = MagicMock()
+        updated_row.id = task.id
+        updated_row._mapping = {**TaskOut.model_validate(task).model_dump(), "status": TaskStatus.completed}
+        locked = MagicMock()
+        locked.all.return_value = [
+            _LockedRow(task.id, task.assignee_id, TaskStatus.pending, 1),
+            _LockedRow(changed_task.id, changed_task.assignee_id, TaskStatus.pending, 2),
+        ]
+        mock_session.execute.side_effect = [locked, [updated_row]]
+
+        view_task = ViewTask(self._mock_db_connection())
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
+        result = view_task.update_task_statuses([
+            TaskStatusChange(id=task.id, status=TaskStatus.completed, version=1),
+            TaskStatusChange(id=changed_task.id, status=TaskStatus.completed, version=1),
+            TaskStatusChange(id=missing_id, status=TaskStatus.completed),
+        ], current_user)
+
+        self.assertEqual([item.status_code for item in result.items], [200, 409, 404])
+        self.assertEqual(mock_session.execute.call_args.args[0].compile().params["id_1"], [task.id])
+        assert result.items[0].task is not None
+        self.assertEqual(result.items[0].task.status, TaskStatus.completed)
+        self.assertEqual(mock_session.execute.call_count, 2)
+        mock_session.commit.assert_called_once()
+
+    def test_bulk_status_update_rejects_duplicate_tasks(self):
+        task_id = uuid4()
+        with self.assertRaises(ValidationError):
+            TaskBulkStatusUpdate(updates=[
+                TaskStatusChange(id=task_id, status=TaskStatus.completed),
+                TaskStatusChange(id=task_id, status=TaskStatus.pending),
+            ])
+
+    def test_export_tasks_as_ndjson(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        tasks = [_make_task() for _ in range(3)]
+        mock_session.execute.return_value.partitions.return_value = iter(
+            [_export_rows(tasks[:2]), _export_rows(tasks[2:])])
+
+        view_task = ViewTask(self._mock_db_connection())
+        chunks = view_task.export_tasks(status_filter="Pending", export_format=TaskExportFormat.ndjson)
+        mock_session.execute.assert_not_called()
+        lines = "".join(chunks).splitlines()
+
+        self.assertEqual([json.loads(line)["id"] for line in lines], [str(task.id) for task in tasks])
+        self.assertEqual(mock_session.execute.call_args.kwargs["execution_options"]["yield_per"], 1000)
+
+    def test_export_tasks_as_csv(self):
+        mock_session = self._mock_db_connection.return_value.create_read_session.return_value.__enter__.return_value
+        task = _make_task()
+        task.description = 'With "quotes", commas\nand newlines'
+        mock_session.execute.return_value.partitions.return_value = iter([_export_rows([task])])
+
+        view_task = ViewTask(self._mock_db_connection())
+        rows = list(csv.DictReader("".join(
+            view_task.export_tasks(export_format=TaskExportFormat.csv)).splitlines(True)))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], str(task.id))
+        self.assertEqual(rows[0]["description"], task.description)
+        self.assertEqual(rows[0]["due_date"], "")
+        self.assertEqual(rows[0]["status"], task.status.value)
+        self.assertEqual(rows[0]["created_at"], task.created_at.isoformat())
+
+
+class TestAsyncTaskView(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self._db_connection = MagicMock()
+        self._mock_session = AsyncMock()
+        self._mock_session.add = MagicMock()
+        self._db_connection.create_session.return_value.__aenter__.return_value = self._mock_session
+        self._db_connection.create_read_session.return_value.__aenter__.return_value = self._mock_session
+
+    async def test_create_task(self):
+        assignee_id = uuid4()
+        self._mock_session.execute.side_effect = _returning_inserted_row
+
+        view_task = AsyncViewTask(self._db_connection)
+        task_data = TaskCreate(title="Test Task", description="This is a test task", assignee_id=assignee_id)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer)
+        created_task = await view_task.create_task(task_data, current_user)
+
+        self.assertEqual(created_task.assignee_id, assignee_id)
+        self.assertEqual(created_task.creator_id, current_user.id)
+        self._mock_session.commit.assert_awaited_once()
+
+    async def test_create_task_invalid_assignee(self):
+        self._mock_session.execute.return_value = MagicMock()
+        self._mock_session.execute.return_value.one_or_none.return_value = None
+
+        view_task = AsyncViewTask(self._db_connection)
+        task_data = TaskCreate(title="Test Task", description="This is a test task", assignee_id=uuid4())
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employer)
+
+        with self.assertRaises(HTTPException):
+            await view_task.create_task(task_data, current_user)
+
+    async def test_update_task_not_found(self):
+        self._mock_session.execute.return_value = MagicMock()
+        self._mock_session.execute.return_value.one_or_none.return_value = None
+
+        view_task = AsyncViewTask(self._db_connection)
+        current_user = LoggedInUser(id=uuid4(), username="testuser", role=UserType.employee)
+
+        with self.assertRaises(HTTPException):
+            await view_task.update_task(uuid4(), TaskUpdate(status=TaskStatus.completed), current_user)
+
+    async def test_get_tasks(self):
+        mock_tasks = [_make_task() for _ in range(2)]
+        self._mock_session.execute.return_value = MagicMock()
+        self._mock_session.execute.return_value.all.return_value = _page_rows(mock_tasks)
+
+        view_task = AsyncViewTask(self._db_connection)
+        page = await view_task.get_tasks(limit=1)
+
+        self.assertEqual([task["id"] for task in page["items"]], [mock_tasks[0].id])
+        self.assertIsNotNone(page["next_cursor"])
+
+    async def test_get_employee_task_summary(self):
+        employee_id = uuid4()
+        self._mock_session.execute.return_value = MagicMock()
+        self._mock_session.execute.return_value.all.return_value = [(employee_id, "testuser", 3, 2)]
+
+        view_task = AsyncViewTask(self._db_connection)
+        summary = await view_task.get_employee_task_summary()
+
+        self.assertEqual(summary[0].employee_id, employee_id)
+        self.assertEqual(summary[0].total_tasks, 3)
+        self.assertEqual(summary[0].completed_tasks, 2)
+
+    async def test_export_tasks(self):
+        tasks = [_make_task() for _ in range(2)]
+
+        async def partitions():
+            yield _export_rows(tasks)
+
+        self._mock_session.stream.return_value = MagicMock()
+        self._mock_session.stream.return_value.partitions.return_value = partitions()
+
+        view_task = AsyncViewTask(self._db_connection)
+        chunks = [chunk async for chunk in view_task.export_tasks()]
+
+        self.assertEqual([json.loads(line)["id"] for line in "".join(chunks).splitlines()],
+                         [str(task.id) for task in tasks])
+
+
+_TaskRow = namedtuple("_TaskRow", TASK_OUT_COLUMNS)
+_SearchRow = namedtuple("_SearchRow", [*TASK_OUT_COLUMNS, "rank"])
+_UpdatedRow = namedtuple("_UpdatedRow", [*TASK_OUT_COLUMNS, "old_status"])
+_LockedRow = namedtuple("_LockedRow", ["id", "assignee_id", "status", "version"])
+
+
+def _make_task() -> Task:
+    return Task(id=uuid4(),
+                title="Test Task",
+                description="This is a test task",
+                status=TaskStatus.pending,
+                created_at=datetime.now(),
+                assignee_id=uuid4(),
+                creator_id=uuid4(),
+                version=1)
+
+
+def _page_rows(tasks: list[Task]) -> list[Any]:
+    return [_TaskRow(*(getattr(task, name) for name in TASK_OUT_COLUMNS)) for task in tasks]
+
+
+def _returning_inserted_row(stmt: Any, params: Optional[dict[str, Any] | list[dict[str, Any]]] = None) -> Any:
+    """
+    Mocks the result of the statements of a task write, where `insert_employee_task` returns the inserted
+    task and `insert_tasks` the inserted tasks.
+    """
+
+    result = MagicMock()
+    if isinstance(params, list):
+        result.all.return_value = [_returned_row({name: row[name] for name in TASK_OUT_COLUMNS}) for row in params]
+    elif params is not None:
+        result.one_or_none.return_value = _TaskRow(*(params[name] for name in TASK_OUT_COLUMNS))
+    return result
+
+
+def _returned_row(values: dict[str, Any]) -> Any:
+    row = MagicMock(**values)
+    row._mapping = values
+    return row
+
+
+def _updated_row(task: Task, status: TaskStatus) -> Any:
+    """
+    The row `update_task_status` returns when the task moves to the given status.
+    """
+
+    values = {name: getattr(task, name) for name in TASK_OUT_COLUMNS}
+    return _UpdatedRow(**{**values, "status": status, "version": task.version + 1}, old_status=task.status)
+
+
+def _search_rows(tasks: list[Task], ranks: list[float]) -> list[Any]:
+    return [_SearchRow(*row, rank) for row, rank in zip(_page_rows(tasks), ranks)]
+
 
-        self.assertEqual(len(tasks), 1)
-        self.assertEqual(tasks[0].title, mock_task.title)
+def _export_rows(tasks: list[Task]) -> list[Any]:
+    # `select_task_export` reads the UUIDs as text
+    return [
+        _TaskRow(*(str(getattr(task, name)) if name in TASK_OUT_UUID_COLUMNS else getattr(task, name)
+                   for name in TASK_OUT_COLUMNS)) for task in tasks
+    ]
@@ -0,0 +1,466 @@
+import asyncio
+import select
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from backend.model.app_managed_tables import create_app_managed_tables
+from backend.model.task import TaskStatus
+from backend.model.user import LoggedInUser, User, UserType
+from backend.viewdata.task import (
+    AsyncViewTask,
+    TaskChangeEvent,
+    TaskChangeType,
+    TaskCreate,
+    TaskExportFormat,
+    TaskOut,
+    TaskStatusChange,
+    TaskUpdate,
+    ViewTask,
+)
+from backend.viewdata.task_queries import (
+    TASK_CHANGES_CHANNEL,
+    notify_task_changes,
+    select_task_statuses_for_update,
+    update_task_status,
+)
+from tests.database import (
+    postgresql_async_db_connection,
+    postgresql_db_connection,
+    postgresql_url,
+    sqlite_db_connection,
+)
+from utils.dbconnection import DbConnection
+from utils.pg_notifications import PgNotificationListener
+from utils.query_budget import QueryBudgetExceededError, assert_max_statements
+from utils.statement_log import instrument_engine
+
+
+class TestViewTaskQueryBudget(unittest.TestCase):
+    """
+    Asserts how many SQL statements every `ViewTask` method executes, so that N+1 query patterns are
+    caught before they ship. The statements run against SQLite; the summary counters are disabled.
+    """
+
+    def setUp(self):
+        self.db_connection = sqlite_db_connection(self)
+        create_app_managed_tables(self.db_connection)
+        instrument_engine(self.db_connection.engine)
+
+        self.employer = LoggedInUser(id=uuid4(), username="employer", role=UserType.employer)
+        self.employees = [LoggedInUser(id=uuid4(), username=f"employee-{n}", role=UserType.employee) for n in range(3)]
+        with self.db_connection.create_session() as session:
+            for user in [self.employer, *self.employees]:
+                session.add(User(id=user.id, username=user.username, hashed_password="", role=user.role))
+            session.commit()
+        self.view_task = ViewTask(self.db_connection)
+
+    def _create_tasks(self, count: int) -> list[TaskCreate]:
+        tasks = [
+            TaskCreate(title=f"Task {n}", description="", assignee_id=self.employees[n % len(self.employees)].id)
+            for n in range(count)
+        ]
+        result = self.view_task.create_tasks(tasks, self.employer)
+        return [item.task for item in result.items if item.task]
+
+    def test_create_task(self):
+        with assert_max_statements(1):
+            self.view_task.create_task(TaskCreate(title="Task", description="", assignee_id=self.employees[0].id),
+                                       self.employer)
+
+    def test_create_task_for_non_employee_inserts_nothing(self):
+        with assert_max_statements(1), self.assertRaises(HTTPException) as context:
+            self.view_task.create_task(TaskCreate(title="Task", description="", assignee_id=self.employer.id),
+                                       self.employer)
+        self.assertEqual(context.exception.status_code, 404)
+        self.assertEqual(self.view_task.get_tasks()["items"], [])
+
+    def test_create_tasks(self):
+        tasks = [TaskCreate(title=f"Task {n}", description="", assignee_id=self.employees[n % 3].id) for n in range(50)]
+        with assert_max_statements(2):
+            result = self.view_task.create_tasks(tasks, self.employer)
+        # The created tasks are read back, so they hold the same values as the task list
+        created = {str(item.task.id): item.task.created_at for item in result.items}
+        read = {task["id"]: task["created_at"] for task in self.view_task.get_tasks(limit=50)["items"]}
+        self.assertEqual(created, read)
+
+    def test_get_tasks(self):
+        self._create_tasks(20)
+        with assert_max_statements(1):
+            page = self.view_task.get_tasks(limit=5)
+        with assert_max_statements(1):
+            self.view_task.get_tasks(status_filter=TaskStatus.pending.value, limit=5, cursor=page["next_cursor"])
+
+    def test_get_tasks_pages(self):
+        tasks = self._create_tasks(20)
+        self.view_task.update_task_statuses(
+            [TaskStatusChange(id=task.id, status=list(TaskStatus)[n % 3]) for n, task in enumerate(tasks)],
+            self.employees[0])
+        for sort_by in ("created_at", "status"):
+            for order in ("asc", "desc"):
+                expected = [task["id"] for task in self.view_task.get_tasks(sort_by=sort_by, order=order)["items"]]
+                ids, cursor = [], None
+                while True:
+                    page = self.view_task.get_tasks(sort_by=sort_by, order=order, limit=3, cursor=cursor)
+                    ids += [task["id"] for task in page["items"]]
+                    cursor = page["next_cursor"]
+                    if cursor is None:
+                        break
+                self.assertEqual(ids, expected, f"sort_by={sort_by} order={order}")
+
+    def test_get_task_by_authenticated_user(self):
+        self._create_tasks(20)
+        with assert_max_statements(1):
+            self.view_task.get_task_by_authenticated_user(self.employees[0])
+
+    def test_export_tasks(self):
+        self._create_tasks(20)
+        with assert_max_statements(1):
+            list(self.view_task.export_tasks(export_format=TaskExportFormat.csv))
+
+    def test_update_task(self):
+        task = self._create_tasks(1)[0]
+        with assert_max_statements(1):
+            self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed), self.employees[0])
+
+    def test_update_task_version_conflict(self):
+        task = self._create_tasks(1)[0]
+        updated = self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.in_progress, version=1),
+                                             self.employees[0])
+        self.assertEqual(updated.version, 2)
+        with assert_max_statements(2), self.assertRaises(HTTPException) as context:
+            self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed, version=1), self.employees[0])
+        self.assertEqual(context.exception.status_code, 409)
+
+    def test_update_task_statuses(self):
+        tasks = self._create_tasks(30)
+        updates = [TaskStatusChange(id=task.id, status=list(TaskStatus)[n % 3]) for n, task in enumerate(tasks)]
+        with assert_max_statements(1 + len(TaskStatus)):
+            self.view_task.update_task_statuses(updates, self.employees[0])
+
+    def test_delete_task(self):
+        task = self._create_tasks(1)[0]
+        with assert_max_statements(1):
+            self.view_task.delete_task(task.id, self.employer)
+
+    def test_get_employee_task_summary(self):
+        self._create_tasks(20)
+        with assert_max_statements(1):
+            self.view_task.get_employee_task_summary()
+
+    def test_change_versions(self):
+        view_task = ViewTask(self.db_connection, change_versions=True)
+        with assert_max_statements(4):
+            task = view_task.create_task(TaskCreate(title="Task", description="", assignee_id=self.employees[0].id),
+                                         self.employer)
+        with assert_max_statements(2):
+            version = _change_version(view_task)
+        assignee_version = _change_version(view_task, self.employees[0].id)
+        other_version = _change_version(view_task, self.employees[1].id)
+
+        with assert_max_statements(4):
+            view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed), self.employees[0])
+
+        self.assertGreater(_change_version(view_task), version)
+        self.assertGreater(_change_version(view_task, self.employees[0].id), assignee_version)
+        self.assertEqual(_change_version(view_task, self.employees[1].id), other_version)
+
+    def test_current_change_version_skips_the_page(self):
+        self._create_tasks(5)
+        with assert_max_statements(1):
+            self.assertIsNone(self.view_task.get_tasks(is_current=lambda version: True))
+        with assert_max_statements(1):
+            self.assertIsNone(self.view_task.get_employee_task_summary(is_current=lambda *version: True))
+
+    def test_repeated_statements_are_reported(self):
+        tasks = self._create_tasks(3)
+        with self.assertRaises(QueryBudgetExceededError) as context:
+            with assert_max_statements(10, max_repeats=1):
+                for task in tasks:
+                    self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed), self.employees[0])
+        self.assertIn("possible N+1 query", str(context.exception))
+
+
+class TestViewTaskOnPostgresql(unittest.TestCase):
+    """
+    Runs the statements of `ViewTask` against the PostgreSQL test database, see `tests.database`, with the
+    summary counters, the change versions and the change notifications enabled.
+    """
+
+    def setUp(self):
+        self.db_connection = postgresql_db_connection(self)
+        self.employer, self.employees = _create_postgresql_users(self.db_connection)
+        self.view_task = ViewTask(self.db_connection, summary_counters=True, change_versions=True, publish_changes=True)
+
+    def _create_tasks(self, *titles: str) -> list[TaskOut]:
+        tasks = [
+            TaskCreate(title=title, description="", assignee_id=self.employees[n % len(self.employees)].id)
+            for n, title in enumerate(titles)
+        ]
+        return [item.task for item in self.view_task.create_tasks(tasks, self.employer).items if item.task]
+
+    def test_summary_counters_are_upserted(self):
+        tasks = self._create_tasks("First", "Second", "Third", "Fourth")
+        task = self.view_task.create_task(TaskCreate(title="Fifth", description="", assignee_id=self.employees[0].id),
+                                          self.employer)
+        self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed), self.employees[0])
+        self.view_task.update_task_statuses(
+            [TaskStatusChange(id=task.id, status=TaskStatus.completed) for task in tasks[:2]], self.employees[0])
+        self.view_task.delete_task(tasks[0].id, self.employer)
+
+        summary = {item.employee_id: item for item in self.view_task.get_employee_task_summary()}
+        self.assertEqual([(item.total_tasks, item.completed_tasks) for item in summary.values()], [(2, 1), (2, 1)])
+        counted = {item.employee_id: item for item in ViewTask(self.db_connection).get_employee_task_summary()}
+        self.assertEqual(summary, counted)
+
+    def test_change_versions_are_upserted(self):
+        version = _change_version(self.view_task)
+        other_version = _change_version(self.view_task, self.employees[1].id)
+
+        task = self.view_task.create_task(TaskCreate(title="Task", description="", assignee_id=self.employees[0].id),
+                                          self.employer)
+        self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed), self.employees[0])
+
+        self.assertEqual(_change_version(self.view_task, self.employees[0].id), 2)
+        self.assertEqual(_change_version(self.view_task, self.employees[1].id), other_version)
+        self.view_task.advance_change_versions()
+        self.assertEqual(_change_version(self.view_task), version + 2 + 1 + len(self.employees))
+
+    def test_search_tasks(self):
+        tasks = [("Fix the login bug", "Users are logged out"), ("Write the release notes", "Mention the login fix"),
+                 ("Paint the office", "")]
+        bug, notes, office = [
+            self.view_task.create_task(
+                TaskCreate(title=title, description=description, assignee_id=self.employees[0].id), self.employer)
+            for title, description in tasks
+        ]
+
+        def search(query: str, **kwargs) -> list[str]:
+            return [task["id"] for task in self.view_task.search_tasks(query, **kwargs)["items"]]
+
+        # Title matches rank above description matches
+        self.assertEqual(search("login"), [str(bug.id), str(notes.id)])
+        self.assertEqual(search('"release notes"'), [str(notes.id)])
+        self.assertEqual(search("login -bug"), [str(notes.id)])
+        self.assertEqual(set(search("office or release")), {str(notes.id), str(office.id)})
+        self.assertEqual(search("login", status_filter=TaskStatus.completed.value), [])
+
+        page = self.view_task.search_tasks("login", limit=1)
+        self.assertEqual([task["id"] for task in page["items"]], [str(bug.id)])
+        page = self.view_task.search_tasks("login", limit=1, cursor=page["next_cursor"])
+        self.assertEqual([task["id"] for task in page["items"]], [str(notes.id)])
+        self.assertIsNone(page["next_cursor"])
+
+    def test_changes_are_notified_on_commit(self):
+        listener = self.db_connection.engine.raw_connection()
+        self.addCleanup(listener.invalidate)
+        listener.driver_connection.autocommit = True
+        listener.cursor().execute(f"LISTEN {TASK_CHANGES_CHANNEL}")
+
+        tasks = self._create_tasks("First", "Second", "Third")
+        events = [TaskChangeEvent.model_validate_json(payload) for payload in _notifications(listener, 3)]
+        self.assertEqual({(event.event, event.task_id)
+                          for event in events}, {(TaskChangeType.created, task.id)
+                                                 for task in tasks})
+
+        with self.db_connection.create_session() as session:
+            session.execute(notify_task_changes(["rolled back"]))
+            session.rollback()
+            session.execute(notify_task_changes(["committed"]))
+            session.commit()
+        self.assertEqual(_notifications(listener, 1), ["committed"])
+
+    def test_version_conflicts(self):
+        task = self._create_tasks("Task")[0]
+        self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.in_progress, version=1), self.employees[0])
+
+        for write in (
+                lambda: self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed, version=1), self.
+                                                   employees[0]),
+                lambda: self.view_task.delete_task(task.id, self.employer, version=1),
+        ):
+            with self.assertRaises(HTTPException) as context:
+                write()
+            self.assertEqual(context.exception.status_code, 409)
+        with self.assertRaises(HTTPException) as context:
+            self.view_task.update_task(uuid4(), TaskUpdate(status=TaskStatus.completed, version=1), self.employees[0])
+        self.assertEqual(context.exception.status_code, 404)
+
+        self.view_task.delete_task(task.id, self.employer, version=2)
+        self.assertEqual(self.view_task.get_tasks()["items"], [])
+
+    def test_update_task_waits_for_concurrent_update(self):
+        task = self._create_tasks("Task")[0]
+        with self.db_connection.create_session() as session, ThreadPoolExecutor(1) as executor:
+            session.execute(*update_task_status(task.id, TaskStatus.in_progress, self.employees[0].id,
+                                                datetime.now(timezone.utc), 1, True))
+            update = executor.submit(self.view_task.update_task, task.id,
+                                     TaskUpdate(status=TaskStatus.completed, version=1), self.employees[0])
+            _wait_for_lock(self.db_connection)
+            self.assertFalse(update.done())
+            session.commit()
+
+            with self.assertRaises(HTTPException) as context:
+                update.result(timeout=10)
+        self.assertEqual(context.exception.status_code, 409)
+
+    def test_update_task_statuses_locks_the_tasks(self):
+        tasks = self._create_tasks("First", "Second")
+        updates = [
+            TaskStatusChange(id=task_id, status=TaskStatus.completed, version=1)
+            for task_id in [tasks[0].id, tasks[1].id, uuid4()]
+        ]
+        with self.db_connection.create_session() as session, ThreadPoolExecutor(1) as executor:
+            session.execute(select_task_statuses_for_update([tasks[0].id])).all()
+            result = executor.submit(self.view_task.update_task_statuses, updates, self.employees[0])
+            _wait_for_lock(self.db_connection)
+            self.assertFalse(result.done())
+            session.execute(*update_task_status(tasks[0].id, TaskStatus.in_progress, self.employees[0].id,
+                                                datetime.now(timezone.utc), 1, True))
+            session.commit()
+
+            items = result.result(timeout=10).items
+        self.assertEqual([item.status_code for item in items], [409, 200, 404])
+        self.assertEqual((items[1].task.status, items[1].task.version), (TaskStatus.completed.value, 2))
+
+
+class TestAsyncViewTaskOnPostgresql(unittest.IsolatedAsyncioTestCase):
+    """
+    Runs the statements of `AsyncViewTask` against the PostgreSQL test database with asyncpg, like
+    `TestViewTaskOnPostgresql`.
+    """
+
+    def setUp(self):
+        self.employer, self.employees = _create_postgresql_users(postgresql_db_connection(self))
+        self.db_connection = postgresql_async_db_connection(self)
+        self.view_task = AsyncViewTask(self.db_connection,
+                                       summary_counters=True,
+                                       change_versions=True,
+                                       publish_changes=True)
+
+    async def test_writes_and_reads(self):
+        task = await self.view_task.create_task(
+            TaskCreate(title="Fix the login bug", description="", assignee_id=self.employees[0].id), self.employer)
+        result = await self.view_task.create_tasks([
+            TaskCreate(title=f"Task {n}", description="", assignee_id=employee.id)
+            for n, employee in enumerate([*self.employees, self.employer])
+        ], self.employer)
+        self.assertEqual([item.status_code for item in result.items], [200, 200, 404])
+
+        page = await self.view_task.get_tasks(limit=2)
+        page = await self.view_task.get_tasks(limit=2, cursor=page["next_cursor"])
+        self.assertEqual(len(page["items"]), 1)
+        self.assertIsNone(page["next_cursor"])
+        search = await self.view_task.search_tasks("login")
+        self.assertEqual([task["id"] for task in search["items"]], [str(task.id)])
+
+        updated = await self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed, version=1),
+                                                   self.employees[0])
+        self.assertEqual(updated.version, 2)
+        with self.assertRaises(HTTPException) as context:
+            await self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.pending, version=1),
+                                             self.employees[0])
+        self.assertEqual(context.exception.status_code, 409)
+        bulk = await self.view_task.update_task_statuses([
+            TaskStatusChange(id=task.id, status=TaskStatus.in_progress, version=1),
+            TaskStatusChange(id=result.items[0].task.id, status=TaskStatus.completed, version=1),
+        ], self.employees[0])
+        self.assertEqual([item.status_code for item in bulk.items], [409, 200])
+        await self.view_task.delete_task(result.items[1].task.id, self.employer)
+
+        summary = {item.employee_id: item for item in await self.view_task.get_employee_task_summary()}
+        counted = await AsyncViewTask(self.db_connection).get_employee_task_summary()
+        self.assertEqual(summary, {item.employee_id: item for item in counted})
+        self.assertEqual(sorted((item.total_tasks, item.completed_tasks) for item in summary.values()), [(0, 0),
+                                                                                                         (2, 2)])
+        mine = await self.view_task.get_task_by_authenticated_user(self.employees[0])
+        self.assertEqual(len(mine["items"]), 2)
+        exported = "".join([chunk async for chunk in self.view_task.export_tasks()])
+        self.assertEqual(len(exported.splitlines()), 2)
+
+    async def test_changes_are_published(self):
+        payloads: list[str] = []
+        listener = PgNotificationListener(postgresql_url(), TASK_CHANGES_CHANNEL, payloads.append, lambda: None)
+        listener.start()
+        self.addAsyncCleanup(listener.stop)
+        await asyncio.wait_for(listener.listening.wait(), timeout=10)
+
+        task = await self.view_task.create_task(
+            TaskCreate(title="Task", description="", assignee_id=self.employees[0].id), self.employer)
+        await self.view_task.update_task(task.id, TaskUpdate(status=TaskStatus.completed), self.employees[0])
+        await self.view_task.delete_task(task.id, self.employer)
+        for _ in range(100):
+            if len(payloads) == 3:
+                break
+            await asyncio.sleep(0.1)
+
+        events = [TaskChangeEvent.model_validate_json(payload) for payload in payloads]
+        self.assertEqual([(event.event, event.task_id, event.status) for event in events],
+                         [(TaskChangeType.created, task.id, TaskStatus.pending),
+                          (TaskChangeType.updated, task.id, TaskStatus.completed),
+                          (TaskChangeType.deleted, task.id, TaskStatus.completed)])
+
+
+def _change_version(view_task: ViewTask, assignee_id: Optional[UUID] = None) -> int:
+    """
+    The change version `get_tasks` reads before the page of the assignee's tasks, or of all tasks.
+    """
+
+    versions: list[int] = []
+    view_task.get_tasks(assignee_id, is_current=lambda version: versions.append(version) or False)
+    return versions[0]
+
+
+def _create_postgresql_users(db_connection: DbConnection) -> tuple[LoggedInUser, list[LoggedInUser]]:
+    """
+    Creates the app managed tables in the PostgreSQL test database, removes the users and tasks of earlier
+    tests, and adds an employer and two employees.
+    """
+
+    create_app_managed_tables(db_connection)
+    employer = LoggedInUser(id=uuid4(), username="employer", role=UserType.employer)
+    employees = [LoggedInUser(id=uuid4(), username=f"employee-{n}", role=UserType.employee) for n in range(2)]
+    with db_connection.create_session() as session:
+        # The tasks, summary counters and change versions reference the users
+        session.execute(text(f"TRUNCATE {User.__tablename__} CASCADE"))
+        for user in [employer, *employees]:
+            session.add(User(id=user.id, username=user.username, hashed_password="", role=user.role))
+        session.commit()
+    return employer, employees
+
+
+def _notifications(listener: Any, count: int, timeout_secs: float = 10) -> list[str]:
+    """
+    Waits for the payloads of the given number of notifications on a listening psycopg2 connection.
+    """
+
+    connection = listener.driver_connection
+    deadline = time.monotonic() + timeout_secs
+    while len(connection.notifies) < count and time.monotonic() < deadline:
+        select.select([connection], [], [], deadline - time.monotonic())
+        connection.poll()
+    payloads = [notification.payload for notification in connection.notifies]
+    connection.notifies.clear()
+    return payloads
+
+
+def _wait_for_lock(db_connection: DbConnection, timeout_secs: float = 10) -> None:
+    """
+    Waits until a statement of another session waits for a lock.
+    """
+
+    waiting = text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() "
+                   "AND wait_event_type = 'Lock'")
+    deadline = time.monotonic() + timeout_secs
+    with db_connection.engine.connect() as connection:
+        while not connection.execute(waiting).scalar():
+            if time.monotonic() > deadline:
+                raise TimeoutError("No statement waits for a lock")
+            time.sleep(0.05)
+            connection.rollback()
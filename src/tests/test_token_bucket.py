@@ -0,0 +1,48 @@
+import unittest
+
+from utils.token_bucket import TokenBucket, TokenBuckets
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.bucket = TokenBucket(rate=2, burst=3, clock=lambda: self.now)
+
+    def test_burst_is_admitted(self):
+        self.assertEqual([self.bucket.acquire() for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.bucket.acquire(), 0.5)
+
+    def test_tokens_are_refilled_at_rate(self):
+        for _ in range(3):
+            self.bucket.acquire()
+        self.now = 0.25
+        self.assertEqual(self.bucket.acquire(), 0.25)
+        self.now = 0.5
+        self.assertEqual(self.bucket.acquire(), 0)
+        self.now = 100
+        self.assertEqual([self.bucket.acquire() for _ in range(4)], [0, 0, 0, 0.5])
+
+
+class TestTokenBuckets(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.buckets: TokenBuckets[str] = TokenBuckets(rate=1, burst=1, max_keys=2, clock=lambda: self.now)
+
+    def test_keys_have_buckets_of_their_own(self):
+        self.assertEqual(self.buckets.acquire("a"), 0)
+        self.assertEqual(self.buckets.acquire("b"), 0)
+        self.assertEqual(self.buckets.acquire("a"), 1)
+
+    def test_least_recently_used_bucket_is_dropped(self):
+        self.buckets.acquire("a")
+        self.buckets.acquire("b")
+        self.buckets.acquire("a")
+        self.buckets.acquire("c")
+        self.assertEqual(self.buckets.acquire("a"), 1)
+        self.assertEqual(self.buckets.acquire("b"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from utils.ttl_cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache: TTLCache[str, int] = TTLCache(max_size=2, ttl_secs=10, clock=lambda: self.now)
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("a"))
+        self.cache.put("a", 1)
+        self.assertEqual(self.cache.get("a"), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats.hits, stats.misses, stats.size), (1, 1, 1))
+
+    def test_entries_expire(self):
+        self.cache.put("a", 1)
+        self.now = 9.9
+        self.assertEqual(self.cache.get("a"), 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats().size, 0)
+
+    def test_entry_ttl_is_capped_by_cache_ttl(self):
+        self.cache.put("a", 1, ttl_secs=5)
+        self.cache.put("b", 2, ttl_secs=60)
+        self.cache.put("c", 3, ttl_secs=0)
+        self.now = 5
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNone(self.cache.get("c"))
+        self.now = 9.9
+        self.assertEqual(self.cache.get("b"), 2)
+        self.now = 10
+        self.assertIsNone(self.cache.get("b"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        self.cache.get("a")
+        self.cache.put("c", 3)
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("c"), 3)
+
+    def test_invalidate(self):
+        self.cache.put("a", 1)
+        self.cache.invalidate("a")
+        self.cache.invalidate("missing")
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_zero_size_disables_cache(self):
+        cache: TTLCache[str, int] = TTLCache(max_size=0, ttl_secs=10)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
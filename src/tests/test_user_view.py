@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+from fastapi import HTTPException
+
+import backend.model.task  # noqa: F401  Registers the Task model the relationships of User refer to
+from backend.auth.authenticator import Authenticator
+from backend.model.user import UserType
+from backend.viewdata.user import AsyncViewUser, ViewUser
+from utils.dbconnection import AsyncDbConnection, DbConnection
+from utils.jwt_token import JWTUtils
+
+
+class TestViewUser(unittest.TestCase):
+
+    def setUp(self):
+        self.db_connection = MagicMock(spec=DbConnection)
+        self.session = self.db_connection.create_session.return_value.__enter__.return_value
+        self.jwt_utils = MagicMock(spec=JWTUtils)
+        self.jwt_utils.get_password_hash.return_value = "hash"
+        self.authenticator = MagicMock(spec=Authenticator)
+        self.view_user = ViewUser(self.db_connection, self.jwt_utils, 30, self.authenticator)
+
+    def test_create_user_invalidates_the_user(self):
+        self.view_user.create_user("alice", "password", UserType.employee)
+
+        self.session.commit.assert_called_once()
+        self.authenticator.invalidate_user.assert_called_once_with("alice")
+        self.db_connection.record_write.assert_called_once_with("alice")
+
+    def test_update_user_role_invalidates_the_user(self):
+        self.session.execute.return_value.one_or_none.return_value = (uuid4(), )
+
+        self.view_user.update_user_role("alice", UserType.employee)
+
+        stmt = self.session.execute.call_args.args[0]
+        self.assertTrue(str(stmt).startswith("UPDATE users SET role"))
+        self.session.commit.assert_called_once()
+        self.authenticator.invalidate_user.assert_called_once_with("alice")
+        self.db_connection.record_write.assert_called_once_with("alice")
+
+    def test_update_role_of_unknown_user(self):
+        self.session.execute.return_value.one_or_none.return_value = None
+
+        with self.assertRaises(HTTPException) as context:
+            self.view_user.update_user_role("bob", UserType.employee)
+
+        self.assertEqual(context.exception.status_code, 404)
+        self.authenticator.invalidate_user.assert_not_called()
+
+
+class TestAsyncViewUser(unittest.IsolatedAsyncioTestCase):
+
+    async def test_update_user_role_invalidates_the_user(self):
+        db_connection = MagicMock(spec=AsyncDbConnection)
+        session = db_connection.create_session.return_value.__aenter__.return_value
+        session.execute.return_value.one_or_none.return_value = (uuid4(), )
+        authenticator = MagicMock(spec=Authenticator)
+        view_user = AsyncViewUser(db_connection, MagicMock(spec=JWTUtils), 30, authenticator)
+
+        await view_user.update_user_role("alice", UserType.employer)
+
+        session.commit.assert_awaited_once()
+        authenticator.invalidate_user.assert_called_once_with("alice")
+        db_connection.record_write.assert_called_once_with("alice")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,19 @@
+import inspect
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+
+async def call_maybe_async(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Calls either a coroutine function or a blocking function from the event loop.
+    Blocking functions run in the threadpool, so they do not block the event loop.
+
+    :param func: the coroutine function or blocking function to call
+    :param args: the positional arguments of the call
+    :param kwargs: the keyword arguments of the call
+    :return: the result of the call
+    """
+    if inspect.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+    return await run_in_threadpool(func, *args, **kwargs)
@@ -0,0 +1,32 @@
+import base64
+import json
+from typing import Any
+
+
+def encode_cursor(values: dict[str, Any]) -> str:
+    """
+    Encodes the position of a page boundary into an opaque, URL safe cursor string.
+
+    :param values: JSON serializable values identifying the last row of a page
+    :return: the opaque cursor
+    """
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    :param cursor: the opaque cursor
+    :return: the values the cursor was created from
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except ValueError as error:
+        raise ValueError(f"Malformed cursor: {cursor}") from error
+    if not isinstance(values, dict):
+        raise ValueError(f"Malformed cursor: {cursor}")
+    return values
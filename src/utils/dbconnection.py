@@ -18,10 +18,24 @@ Classes:
         Methods:
             create_session() -> Session: An abstract method that should create and return a new
             SQLAlchemy Session instance.
+            create_read_session(reader) -> Session: Creates a session for reads, which may be served
+            by a read replica.
+            record_write(writer) -> None: Records a committed write, for read-your-writes consistency.
+            pool_stats() -> PoolStats: An abstract method that should return a snapshot of the
+            connection pool statistics.
+
+    AsyncDbConnection:
+        The asyncio counterpart of DbConnection, handing out SQLAlchemy AsyncSession instances.
+
+    PoolStats:
+        A snapshot of connection pool usage and checkout wait times.
 """
 from abc import ABC, abstractmethod
+from typing import Hashable, Optional, Sequence
 
+from pydantic import BaseModel
 from sqlalchemy import Engine, Table
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from sqlalchemy.orm.session import Session
 
@@ -48,6 +62,32 @@ class SqlDataTableBase(Base):
     __table__: Table  # type: ignore
 
 
+class PoolStats(BaseModel):
+    """
+    Snapshot of the connection pool of a database connection.
+
+    Attributes:
+        pool_size (int): The number of connections the pool keeps open.
+        checked_out (int): The number of connections currently in use.
+        overflow (int): The number of connections opened beyond `pool_size`.
+        checkouts (int): The total number of connection checkouts.
+        checkout_wait_secs_total (float): The accumulated time spent waiting for a connection.
+        checkout_wait_secs_max (float): The longest time a single checkout had to wait.
+        checkouts_waiting (int): The number of checkouts currently waiting for a connection.
+        checkout_wait_secs_oldest (float): How long the longest waiting of the current checkouts has waited
+            so far, 0 if none is waiting.
+    """
+
+    pool_size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    checkout_wait_secs_total: float
+    checkout_wait_secs_max: float
+    checkouts_waiting: int
+    checkout_wait_secs_oldest: float
+
+
 class DbConnection(ABC):
     """
     Abstract base class for database connections.
@@ -61,6 +101,11 @@ class DbConnection(ABC):
     Methods:
         create_session() -> Session: Abstract method that should create and return
         a new database session.
+        create_read_session(reader) -> Session: Creates a session for reads, by default on the
+        database `create_session` writes to.
+        record_write(writer) -> None: Records that the writer committed a write.
+        pool_stats() -> PoolStats: Abstract method that should return the current
+        connection pool statistics.
     """
 
     @property
@@ -76,15 +121,123 @@ class DbConnection(ABC):
     @abstractmethod
     def create_session(self) -> Session:
         """
-        Creates and returns a new database session.
+        Creates and returns a new database session, which all writes go through.
 
         Returns:
             Session: A new database session object.
         """
 
+    @property
+    def read_replicas(self) -> Sequence["DbConnection"]:
+        """
+        Returns the connections to the read replicas, which are empty unless replicas are configured.
+        """
+        return ()
+
+    def create_read_session(self, reader: Optional[Hashable] = None) -> Session:
+        """
+        Creates a session for queries that may see the data with a replication lag. Without read
+        replicas it is a session on the primary database, as created by `create_session`.
+
+        Args:
+            reader (Optional[Hashable]): Identifies the reader, e.g. the ID of the authenticated user,
+                so its reads see the writes it recorded with `record_write`.
+
+        Returns:
+            Session: A new database session object, which must not write.
+        """
+        return self.create_session()
+
+    def record_write(self, writer: Hashable) -> None:
+        """
+        Records that the writer committed a write, so its reads are served by the primary database for
+        a while. Without read replicas nothing has to be recorded.
+
+        Args:
+            writer (Hashable): Identifies the writer, as the `reader` of `create_read_session`.
+        """
+
+    @abstractmethod
+    def pool_stats(self) -> PoolStats:
+        """
+        Returns a snapshot of the connection pool statistics.
+
+        Returns:
+            PoolStats: The current pool usage and checkout wait times.
+        """
+
+
+class AsyncDbConnection(ABC):
+    """
+    Abstract base class for asyncio database connections.
+
+    This class defines the same interface as `DbConnection`, for SQLAlchemy's asyncio extension.
+
+    Attributes:
+        engine (AsyncEngine): Abstract property that should return the asyncio database engine.
+
+    Methods:
+        create_session() -> AsyncSession: Abstract method that should create and return
+        a new asyncio database session.
+        create_read_session(reader) -> AsyncSession: Creates an asyncio session for reads.
+        record_write(writer) -> None: Records that the writer committed a write.
+        pool_stats() -> PoolStats: Abstract method that should return the current
+        connection pool statistics.
+    """
+
+    @property
+    @abstractmethod
+    def engine(self) -> AsyncEngine:
+        """
+        Returns the asyncio database engine.
+
+        Returns:
+            AsyncEngine: An SQLAlchemy AsyncEngine instance connected to the database.
+        """
+
+    @abstractmethod
+    def create_session(self) -> AsyncSession:
+        """
+        Creates and returns a new asyncio database session, which all writes go through.
+
+        Returns:
+            AsyncSession: A new asyncio database session object.
+        """
+
+    @property
+    def read_replicas(self) -> Sequence["AsyncDbConnection"]:
+        """
+        Returns the connections to the read replicas, see `DbConnection.read_replicas`.
+        """
+        return ()
+
+    def create_read_session(self, reader: Optional[Hashable] = None) -> AsyncSession:
+        """
+        Creates an asyncio session for reads, see `DbConnection.create_read_session`.
+        """
+        return self.create_session()
+
+    def record_write(self, writer: Hashable) -> None:
+        """
+        Records that the writer committed a write, see `DbConnection.record_write`.
+        """
+
+    @abstractmethod
+    def pool_stats(self) -> PoolStats:
+        """
+        Returns a snapshot of the connection pool statistics.
+
+        Returns:
+            PoolStats: The current pool usage and checkout wait times.
+        """
+
 
 class DbConnectionFactory(ABC):
 
     @abstractmethod
     def create(self) -> DbConnection:
         pass
+
+    @abstractmethod
+    def create_async(self) -> AsyncDbConnection:
+        pass
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Any, Optional
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Creates a weak entity tag from the values that determine a response, e.g. a change version and
+    the query string, so responses built from equal values share their tag.
+
+    :param parts: the values, which are compared by their string form
+    :return: the quoted entity tag, for the `ETag` header
+    """
+    digest = hashlib.blake2b("\x1f".join(str(part) for part in parts).encode("utf-8"), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluates an `If-None-Match` header against the current entity tag, using the weak comparison
+    the header requires.
+
+    :param if_none_match: the header value, a list of entity tags or `*`, or None if it is missing
+    :param etag: the current entity tag
+    :return: True if the client's representation is current, so a 304 Not Modified can be sent
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(","))
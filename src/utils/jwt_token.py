@@ -2,18 +2,20 @@ from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
 
 from jose import jwt
-from passlib.context import CryptContext
+from sqlalchemy import Update, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm.session import Session
 
 from backend.model.user import User
+from utils.password_hasher import PasswordHasher
 
 
 class JWTUtils:
 
-    def __init__(self, secret_key: str, algorithm: str) -> None:
+    def __init__(self, secret_key: str, algorithm: str, password_hasher: Optional[PasswordHasher] = None) -> None:
         self._secret_key = secret_key
         self._algorithm = algorithm
-        self._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._password_hasher = password_hasher or PasswordHasher()
 
     def create_access_token(self, data: dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         to_encode = data.copy()
@@ -26,13 +28,51 @@ class JWTUtils:
         return encoded_jwt
 
     def authenticate_user(self, session: Session, username: str, password: str) -> Optional[User]:
-        user = session.query(User).filter(User.username == username).first()
-        if not user or not self._verify_password(password, user.hashed_password):
+        """
+        Verifies the password of a user. A password hash with an outdated bcrypt cost is replaced.
+
+        The user is detached from the session and its transaction ended before the password is verified,
+        so the database connection is not held while bcrypt runs.
+
+        :raises PasswordHasherSaturatedError: if too many password operations are pending
+        """
+        user = session.scalar(select(User).where(User.username == username))
+        if not user:
+            return None
+        session.expunge(user)
+        session.rollback()
+        verified, new_hash = self._password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            session.execute(_update_password_hash(user, new_hash))
+            session.commit()
         return user
 
-    def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self._pwd_context.verify(plain_password, hashed_password)
+    async def authenticate_user_async(self, session: AsyncSession, username: str, password: str) -> Optional[User]:
+        """
+        The asyncio variant of `authenticate_user`.
+        """
+        user = await session.scalar(select(User).where(User.username == username))
+        if not user:
+            return None
+        session.expunge(user)
+        await session.rollback()
+        verified, new_hash = await self._password_hasher.verify_and_update_async(password, user.hashed_password)
+        if not verified:
+            return None
+        if new_hash:
+            await session.execute(_update_password_hash(user, new_hash))
+            await session.commit()
+        return user
 
     def get_password_hash(self, password: str) -> str:
-        return self._pwd_context.hash(password)
+        return self._password_hasher.hash(password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        return await self._password_hasher.hash_async(password)
+
+
+def _update_password_hash(user: User, new_hash: str) -> Update:
+    user.hashed_password = new_hash
+    return update(User).where(User.id == user.id).values(hashed_password=new_hash)
@@ -0,0 +1,201 @@
+import math
+import threading
+from typing import Callable, Iterator, Sequence, TypeVar
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_M = TypeVar("_M", bound="_Metric")
+
+
+class _Metric:
+    """
+    A metric family, holding one value per combination of label values.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self._documentation = documentation
+        self._label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self._label_names):
+            raise ValueError(f"{self.name} expects the labels {', '.join(self._label_names)}")
+        return tuple(str(labels[name]) for name in self._label_names)
+
+    def _format_labels(self, key: tuple[str, ...], extra: str = "") -> str:
+        labels = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(self._label_names, key)]
+        if extra:
+            labels.append(extra)
+        return "{" + ",".join(labels) + "}" if labels else ""
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {_escape_help(self._documentation)}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class _ValueMetric(_Metric):
+    """
+    A metric holding a single value per combination of label values.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def _add(self, amount: float, labels: dict[str, str]) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+
+
+class Counter(_ValueMetric):
+    """
+    A value that only goes up, e.g. the number of executed statements.
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self._add(amount, labels)
+
+
+class Gauge(_ValueMetric):
+    """
+    A value that goes up and down, e.g. the number of requests in flight.
+    """
+
+    type_name = "gauge"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self._add(-amount, labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """
+    Counts observations, e.g. request durations, in cumulative buckets, and tracks their sum.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self,
+                 name: str,
+                 documentation: str,
+                 label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """
+        :param name: the metric name
+        :param documentation: the help text of the metric
+        :param label_names: the names of the labels every observation is made with
+        :param buckets: the upper bounds of the buckets, an +Inf bucket is always added
+        """
+        super().__init__(name, documentation, label_names)
+        self._buckets = tuple(sorted(buckets))
+        # Per label values: the observation count of every bucket, without +Inf, the sum and the total count
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self._buckets), 0.0, 0)
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in values:
+            for bound, bucket_count in zip(self._buckets, counts):
+                bucket_labels = self._format_labels(key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{bucket_labels} {bucket_count}"
+            inf_labels = self._format_labels(key, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf_labels} {count}"
+            yield f"{self.name}_sum{self._format_labels(key)} {_format_value(total)}"
+            yield f"{self.name}_count{self._format_labels(key)} {count}"
+
+
+class MetricsRegistry:
+    """
+    Holds the metrics of the process and renders them in the Prometheus text exposition format.
+
+    Metrics whose values are read from elsewhere, e.g. connection pool statistics, are updated by
+    collectors right before rendering.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(self,
+                  name: str,
+                  documentation: str,
+                  label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """
+        :param collector: called before every rendering, to update metrics from their source
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        :return: all metrics in the Prometheus text exposition format
+        """
+        for collector in self._collectors:
+            collector()
+        lines = [line for metric in self._metrics for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: _M) -> _M:
+        if any(registered.name == metric.name for registered in self._metrics):
+            raise ValueError(f"A metric named {metric.name} is already registered")
+        self._metrics.append(metric)
+        return metric
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value: str) -> str:
+    return _escape_help(value).replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+
+class PasswordHasherSaturatedError(Exception):
+    """
+    Raised when a password can not be hashed or verified, because too many requests are pending.
+    """
+
+
+@lru_cache(maxsize=None)
+def _crypt_context(bcrypt_rounds: int) -> CryptContext:
+    # Built on first use, which only happens in the worker processes, so the web workers never build it.
+    # Hashes with a different cost are reported as needing an update, so they are rehashed on login
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=bcrypt_rounds)
+
+
+def _hash(password: str, bcrypt_rounds: int) -> str:
+    return _crypt_context(bcrypt_rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str, bcrypt_rounds: int) -> tuple[bool, Optional[str]]:
+    return _crypt_context(bcrypt_rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Hashes and verifies bcrypt passwords in a pool of worker processes.
+
+    bcrypt keeps a CPU busy for tens of milliseconds and holds the GIL meanwhile, so running it in
+    the web worker stalls every other request. The number of pending operations is bounded, so a
+    burst of logins fails fast instead of queueing up behind each other.
+    """
+
+    def __init__(self, bcrypt_rounds: int = 12, workers: int = 2, max_pending: int = 16) -> None:
+        """
+        :param bcrypt_rounds: the bcrypt cost factor of new hashes
+        :param workers: the number of worker processes
+        :param max_pending: the maximum number of running and queued operations
+        """
+        self._bcrypt_rounds = bcrypt_rounds
+        self._workers = workers
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def hash(self, password: str) -> str:
+        """
+        :param password: the plain password
+        :return: the bcrypt hash of the password
+        :raises PasswordHasherSaturatedError: if too many operations are pending
+        """
+        return self._submit(_hash, password, self._bcrypt_rounds).result()
+
+    def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        :param password: the plain password
+        :param hashed_password: the stored hash
+        :return: whether the password matches, and a new hash if the stored one uses a different cost
+        :raises PasswordHasherSaturatedError: if too many operations are pending
+        """
+        return self._submit(_verify_and_update, password, hashed_password, self._bcrypt_rounds).result()
+
+    async def hash_async(self, password: str) -> str:
+        """
+        The asyncio variant of `hash`.
+        """
+        return await asyncio.wrap_future(self._submit(_hash, password, self._bcrypt_rounds))
+
+    async def verify_and_update_async(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        The asyncio variant of `verify_and_update`.
+        """
+        return await asyncio.wrap_future(
+            self._submit(_verify_and_update, password, hashed_password, self._bcrypt_rounds))
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker processes. They are started again on the next use.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> Future[Any]:
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHasherSaturatedError("Too many pending password operations")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # Forking a process that runs threads can copy locks in a held state, spawned workers start clean
+                    self._executor = ProcessPoolExecutor(max_workers=self._workers,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
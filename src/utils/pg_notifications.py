@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+import asyncpg
+from sqlalchemy import make_url
+
+
+class PgNotificationListener:
+    """
+    Listens to a PostgreSQL notification channel on a connection of its own, and passes the payload of
+    every notification to a callback in the event loop.
+
+    A lost connection is re-established after the retry interval. Notifications sent in between are
+    missed, which the reconnect callback is told about. The connection is checked with a query
+    every check interval, so connections lost without notice are noticed as well.
+    """
+
+    def __init__(self,
+                 connection_string: str,
+                 channel: str,
+                 on_notification: Callable[[str], None],
+                 on_reconnect: Callable[[], None],
+                 retry_secs: float = 1.0,
+                 check_secs: float = 30.0) -> None:
+        """
+        :param connection_string: the SQLAlchemy URL of the database, which is connected to with asyncpg
+        :param channel: the channel to listen to
+        :param on_notification: called with the payload of every notification
+        :param on_reconnect: called when the connection has been re-established after it was lost
+        :param retry_secs: the time to wait before reconnecting
+        :param check_secs: the time without notifications after which the connection is checked
+        """
+        self._dsn = make_url(connection_string).set(drivername="postgresql").render_as_string(hide_password=False)
+        self._channel = channel
+        self._on_notification = on_notification
+        self._on_reconnect = on_reconnect
+        self._retry_secs = retry_secs
+        self._check_secs = check_secs
+        self._task: Optional[asyncio.Task[None]] = None
+        self._logger = logging.getLogger(__name__)
+        self.listening = asyncio.Event()
+
+    def start(self) -> None:
+        """
+        Starts listening in the background of the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop(self) -> None:
+        """
+        Stops listening and closes the connection.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _listen(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self._dsn)
+            except (OSError, asyncpg.PostgresError) as error:
+                self._logger.warning("Could not listen to %s: %s", self._channel, error)
+                await asyncio.sleep(self._retry_secs)
+                continue
+
+            lost = asyncio.Event()
+            connection.add_termination_listener(lambda _: lost.set())
+            try:
+                await connection.add_listener(self._channel, self._notify)
+                self.listening.set()
+                if connected_before:
+                    self._on_reconnect()
+                connected_before = True
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), self._check_secs)
+                    except asyncio.TimeoutError:
+                        await connection.execute("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                self._logger.warning("Lost the connection listening to %s: %s", self._channel, error)
+            finally:
+                self.listening.clear()
+                if not connection.is_closed():
+                    connection.terminate()
+            await asyncio.sleep(self._retry_secs)
+
+    def _notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        self._on_notification(payload)
@@ -1,17 +1,248 @@
+import itertools
+import threading
+import time
+from dataclasses import field
+from typing import Any, Callable, Generic, Hashable, Optional, Sequence, TypeVar
+
 from pydantic.dataclasses import dataclass as pd_dataclass
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.engine import ExceptionContext
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    Pool,
+    PoolProxiedConnection,
+    QueuePool,
+)
+
+from utils.dbconnection import (
+    AsyncDbConnection,
+    DbConnection,
+    DbConnectionFactory,
+    PoolStats,
+)
+from utils.ttl_cache import TTLCache
 
-from utils.dbconnection import DbConnection, DbConnectionFactory
+_C = TypeVar("_C", DbConnection, AsyncDbConnection)
+
+# The number of readers whose replica assignment and recent write are remembered
+_MAX_TRACKED_READERS = 10_000
 
 
 @pd_dataclass
 class PostgresqlDbConnectionFactory(DbConnectionFactory):
     connection_string: str
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_recycle_secs: int = 1800
+    pool_pre_ping: bool = True
+    pool_timeout_secs: float = 30
+    async_driver: str = "asyncpg"
+    replicas: list[str] = field(default_factory=list)
+    read_your_writes_secs: float = 5
+    replica_retry_secs: float = 30
+    prepared_statement_cache_size: int = 500
 
     def create(self) -> DbConnection:
-        return PostgresqlDbConnection(self.connection_string)
+        return PostgresqlDbConnection(
+            self.connection_string,
+            read_replicas=[PostgresqlDbConnection(replica, **self._pool_settings()) for replica in self.replicas],
+            read_your_writes_secs=self.read_your_writes_secs,
+            replica_retry_secs=self.replica_retry_secs,
+            **self._pool_settings(),
+        )
+
+    def create_async(self) -> AsyncDbConnection:
+        return PostgresqlAsyncDbConnection(
+            self._async_url(self.connection_string),
+            read_replicas=[
+                PostgresqlAsyncDbConnection(self._async_url(replica), **self._pool_settings())
+                for replica in self.replicas
+            ],
+            read_your_writes_secs=self.read_your_writes_secs,
+            replica_retry_secs=self.replica_retry_secs,
+            **self._pool_settings(),
+        )
+
+    def _async_url(self, connection_string: str) -> str:
+        url = make_url(connection_string).set(drivername=f"postgresql+{self.async_driver}")
+        if self.async_driver == "asyncpg":
+            # asyncpg prepares every statement on the server and keeps the most recent ones per connection
+            url = url.update_query_dict({"prepared_statement_cache_size": str(self.prepared_statement_cache_size)})
+        return url.render_as_string(hide_password=False)
+
+    def _pool_settings(self) -> dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_recycle_secs": self.pool_recycle_secs,
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_timeout_secs": self.pool_timeout_secs,
+        }
+
+
+class _CheckoutRecorder:
+    """
+    Thread-safe accumulator for the time spent checking out pooled connections.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_secs_total = 0.0
+        self.wait_secs_max = 0.0
+        # The start times of the pending checkouts, oldest first
+        self._waiting: dict[object, float] = {}
+
+    def start(self) -> object:
+        checkout = object()
+        with self._lock:
+            self._waiting[checkout] = time.perf_counter()
+        return checkout
+
+    def finish(self, checkout: object) -> None:
+        with self._lock:
+            wait_secs = time.perf_counter() - self._waiting.pop(checkout)
+            self.checkouts += 1
+            self.wait_secs_total += wait_secs
+            self.wait_secs_max = max(self.wait_secs_max, wait_secs)
+
+    def waiting(self) -> tuple[int, float]:
+        """
+        Returns the number of pending checkouts, and how long the oldest of them has been waiting.
+        """
+        with self._lock:
+            if not self._waiting:
+                return 0, 0.0
+            return len(self._waiting), time.perf_counter() - next(iter(self._waiting.values()))
+
+
+class _TimedQueuePool(QueuePool):
+    """
+    A `QueuePool` that records how long every connection checkout waits, including the time
+    spent opening new connections and pre-pinging pooled ones.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.recorder = _CheckoutRecorder()
+
+    def connect(self) -> PoolProxiedConnection:
+        checkout = self.recorder.start()
+        try:
+            return super().connect()
+        finally:
+            self.recorder.finish(checkout)
+
+    def recreate(self) -> "_TimedQueuePool":
+        pool = super().recreate()
+        assert isinstance(pool, _TimedQueuePool)
+        pool.recorder = self.recorder
+        return pool
+
+
+class _TimedAsyncAdaptedQueuePool(_TimedQueuePool, AsyncAdaptedQueuePool):
+    """
+    The asyncio compatible variant of `_TimedQueuePool`.
+    """
+
+
+class _ReplicaRouter(Generic[_C]):
+    """
+    Chooses the database a read session is opened on.
+
+    Readers are assigned to the healthy replicas round-robin, and a reader keeps its replica while
+    that stays healthy, so consecutive reads never go back in time because replicas lag differently.
+    Reads without a reader are spread round-robin. A reader that recorded a write within the
+    read-your-writes window reads from the primary, which has the write for certain.
+
+    A replica is healthy until connecting to it fails or one of its connections is lost, and is then
+    skipped for the retry interval. Reads fall back to the primary while no replica is healthy. The
+    recorded writes are those of this process, so read-your-writes holds for readers that keep
+    talking to the same process.
+    """
+
+    def __init__(self,
+                 replicas: Sequence[_C],
+                 read_your_writes_secs: float,
+                 retry_secs: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param replicas: the connections to the replicas
+        :param read_your_writes_secs: how long the reads of a writer go to the primary, 0 to disable
+        :param retry_secs: how long a failed replica is skipped
+        :param clock: the monotonic clock the intervals are measured with
+        """
+        self.replicas = tuple(replicas)
+        self._retry_secs = retry_secs
+        self._clock = clock
+        self._recent_writers: TTLCache[Hashable, bool] = TTLCache(_MAX_TRACKED_READERS, read_your_writes_secs, clock)
+        # Assignments outlive the write window, so readers return to the replica they read before
+        self._assignments: TTLCache[Hashable, int] = TTLCache(_MAX_TRACKED_READERS, 3600, clock)
+        self._unhealthy_until = [0.0] * len(self.replicas)
+        self._instrumented = [False] * len(self.replicas)
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose(self, reader: Optional[Hashable]) -> Optional[_C]:
+        """
+        :param reader: identifies the reader, or None
+        :return: the replica to read from, or None to read from the primary
+        """
+        if not self.replicas or (reader is not None and self._recent_writers.get(reader)):
+            return None
+        now = self._clock()
+        healthy = [index for index, until in enumerate(self._unhealthy_until) if until <= now]
+        if not healthy:
+            return None
+        index = self._assignments.get(reader) if reader is not None else None
+        if index is None or index not in healthy:
+            index = healthy[next(self._next) % len(healthy)]
+            if reader is not None:
+                self._assignments.put(reader, index)
+        self._instrument(index)
+        return self.replicas[index]
+
+    def record_write(self, writer: Hashable) -> None:
+        if self.replicas:
+            self._recent_writers.put(writer, True)
+
+    def _instrument(self, index: int) -> None:
+        if self._instrumented[index]:
+            return
+        with self._lock:
+            if not self._instrumented[index]:
+                engine = self.replicas[index].engine
+                sync_engine = engine if isinstance(engine, Engine) else engine.sync_engine
+                event.listen(sync_engine, "handle_error", lambda context: self._handle_error(index, context))
+                self._instrumented[index] = True
+
+    def _handle_error(self, index: int, context: ExceptionContext) -> None:
+        # Errors without a connection are failed connection attempts
+        if context.is_disconnect or context.connection is None:
+            self._unhealthy_until[index] = self._clock() + self._retry_secs
+
+
+def _pool_stats(pool: Pool) -> PoolStats:
+    assert isinstance(pool, _TimedQueuePool)
+    checkouts_waiting, checkout_wait_secs_oldest = pool.recorder.waiting()
+    return PoolStats(
+        pool_size=pool.size(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0),
+        checkouts=pool.recorder.checkouts,
+        checkout_wait_secs_total=pool.recorder.wait_secs_total,
+        checkout_wait_secs_max=pool.recorder.wait_secs_max,
+        checkouts_waiting=checkouts_waiting,
+        checkout_wait_secs_oldest=checkout_wait_secs_oldest,
+    )
 
 
 class PostgresqlDbConnection(DbConnection):
@@ -19,35 +250,70 @@ class PostgresqlDbConnection(DbConnection):
     A database connection class for PostgreSQL databases.
 
     This class provides a concrete implementation of the `DbConnection` abstract base class
-    for PostgreSQL databases. It provides methods for creating a SQLAlchemy Engine instance
-    and a SQLAlchemy Session instance for interacting with the database.
+    for PostgreSQL databases. The SQLAlchemy Engine, and with it the connection pool, is created
+    lazily on first use and shared by all sessions of the process.
+
+    Reads can be served by read replicas, each a connection of its own with its own pool, which
+    `create_read_session` chooses between as described in `_ReplicaRouter`.
 
     Attributes:
         connection_string (str): The connection string for the PostgreSQL database.
 
     Methods:
         create_session() -> Session: Creates and returns a new SQLAlchemy Session instance.
+        create_read_session(reader) -> Session: Creates a Session on a replica or the primary database.
+        record_write(writer) -> None: Routes the reads of the writer to the primary database for a while.
+        pool_stats() -> PoolStats: Returns a snapshot of the connection pool statistics.
     """
 
-    def __init__(self, connection_string: str):
+    def __init__(
+            self,
+            connection_string: str,
+            pool_size: int = 5,
+            max_overflow: int = 10,
+            pool_recycle_secs: int = 1800,
+            pool_pre_ping: bool = True,
+            pool_timeout_secs: float = 30,
+            read_replicas: Sequence[DbConnection] = (),
+            read_your_writes_secs: float = 5,
+            replica_retry_secs: float = 30,
+    ):
         """
         Initialize the PostgreSQL database connection with the given connection string.
 
         Args:
             connection_string (str): The connection string for the PostgreSQL database.
+            pool_size (int): The number of connections kept open in the pool.
+            max_overflow (int): The number of connections that may be opened beyond `pool_size`.
+            pool_recycle_secs (int): The age in seconds after which a pooled connection is replaced.
+            pool_pre_ping (bool): Whether to test pooled connections for liveness on checkout.
+            pool_timeout_secs (float): How long to wait for a free connection before giving up.
+            read_replicas (Sequence[DbConnection]): The connections to the read replicas of the database.
+            read_your_writes_secs (float): How long the reads of a writer go to the primary database
+                after it recorded a write, 0 to always read from the replicas.
+            replica_retry_secs (float): How long a replica that could not be reached is skipped.
 
         Returns:
             None
         """
         self._connection_string = connection_string
+        self._pool_size = pool_size
+        self._max_overflow = max_overflow
+        self._pool_recycle_secs = pool_recycle_secs
+        self._pool_pre_ping = pool_pre_ping
+        self._pool_timeout_secs = pool_timeout_secs
+        self._engine: Engine | None = None
+        self._session_factory: sessionmaker[Session] | None = None
+        self._lock = threading.Lock()
+        self._router = _ReplicaRouter(read_replicas, read_your_writes_secs, replica_retry_secs)
 
     @property
     def engine(self) -> Engine:
         """
         Get the SQLAlchemy Engine instance for the PostgreSQL database.
 
-        This method creates and returns a new SQLAlchemy Engine instance for the PostgreSQL
-        database using the connection string provided during initialization.
+        The engine is created on first access using the connection string and pool settings
+        provided during initialization, and reused for every later access.
 
         Args:
             None
@@ -55,14 +321,26 @@ class PostgresqlDbConnection(DbConnection):
         Returns:
             Engine: A SQLAlchemy Engine instance for the PostgreSQL database.
         """
-        return create_engine(self._connection_string)
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_engine(
+                        self._connection_string,
+                        poolclass=_TimedQueuePool,
+                        pool_size=self._pool_size,
+                        max_overflow=self._max_overflow,
+                        pool_recycle=self._pool_recycle_secs,
+                        pool_pre_ping=self._pool_pre_ping,
+                        pool_timeout=self._pool_timeout_secs,
+                    )
+        return self._engine
 
     def create_session(self) -> Session:
         """
         Create a new SQLAlchemy Session instance for the PostgreSQL database.
 
-        This method creates and returns a new SQLAlchemy Session instance for the PostgreSQL
-        database using the Engine instance obtained from the `engine` property.
+        Sessions are produced by a single session factory bound to the shared Engine, so they
+        draw their connections from the same pool.
 
         Args:
             None
@@ -70,5 +348,156 @@ class PostgresqlDbConnection(DbConnection):
         Returns:
             Session: A new SQLAlchemy Session instance for the PostgreSQL database.
         """
-        engine = self.engine
-        return sessionmaker(autocommit=False, bind=engine)()
+        if self._session_factory is None:
+            engine = self.engine
+            with self._lock:
+                if self._session_factory is None:
+                    self._session_factory = sessionmaker(autocommit=False, bind=engine)
+        return self._session_factory()
+
+    @property
+    def read_replicas(self) -> Sequence[DbConnection]:
+        return self._router.replicas
+
+    def create_read_session(self, reader: Optional[Hashable] = None) -> Session:
+        """
+        Create a new SQLAlchemy Session instance for reads, on the replica chosen for the reader, or on
+        the primary database if there is none.
+
+        Args:
+            reader (Optional[Hashable]): Identifies the reader, e.g. the ID of the authenticated user.
+
+        Returns:
+            Session: A new SQLAlchemy Session instance, which must not write.
+        """
+        replica = self._router.choose(reader)
+        return replica.create_session() if replica is not None else self.create_session()
+
+    def record_write(self, writer: Hashable) -> None:
+        """
+        Record that the writer committed a write, so its reads go to the primary database for the
+        read-your-writes interval.
+
+        Args:
+            writer (Hashable): Identifies the writer, as the reader of `create_read_session`.
+        """
+        self._router.record_write(writer)
+
+    def pool_stats(self) -> PoolStats:
+        """
+        Return a snapshot of the connection pool statistics.
+
+        Args:
+            None
+
+        Returns:
+            PoolStats: The current pool usage and checkout wait times.
+        """
+        return _pool_stats(self.engine.pool)
+
+
+class PostgresqlAsyncDbConnection(AsyncDbConnection):
+    """
+    An asyncio database connection class for PostgreSQL databases.
+
+    The asyncio counterpart of `PostgresqlDbConnection`, built on SQLAlchemy's asyncio extension.
+    The connection string has to name an asyncio driver, e.g. `postgresql+asyncpg://`.
+
+    Attributes:
+        connection_string (str): The connection string for the PostgreSQL database.
+
+    Methods:
+        create_session() -> AsyncSession: Creates and returns a new SQLAlchemy AsyncSession instance.
+        create_read_session(reader) -> AsyncSession: Creates an AsyncSession on a replica or the primary database.
+        record_write(writer) -> None: Routes the reads of the writer to the primary database for a while.
+        pool_stats() -> PoolStats: Returns a snapshot of the connection pool statistics.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_recycle_secs: int = 1800,
+        pool_pre_ping: bool = True,
+        pool_timeout_secs: float = 30,
+        read_replicas: Sequence[AsyncDbConnection] = (),
+        read_your_writes_secs: float = 5,
+        replica_retry_secs: float = 30,
+    ):
+        """
+        Initialize the asyncio PostgreSQL database connection. See `PostgresqlDbConnection` for the arguments.
+        """
+        self._connection_string = connection_string
+        self._pool_size = pool_size
+        self._max_overflow = max_overflow
+        self._pool_recycle_secs = pool_recycle_secs
+        self._pool_pre_ping = pool_pre_ping
+        self._pool_timeout_secs = pool_timeout_secs
+        self._engine: AsyncEngine | None = None
+        self._session_factory: async_sessionmaker[AsyncSession] | None = None
+        self._lock = threading.Lock()
+        self._router = _ReplicaRouter(read_replicas, read_your_writes_secs, replica_retry_secs)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        """
+        Get the SQLAlchemy AsyncEngine instance for the PostgreSQL database, which is created on first access.
+
+        Returns:
+            AsyncEngine: A SQLAlchemy AsyncEngine instance for the PostgreSQL database.
+        """
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_async_engine(
+                        self._connection_string,
+                        poolclass=_TimedAsyncAdaptedQueuePool,
+                        pool_size=self._pool_size,
+                        max_overflow=self._max_overflow,
+                        pool_recycle=self._pool_recycle_secs,
+                        pool_pre_ping=self._pool_pre_ping,
+                        pool_timeout=self._pool_timeout_secs,
+                    )
+        return self._engine
+
+    def create_session(self) -> AsyncSession:
+        """
+        Create a new SQLAlchemy AsyncSession instance bound to the shared AsyncEngine.
+
+        Returns:
+            AsyncSession: A new SQLAlchemy AsyncSession instance for the PostgreSQL database.
+        """
+        if self._session_factory is None:
+            engine = self.engine
+            with self._lock:
+                if self._session_factory is None:
+                    # Attributes can not be lazy loaded after a commit in asyncio, so they are not expired
+                    self._session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+        return self._session_factory()
+
+    @property
+    def read_replicas(self) -> Sequence[AsyncDbConnection]:
+        return self._router.replicas
+
+    def create_read_session(self, reader: Optional[Hashable] = None) -> AsyncSession:
+        """
+        Create a new SQLAlchemy AsyncSession instance for reads, see `PostgresqlDbConnection.create_read_session`.
+        """
+        replica = self._router.choose(reader)
+        return replica.create_session() if replica is not None else self.create_session()
+
+    def record_write(self, writer: Hashable) -> None:
+        """
+        Record that the writer committed a write, see `PostgresqlDbConnection.record_write`.
+        """
+        self._router.record_write(writer)
+
+    def pool_stats(self) -> PoolStats:
+        """
+        Return a snapshot of the connection pool statistics.
+
+        Returns:
+            PoolStats: The current pool usage and checkout wait times.
+        """
+        return _pool_stats(self.engine.sync_engine.pool)
@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from utils.statement_log import StatementLog, track_statements
+
+
+class QueryBudgetExceededError(AssertionError):
+    """
+    Raised when more SQL statements were executed than budgeted, or the same statement was repeated
+    too often, which usually points at an N+1 query pattern. It is an `AssertionError`, so tests
+    report it as a failure.
+    """
+
+
+def budget_violations(statement_log: StatementLog, max_statements: int, max_repeats: Optional[int] = None) -> list[str]:
+    """
+    :param statement_log: the executed statements
+    :param max_statements: the maximum number of statements
+    :param max_repeats: the maximum number of executions of the same statement, or None to allow any
+    :return: a description of every exceeded limit, empty if the statements are within the budget
+    """
+    violations: list[str] = []
+    if statement_log.count > max_statements:
+        violations.append(f"{statement_log.count} statements executed, at most {max_statements} allowed")
+    if max_repeats is not None:
+        for statement, count in statement_log.repeated_statements(max_repeats).items():
+            violations.append(f"statement executed {count} times, possible N+1 query: {' '.join(statement.split())}")
+    return violations
+
+
+@contextmanager
+def assert_max_statements(max_statements: int, max_repeats: Optional[int] = None) -> Iterator[StatementLog]:
+    """
+    Asserts that the code within the context executes at most `max_statements` statements on
+    instrumented engines, e.g.:
+
+        with assert_max_statements(1):
+            view_task.get_tasks()
+
+    :param max_statements: the maximum number of statements
+    :param max_repeats: the maximum number of executions of the same statement, or None to allow any
+    :return: the log of the executed statements
+    :raises QueryBudgetExceededError: if the budget is exceeded
+    """
+    with track_statements() as statement_log:
+        yield statement_log
+    violations = budget_violations(statement_log, max_statements, max_repeats)
+    if violations:
+        raise QueryBudgetExceededError("; ".join(violations))
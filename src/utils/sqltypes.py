@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import ColumnElement, DateTime, Dialect, String, Text, cast, type_coerce
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+
+class UtcDateTime(TypeDecorator[datetime]):
+    """
+    A `TIMESTAMP WITHOUT TIME ZONE` column holding UTC times.
+
+    Timezone aware values are converted to UTC and stored without their offset. psycopg2 does this
+    implicitly, while asyncpg rejects aware values for such columns, so both drivers store the same value.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[datetime], dialect: Dialect) -> Optional[datetime]:
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class UuidText(TypeDecorator[str]):
+    """
+    Reads a UUID column as its canonical text, e.g. `type_coerce(table.c.id, UuidText())`, for values
+    that are only serialized.
+
+    The column is cast to text in SQL, so the driver does not construct a UUID object per value. Databases
+    without a native UUID type store the UUIDs as 32 hex digits, which are converted to the canonical form,
+    while the text of native UUIDs is returned without further processing.
+    """
+
+    impl = String
+    cache_ok = True
+
+    def column_expression(self, colexpr: ColumnElement[Any]) -> ColumnElement[str]:
+        return type_coerce(cast(colexpr, String), self)
+
+    def result_processor(self, dialect: Dialect, coltype: Any) -> Any:
+        if dialect.supports_native_uuid:
+            return None
+        return super().result_processor(dialect, coltype)
+
+    def process_result_value(self, value: Optional[str], dialect: Dialect) -> Optional[str]:
+        if value is not None and len(value) == 32:
+            return str(UUID(value))
+        return value
+
+
+class TsVector(TypeDecorator[str]):
+    """
+    A PostgreSQL `TSVECTOR` column. Other databases have no full-text search and store the searched
+    text instead, see `SearchVector`.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> TypeEngine[Any]:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(TSVECTOR())
+        return dialect.type_descriptor(Text())
+
+
+class SearchVector(FunctionElement[str]):
+    """
+    The full-text search vector of text columns, each with the weight its matches are ranked by, as
+    the expression of a generated `TsVector` column, e.g.
+    `Computed(SearchVector("english", ("title", "A"), ("description", "B")))`.
+
+    PostgreSQL builds the vector with `to_tsvector` in the given text search configuration. Other
+    databases get the concatenated text of the columns.
+    """
+
+    type = TsVector()
+    inherit_cache = False
+
+    def __init__(self, config: str, *weighted_columns: tuple[str, str]) -> None:
+        self.config = config
+        self.weighted_columns = weighted_columns
+        super().__init__()
+
+
+@compiles(SearchVector)
+def _compile_search_vector(element: SearchVector, compiler: SQLCompiler, **kw: Any) -> str:
+    quote = compiler.preparer.quote
+    return " || ' ' || ".join(f"coalesce({quote(column)}, '')" for column, _ in element.weighted_columns)
+
+
+@compiles(SearchVector, "postgresql")
+def _compile_pg_search_vector(element: SearchVector, compiler: SQLCompiler, **kw: Any) -> str:
+    quote = compiler.preparer.quote
+    config = compiler.render_literal_value(element.config, String())
+    return " || ".join(f"setweight(to_tsvector({config}::regconfig, coalesce({quote(column)}, '')), "
+                       f"{compiler.render_literal_value(weight, String())})"
+                       for column, weight in element.weighted_columns)
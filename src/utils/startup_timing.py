@@ -0,0 +1,51 @@
+import time
+from typing import Optional
+
+
+class StartupTimer:
+    """
+    Measures the phases of the start of a process, e.g. parsing the config or preparing the database.
+
+    Phases are measured as laps, each lasting from the end of the previous phase, so consecutive
+    steps are timed without wrapping them. The time not covered by a phase, e.g. the time before
+    the timer was created, is reported as 'other'.
+    """
+
+    def __init__(self, started_at: Optional[float] = None) -> None:
+        """
+        :param started_at: the wall clock time the start began at, by default the time the timer is created
+        """
+        self.started_at = started_at if started_at is not None else time.time()
+        self.phases: dict[str, float] = {}
+        self._lap_start = time.perf_counter()
+
+    @property
+    def elapsed_secs(self) -> float:
+        return time.time() - self.started_at
+
+    def add(self, phase: str, secs: float) -> None:
+        """
+        :param phase: the name of the phase
+        :param secs: the time spent in the phase, added to earlier time of the same phase
+        """
+        self.phases[phase] = self.phases.get(phase, 0.0) + secs
+
+    def lap(self, phase: str) -> None:
+        """
+        Ends the current phase.
+
+        :param phase: the name of the phase, which began when the previous one ended
+        """
+        now = time.perf_counter()
+        self.add(phase, now - self._lap_start)
+        self._lap_start = now
+
+    def report(self) -> str:
+        """
+        :return: the elapsed time and its breakdown into phases, e.g. '1.204s (config 0.012s, ...)'
+        """
+        elapsed_secs = self.elapsed_secs
+        phases = dict(self.phases)
+        phases["other"] = max(elapsed_secs - sum(phases.values()), 0.0)
+        breakdown = ", ".join(f"{phase} {secs:.3f}s" for phase, secs in phases.items())
+        return f"{elapsed_secs:.3f}s ({breakdown})"
@@ -0,0 +1,104 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, NamedTuple
+
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import ExceptionContext
+
+_STATEMENT_STARTS_KEY = "statement_log_starts"
+
+
+class LoggedStatement(NamedTuple):
+    statement: str
+    duration_secs: float
+    executemany: bool
+
+
+class StatementLog:
+    """
+    The SQL statements executed while the log was being tracked, with their execution times.
+
+    Statements are logged with their bound parameters as placeholders, so executions of the same
+    query with different parameters share their text. An executemany call is logged once per batch
+    the driver sends.
+    """
+
+    def __init__(self) -> None:
+        self.statements: list[LoggedStatement] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def duration_secs(self) -> float:
+        return sum(statement.duration_secs for statement in self.statements)
+
+    def repeated_statements(self, max_repeats: int) -> dict[str, int]:
+        """
+        The batches of executemany calls are not counted, as they are sent for a single call.
+
+        :param max_repeats: the number of times a statement may be executed
+        :return: the statements executed more often, with their execution count
+        """
+        counts: dict[str, int] = {}
+        for statement in self.statements:
+            if not statement.executemany:
+                counts[statement.statement] = counts.get(statement.statement, 0) + 1
+        return {statement: count for statement, count in counts.items() if count > max_repeats}
+
+
+# The logs being tracked. Context variables are copied into the threadpool and into the greenlets of
+# SQLAlchemy's asyncio extension, so statements are logged to the logs of the request executing them.
+_active_logs: ContextVar[tuple[StatementLog, ...]] = ContextVar("active_statement_logs", default=())
+
+
+@contextmanager
+def track_statements() -> Iterator[StatementLog]:
+    """
+    Logs the statements that instrumented engines execute within the context, including those run in
+    the threadpool or by asyncio sessions on its behalf. Tracking can be nested.
+
+    :return: the log of the statements
+    """
+    log = StatementLog()
+    token = _active_logs.set(_active_logs.get() + (log, ))
+    try:
+        yield log
+    finally:
+        _active_logs.reset(token)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Logs the statements the engine executes to the tracked logs. Instrumenting an engine again has no effect.
+
+    :param engine: the engine, for an asyncio engine its `sync_engine`
+    """
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    conn.info.setdefault(_STATEMENT_STARTS_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any,
+                          executemany: bool) -> None:
+    _log_statement(statement, conn.info[_STATEMENT_STARTS_KEY].pop(), executemany)
+
+
+def _handle_error(context: ExceptionContext) -> None:
+    starts = context.connection.info.get(_STATEMENT_STARTS_KEY) if context.connection is not None else None
+    if starts and context.statement is not None:
+        executemany = context.execution_context is not None and context.execution_context.executemany
+        _log_statement(context.statement, starts.pop(), executemany)
+
+
+def _log_statement(statement: str, start: float, executemany: bool) -> None:
+    logged = LoggedStatement(statement, time.perf_counter() - start, executemany)
+    for log in _active_logs.get():
+        log.statements.append(logged)
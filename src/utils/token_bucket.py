@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket, admitting on average `rate` requests per second and bursts of up to
+    `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param rate: the number of tokens added per second
+        :param burst: the maximum number of tokens, the bucket starts full
+        :param clock: the monotonic clock the tokens are added by
+        """
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes a token from the bucket, if one is available.
+
+        :return: 0 if a token was taken, otherwise the number of seconds until the next token is available
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._rate if self._rate > 0 else float("inf")
+
+
+class TokenBuckets(Generic[K]):
+    """
+    Bounded, thread-safe token buckets by key, e.g. one per user, with the same rate and burst.
+
+    When more keys are tracked than `max_keys`, the bucket of the least recently used key is
+    dropped; a dropped key starts with a full bucket again.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param rate: the number of tokens added per second to each bucket
+        :param burst: the maximum number of tokens of each bucket
+        :param max_keys: the maximum number of buckets kept
+        :param clock: the monotonic clock the tokens are added by
+        """
+        self._rate = rate
+        self._burst = burst
+        self._max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[K, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: K) -> float:
+        """
+        Takes a token from the bucket of a key, if one is available.
+
+        :param key: the key of the bucket, e.g. the user
+        :return: 0 if a token was taken, otherwise the number of seconds until the next token is available
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self._rate, self._burst, self._clock)
+                while len(self._buckets) > self._max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+        return bucket.acquire()
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+from pydantic import BaseModel
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheStats(BaseModel):
+    """
+    A snapshot of the usage of a `TTLCache`.
+    """
+
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+
+
+class TTLCache(Generic[K, V]):
+    """
+    A bounded, thread-safe in-process cache whose entries expire a fixed time after they were stored.
+
+    When the cache is full, the least recently used entry is evicted. A cache with a size or TTL of zero
+    stores nothing, which disables caching without special-casing its callers.
+    """
+
+    def __init__(self, max_size: int, ttl_secs: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param max_size: the maximum number of entries
+        :param ttl_secs: the number of seconds after which an entry expires
+        :param clock: the monotonic clock the expiry is measured with
+        """
+        self._max_size = max_size
+        self._ttl_secs = ttl_secs
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        """
+        :param key: the key of the entry
+        :return: the cached value, or None if the key is not cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key: K, value: V, ttl_secs: Optional[float] = None) -> None:
+        """
+        Stores a value, evicting the least recently used entry if the cache is full.
+
+        :param key: the key of the entry
+        :param value: the value to cache
+        :param ttl_secs: the number of seconds after which this entry expires, at most the TTL of the cache;
+            the TTL of the cache if omitted
+        """
+        ttl_secs = self._ttl_secs if ttl_secs is None else min(ttl_secs, self._ttl_secs)
+        if self._max_size <= 0 or ttl_secs <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl_secs, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: K) -> None:
+        """
+        Removes an entry, if it is cached.
+
+        :param key: the key of the entry
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(size=len(self._entries), max_size=self._max_size, hits=self._hits, misses=self._misses)